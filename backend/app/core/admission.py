@@ -0,0 +1,188 @@
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import FixedWindowRateLimiter
+
+from app.core import metrics
+from app.core.config import (
+    RATE_LIMIT_STORAGE_URI,
+    CHAT_TOKEN_BUDGET,
+    LLM_MAX_CONCURRENCY,
+    LLM_MAX_QUEUE,
+    LLM_QUEUE_TIMEOUT_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class Overloaded(Exception):
+    """
+    Raised when LLM-bound work is shed. `retry_after` is a suggested wait in
+    seconds for the Retry-After header.
+    """
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Overloaded, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class ConcurrencyLimiter:
+    """
+    Caps the LLM calls running at once in this worker. Callers over the cap
+    wait in a bounded FIFO queue; they are shed (Overloaded) when the queue
+    is full or they waited `queue_timeout` seconds.
+
+    A released slot is handed straight to the oldest waiter, so a burst can
+    not starve queued requests. Waiters are plain futures of the running
+    loop; no lock is needed as everything runs on the event loop.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, queue_timeout: float):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self._waiters: deque = deque()
+        # Moving average of how long a slot is held, for Retry-After
+        self._average_hold = 1.0
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def busy(self) -> bool:
+        """
+        True when a new call would have to queue.
+        """
+        return self.active >= self.max_concurrency
+
+    def saturated(self) -> bool:
+        """
+        True when a new call would be shed right away.
+        """
+        return self.busy() and self.waiting >= self.max_queue
+
+    def retry_after(self) -> int:
+        """
+        Seconds until the queue ahead of a new caller has likely drained.
+        """
+        return max(1, math.ceil(self._average_hold * (self.waiting + 1) / self.max_concurrency))
+
+    def shed(self) -> Overloaded:
+        """
+        The exception to raise for a call that is turned away.
+        """
+        metrics.inc("admission_llm_shed")
+        return Overloaded(self.retry_after())
+
+    async def acquire(self):
+        if self.active < self.max_concurrency and not self._waiters:
+            self.active += 1
+            return
+        if self.waiting >= self.max_queue:
+            raise self.shed()
+
+        metrics.inc("admission_llm_queued")
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        try:
+            await asyncio.wait_for(future, self.queue_timeout)
+        except BaseException as e:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as we gave up: pass it on
+                self.release()
+            elif future in self._waiters:
+                self._waiters.remove(future)
+            if isinstance(e, asyncio.TimeoutError):
+                raise self.shed() from None
+            raise
+
+    def release(self):
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                future.set_result(None)
+                return
+        self.active -= 1
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._average_hold = 0.8 * self._average_hold + 0.2 * (time.perf_counter() - started)
+            self.release()
+
+
+class TokenBudget:
+    """
+    Cost-aware limit: LLM tokens each client may spend per window, e.g.
+    "100000/hour". Kept in the same storage as the request rate limits, so
+    workers share it when that is Redis or Memcached. A request is admitted
+    while the client has budget left and is charged its actual tokens after.
+    Storage errors are logged and never block a request.
+    """
+
+    def __init__(self, limit: str, storage_uri: str):
+        self.limit = parse(limit)
+        self.strategy = FixedWindowRateLimiter(storage_from_string(storage_uri))
+
+    def allowed(self, client: str) -> bool:
+        try:
+            return self.strategy.test(self.limit, "chat_tokens", client)
+        except Exception as e:
+            logger.warning(f"Token budget check failed, admitting request: {e}")
+            return True
+
+    def charge(self, client: str, tokens: int):
+        if tokens <= 0:
+            return
+        try:
+            self.strategy.hit(self.limit, "chat_tokens", client, cost=tokens)
+        except Exception as e:
+            logger.warning(f"Could not charge {tokens} tokens to the budget: {e}")
+
+    def retry_after(self, client: str) -> int:
+        try:
+            reset_at = self.strategy.get_window_stats(self.limit, "chat_tokens", client).reset_time
+        except Exception as e:
+            logger.warning(f"Token budget window lookup failed, using the full window: {e}")
+            return self.limit.get_expiry()
+        return max(1, math.ceil(reset_at - time.time()))
+
+
+llm_slots: Optional[ConcurrencyLimiter] = (
+    ConcurrencyLimiter(LLM_MAX_CONCURRENCY, LLM_MAX_QUEUE, LLM_QUEUE_TIMEOUT_SECONDS)
+    if LLM_MAX_CONCURRENCY > 0 else None
+)
+
+token_budget: Optional[TokenBudget] = TokenBudget(CHAT_TOKEN_BUDGET, RATE_LIMIT_STORAGE_URI) if CHAT_TOKEN_BUDGET else None
+
+
+@asynccontextmanager
+async def llm_slot():
+    """
+    Holds one LLM concurrency slot for the block, if admission control is on.
+    """
+    if llm_slots is None:
+        yield
+        return
+    async with llm_slots.slot():
+        yield
+
+
+def llm_busy() -> bool:
+    return llm_slots is not None and llm_slots.busy()
+
+
+def llm_saturated() -> bool:
+    return llm_slots is not None and llm_slots.saturated()
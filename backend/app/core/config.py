@@ -6,3 +6,96 @@ load_dotenv()
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+
+# Provider backends. "gemini" / "supabase" use the hosted services; "local" / "memory"
+# run offline and deterministically (hashing embedder, templated responses, in-process catalog)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "gemini").lower()
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini").lower()
+STORE_BACKEND = os.getenv("STORE_BACKEND", "supabase").lower()
+# Scraped products file (JSONL or a JSON list) loaded by the memory store
+# (defaults to app/services/hunnit_products.json)
+MEMORY_STORE_PATH = os.getenv("MEMORY_STORE_PATH")
+# Catalog snapshots written by `python app/services/snapshot.py` and memory-mapped
+# by STORE_BACKEND=snapshot (defaults to app/services/catalog_snapshot)
+CATALOG_SNAPSHOT_DIR = os.getenv("CATALOG_SNAPSHOT_DIR")
+# Simulated per-call latency of the local backends (ms), to model the hosted services in benchmarks
+LOCAL_EMBEDDING_LATENCY_MS = float(os.getenv("LOCAL_EMBEDDING_LATENCY_MS", "0"))
+LOCAL_LLM_LATENCY_MS = float(os.getenv("LOCAL_LLM_LATENCY_MS", "0"))
+LOCAL_STORE_LATENCY_MS = float(os.getenv("LOCAL_STORE_LATENCY_MS", "0"))
+
+# In-process vector index: "off" (use the match_products RPC), "exact", "ivf" or "auto"
+VECTOR_INDEX_MODE = os.getenv("VECTOR_INDEX_MODE", "off").lower()
+VECTOR_INDEX_IVF_MIN_ROWS = int(os.getenv("VECTOR_INDEX_IVF_MIN_ROWS", "20000"))
+VECTOR_INDEX_IVF_NPROBE = int(os.getenv("VECTOR_INDEX_IVF_NPROBE", "8"))
+
+# How often API workers check whether ingestion has changed the catalog
+CATALOG_POLL_SECONDS = int(os.getenv("CATALOG_POLL_SECONDS", "60"))
+
+# Tiered /chat response cache (exact query text, then query-embedding similarity)
+CHAT_CACHE_ENABLED = os.getenv("CHAT_CACHE_ENABLED", "true").lower() == "true"
+CHAT_CACHE_MAX_SIZE = int(os.getenv("CHAT_CACHE_MAX_SIZE", "1000"))
+CHAT_CACHE_TTL_SECONDS = int(os.getenv("CHAT_CACHE_TTL_SECONDS", "3600"))
+CHAT_CACHE_SEMANTIC_DISTANCE = float(os.getenv("CHAT_CACHE_SEMANTIC_DISTANCE", "0.05"))
+
+# Retrieval strategy: "vector" (dense similarity only) or "hybrid" (BM25 + vector, fused with RRF)
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "vector").lower()
+
+# Result diversification: search over-fetches RERANK_CANDIDATE_MULTIPLIER x
+# match_count candidates and re-ranks them with Maximal Marginal Relevance
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "true").lower() == "true"
+RERANK_CANDIDATE_MULTIPLIER = int(os.getenv("RERANK_CANDIDATE_MULTIPLIER", "4"))
+# MMR trade-off: 1.0 ranks by relevance only, lower values favour diversity
+RERANK_MMR_LAMBDA = float(os.getenv("RERANK_MMR_LAMBDA", "0.6"))
+# Max products of one category in the results (0: no cap)
+RERANK_MAX_PER_CATEGORY = int(os.getenv("RERANK_MAX_PER_CATEGORY", "0"))
+
+# Skip LLM query expansion for queries that already use catalog vocabulary
+QUERY_ROUTER_ENABLED = os.getenv("QUERY_ROUTER_ENABLED", "true").lower() == "true"
+
+# Async database access: connection pool limits and per-call timeout
+DB_POOL_MAX_CONNECTIONS = int(os.getenv("DB_POOL_MAX_CONNECTIONS", "20"))
+DB_POOL_MAX_KEEPALIVE = int(os.getenv("DB_POOL_MAX_KEEPALIVE", "10"))
+DB_TIMEOUT_SECONDS = float(os.getenv("DB_TIMEOUT_SECONDS", "10"))
+DB_HTTP2 = os.getenv("DB_HTTP2", "true").lower() == "true"
+
+# Read-through cache for /products and /products/{id}; set a redis:// URL to share it between workers
+PRODUCT_CACHE_ENABLED = os.getenv("PRODUCT_CACHE_ENABLED", "true").lower() == "true"
+PRODUCT_CACHE_MAX_SIZE = int(os.getenv("PRODUCT_CACHE_MAX_SIZE", "5000"))
+PRODUCT_CACHE_TTL_SECONDS = int(os.getenv("PRODUCT_CACHE_TTL_SECONDS", "300"))
+PRODUCT_CACHE_REDIS_URL = os.getenv("PRODUCT_CACHE_REDIS_URL")
+
+# Share one in-flight call between concurrent identical LLM, search and product lookups
+SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+
+# Micro-batching of embedding requests across concurrent callers
+EMBED_BATCHING_ENABLED = os.getenv("EMBED_BATCHING_ENABLED", "true").lower() == "true"
+EMBED_BATCH_MAX_SIZE = int(os.getenv("EMBED_BATCH_MAX_SIZE", "32"))
+EMBED_BATCH_WAIT_MS = float(os.getenv("EMBED_BATCH_WAIT_MS", "5"))
+
+# Prometheus metrics at GET /metrics, and per-stage timings in a Server-Timing response header
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "false").lower() == "true"
+
+# Startup: warm up clients and caches before serving, and warn when importing the app takes longer than this
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+IMPORT_BUDGET_SECONDS = float(os.getenv("IMPORT_BUDGET_SECONDS", "1.5"))
+
+# LLM prompts: token budget for the product list in the response prompt
+LLM_CONTEXT_TOKEN_BUDGET = int(os.getenv("LLM_CONTEXT_TOKEN_BUDGET", "600"))
+
+# Rate limits per client IP. Use a shared storage (redis://, memcached://) so all workers enforce one counter;
+# memory:// counts per worker. CHAT_TOKEN_BUDGET limits LLM tokens per client (empty to disable).
+RATE_LIMIT_STORAGE_URI = os.getenv("RATE_LIMIT_STORAGE_URI", "memory://")
+CHAT_RATE_LIMIT = os.getenv("CHAT_RATE_LIMIT", "5/minute")
+CHAT_TOKEN_BUDGET = os.getenv("CHAT_TOKEN_BUDGET", "100000/hour")
+
+# Admission control for LLM calls (per worker): concurrent calls, queued calls and queue wait before shedding.
+# Set LLM_MAX_CONCURRENCY=0 to disable.
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "32"))
+LLM_QUEUE_TIMEOUT_SECONDS = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "10"))
+
+# Degraded modes under LLM pressure: skip query expansion once every slot is busy,
+# and answer with the retrieved products only when generation is shed (otherwise 503)
+DEGRADE_SKIP_EXPAND = os.getenv("DEGRADE_SKIP_EXPAND", "true").lower() == "true"
+DEGRADE_RETRIEVAL_ONLY = os.getenv("DEGRADE_RETRIEVAL_ONLY", "true").lower() == "true"
@@ -1,7 +1,110 @@
-from supabase import create_client, Client
-from app.core.config import SUPABASE_URL, SUPABASE_KEY
+import asyncio
+import importlib.util
+import threading
+from typing import TYPE_CHECKING, Optional
 
-if not SUPABASE_URL or not SUPABASE_KEY:
-    raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set in .env file")
+import httpx
+from app.core.config import (
+    SUPABASE_URL,
+    SUPABASE_KEY,
+    DB_POOL_MAX_CONNECTIONS,
+    DB_POOL_MAX_KEEPALIVE,
+    DB_TIMEOUT_SECONDS,
+    DB_HTTP2,
+)
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+if TYPE_CHECKING:
+    from supabase import Client, AsyncClient
+
+# Both clients are created on first use (or by the startup warm-up), so
+# importing this module is cheap and works without credentials. The supabase
+# package itself is only imported then too.
+
+# Sync client, used by scripts (ingestion) and background index loading
+_client: Optional["Client"] = None
+_client_lock = threading.Lock()
+
+# Async client, used by request handlers. It, its connection pool and the
+# lock guarding its creation are created inside the event loop they serve.
+_async_client: Optional["AsyncClient"] = None
+_http_client: Optional[httpx.AsyncClient] = None
+_async_lock: Optional[asyncio.Lock] = None
+
+
+def _require_credentials():
+    if not SUPABASE_URL or not SUPABASE_KEY:
+        raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set in .env file")
+
+
+def get_client() -> "Client":
+    """
+    Returns the shared sync Supabase client, raising if Supabase is not configured.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _require_credentials()
+                from supabase import create_client
+
+                _client = create_client(SUPABASE_URL, SUPABASE_KEY)
+    return _client
+
+
+async def get_async_client() -> "AsyncClient":
+    """
+    Returns the shared async Supabase client, backed by one pooled
+    (HTTP/2 when available) httpx connection pool.
+    """
+    global _async_client, _http_client, _async_lock
+    if _async_client is None:
+        _require_credentials()
+        if _async_lock is None:
+            _async_lock = asyncio.Lock()
+        async with _async_lock:
+            if _async_client is None:
+                from supabase import acreate_client, AsyncClientOptions
+
+                _http_client = httpx.AsyncClient(
+                    http2=DB_HTTP2 and importlib.util.find_spec("h2") is not None,
+                    limits=httpx.Limits(
+                        max_connections=DB_POOL_MAX_CONNECTIONS,
+                        max_keepalive_connections=DB_POOL_MAX_KEEPALIVE,
+                    ),
+                    timeout=DB_TIMEOUT_SECONDS,
+                )
+                _async_client = await acreate_client(
+                    SUPABASE_URL,
+                    SUPABASE_KEY,
+                    options=AsyncClientOptions(httpx_client=_http_client, postgrest_client_timeout=DB_TIMEOUT_SECONDS),
+                )
+    return _async_client
+
+
+async def execute(query, timeout: float = DB_TIMEOUT_SECONDS):
+    """
+    Executes an async query builder with a hard per-call timeout.
+    """
+    return await asyncio.wait_for(query.execute(), timeout)
+
+
+async def warm_up():
+    """
+    Creates the async client and opens a pooled connection with a trivial
+    query, so the first request does not pay for the TLS handshake.
+    """
+    client = await get_async_client()
+    await execute(client.table("catalog_version").select("version").limit(1))
+
+
+async def close_async_client():
+    """
+    Closes the async client. Its PostgREST, storage, functions and auth
+    clients all send through the one httpx pool, so closing the pool closes
+    them all. The next get_async_client() starts afresh in the running loop.
+    """
+    global _async_client, _http_client, _async_lock
+    http_client = _http_client
+    _async_client = _http_client = _async_lock = None
+    if http_client is not None:
+        await http_client.aclose()
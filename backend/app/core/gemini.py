@@ -0,0 +1,26 @@
+import threading
+
+from app.core.config import GOOGLE_API_KEY
+
+# google.generativeai is slow to import, so it is imported and configured
+# once, on first use, and shared by the embedder and the generator.
+_genai = None
+_lock = threading.Lock()
+
+
+def get_genai():
+    """
+    Returns the configured google.generativeai module, raising if
+    GOOGLE_API_KEY is missing.
+    """
+    global _genai
+    if _genai is None:
+        with _lock:
+            if _genai is None:
+                if not GOOGLE_API_KEY:
+                    raise ValueError("GOOGLE_API_KEY must be set in .env file")
+                import google.generativeai as genai
+
+                genai.configure(api_key=GOOGLE_API_KEY)
+                _genai = genai
+    return _genai
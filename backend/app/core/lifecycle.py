@@ -0,0 +1,34 @@
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+Hook = Tuple[str, Callable[[], Any]]
+
+
+async def run_hooks(hooks: List[Hook]) -> Dict[str, Optional[float]]:
+    """
+    Runs startup hooks in order: coroutine functions are awaited, plain
+    functions run in the threadpool. A failing hook is logged and skipped,
+    since everything it prepares is also created on first use.
+    Returns {name: seconds taken, or None if it failed}.
+    """
+    timings = {}
+    for name, hook in hooks:
+        started = time.perf_counter()
+        try:
+            if asyncio.iscoroutinefunction(hook):
+                await hook()
+            else:
+                await run_in_threadpool(hook)
+        except Exception as e:
+            logger.warning(f"Startup hook '{name}' failed, continuing without it: {e}")
+            timings[name] = None
+            continue
+        timings[name] = time.perf_counter() - started
+        logger.info(f"Startup hook '{name}' took {timings[name] * 1000:.0f} ms")
+    return timings
@@ -0,0 +1,253 @@
+import bisect
+import contextvars
+import functools
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+# Process-wide counters, e.g. cache hits and misses
+_counters: Dict[str, int] = defaultdict(int)
+_lock = threading.Lock()
+
+# Histogram buckets for durations, in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+STAGE_HISTOGRAM = "rag_stage_duration_seconds"
+REQUEST_HISTOGRAM = "http_request_duration_seconds"
+
+
+def inc(name: str, amount: int = 1):
+    with _lock:
+        _counters[name] += amount
+
+
+def get(name: str) -> int:
+    return _counters.get(name, 0)
+
+
+def snapshot() -> Dict[str, int]:
+    with _lock:
+        return dict(_counters)
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram: observing is a binary search and an increment.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+# {(name, ((label, value), ...)): Histogram}
+_histograms: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], Histogram] = {}
+
+
+def observe(name: str, value: float, **labels: str):
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = Histogram()
+        histogram.observe(value)
+
+
+def histogram(name: str, **labels: str) -> Optional[Histogram]:
+    return _histograms.get((name, tuple(sorted(labels.items()))))
+
+
+class Trace:
+    """
+    Stage timings and attributes (cache hits, token counts...) of one request.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: List[Tuple[str, float]] = []
+        self.attributes: Dict[str, Any] = {}
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def stage_totals(self) -> Dict[str, float]:
+        """
+        Total seconds per stage, in order of first occurrence.
+        """
+        totals: Dict[str, float] = {}
+        for name, duration in self.stages:
+            totals[name] = totals.get(name, 0.0) + duration
+        return totals
+
+
+# The trace of the request being handled. Tasks and threadpool calls copy the
+# context, so stages run from them land in the same Trace.
+_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("trace", default=None)
+
+
+# Token usage collectors opened by token_scope() around the current code
+_token_scopes: contextvars.ContextVar[Tuple[Dict[str, int], ...]] = contextvars.ContextVar("token_scopes", default=())
+
+
+def start_trace() -> Tuple[Trace, contextvars.Token]:
+    trace = Trace()
+    return trace, _trace.set(trace)
+
+
+def end_trace(token: contextvars.Token):
+    _trace.reset(token)
+
+
+def current_trace() -> Optional[Trace]:
+    return _trace.get()
+
+
+def annotate(**attributes: Any):
+    """
+    Attaches attributes to the current request's trace, if any.
+    """
+    trace = _trace.get()
+    if trace is not None:
+        trace.attributes.update(attributes)
+
+
+@contextmanager
+def span(stage: str):
+    """
+    Times a pipeline stage into the stage histogram and the current trace.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - started
+        observe(STAGE_HISTOGRAM, duration, stage=stage)
+        trace = _trace.get()
+        if trace is not None:
+            trace.stages.append((stage, duration))
+
+
+def traced(stage: str):
+    """
+    Decorator running an async function inside span(stage).
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with span(stage):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_tokens(operation: str, prompt_tokens: int, output_tokens: int, cached_tokens: int = 0):
+    """
+    Counts LLM tokens per operation (e.g. "expand", "generate") and adds them
+    to the current request's trace. `cached_tokens` is the part of the prompt
+    served from a context cache.
+    """
+    inc(f"llm_{operation}_prompt_tokens", prompt_tokens)
+    inc(f"llm_{operation}_output_tokens", output_tokens)
+    if cached_tokens:
+        inc(f"llm_{operation}_cached_tokens", cached_tokens)
+    for usage in _token_scopes.get():
+        usage["prompt"] += prompt_tokens
+        usage["output"] += output_tokens
+        usage["cached"] += cached_tokens
+    add_token_usage({"prompt": prompt_tokens, "output": output_tokens, "cached": cached_tokens})
+
+
+def add_token_usage(usage: Dict[str, int]):
+    """
+    Adds token counts to the current request's trace only, e.g. the tokens
+    of a call it shared with another request (already counted there).
+    """
+    trace = _trace.get()
+    if trace is not None:
+        for name in ("prompt", "output", "cached"):
+            if usage.get(name):
+                trace.attributes[f"{name}_tokens"] = trace.attributes.get(f"{name}_tokens", 0) + usage[name]
+
+
+@contextmanager
+def token_scope():
+    """
+    Collects the LLM tokens recorded inside the block, tasks and threadpool
+    calls started from it included, into the yielded dict.
+    """
+    usage = {"prompt": 0, "output": 0, "cached": 0}
+    token = _token_scopes.set(_token_scopes.get() + (usage,))
+    try:
+        yield usage
+    finally:
+        _token_scopes.reset(token)
+
+
+def token_usage() -> Dict[str, int]:
+    """
+    LLM tokens spent so far by the current request.
+    """
+    trace = _trace.get()
+    attributes = trace.attributes if trace is not None else {}
+    return {
+        "prompt": attributes.get("prompt_tokens", 0),
+        "output": attributes.get("output_tokens", 0),
+        "cached": attributes.get("cached_tokens", 0),
+    }
+
+
+def _labels(pairs, **extra) -> str:
+    items = list(pairs) + list(extra.items())
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+
+def render_prometheus() -> str:
+    """
+    Counters and histograms in the Prometheus text exposition format.
+    """
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = sorted(
+            (key, list(h.counts), h.sum, h.count, h.buckets) for key, h in _histograms.items()
+        )
+
+    lines = []
+    for name, value in counters:
+        lines.append(f"# TYPE {name}_total counter")
+        lines.append(f"{name}_total {value}")
+
+    typed = set()
+    for (name, labels), counts, total, count, buckets in histograms:
+        if name not in typed:
+            lines.append(f"# TYPE {name} histogram")
+            typed.add(name)
+        cumulative = 0
+        for bound, bucket_count in zip(list(buckets) + ["+Inf"], counts):
+            cumulative += bucket_count
+            lines.append(f"{name}_bucket{_labels(labels, le=bound)} {cumulative}")
+        lines.append(f"{name}_sum{_labels(labels)} {total}")
+        lines.append(f"{name}_count{_labels(labels)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+def server_timing(trace: Trace) -> str:
+    """
+    Server-Timing header value for a trace: one entry per stage plus the
+    total, and the cache outcome when known.
+    """
+    entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in trace.stage_totals().items()]
+    entries.append(f"total;dur={trace.elapsed() * 1000:.1f}")
+    if "cache" in trace.attributes:
+        entries.append(f'cache;desc="{trace.attributes["cache"]}"')
+    return ", ".join(entries)
@@ -11,6 +11,13 @@ create table products (
   source_url text,
   features jsonb,                    -- e.g. {"material": "wood", "dim": "6x6"}
   category text,                     -- e.g. "Bedroom"
+  description text,
+  search_document text,              -- Normalized text for lexical search, built at ingest time
+  summary text,                      -- Compact product line used in LLM prompts, built at ingest time
+  price_bucket text,                 -- Facet, e.g. "1000-1999"
+  collection text,                   -- Facet, e.g. "Zen"
+  colors text[],                     -- Facet
+  content_hash text,                 -- Hash of the row's content, lets ingestion skip unchanged products
   created_at timestamp with time zone default now()
 );
 
@@ -18,11 +25,14 @@ create table products (
 create table product_embeddings (
   id uuid primary key default gen_random_uuid(),
   product_id uuid references products(id) on delete cascade,
+  chunk_index int not null default 0, -- 0: title/features/category, then description and colors
   chunk_content text not null,       -- The text used for semantic search
-  embedding vector(768)              -- Matching Gemini embedding size (768)
+  content_hash text,                 -- Hash of model + dimensions + chunk_content, lets ingestion skip unchanged texts
+  embedding vector(768),             -- Matching Gemini embedding size (768)
+  constraint product_embeddings_product_id_chunk_index_key unique (product_id, chunk_index) -- one row per product chunk
 );
 
--- 4. Search Function (RPC)
+-- 4. Search Function (RPC): the best chunk of each product, best products first
 create or replace function match_products (
   query_embedding vector(768),
   match_threshold float,
@@ -34,18 +44,135 @@ returns table (
   chunk_content text,
   similarity float
 )
-language plpgsql stable
+language sql stable
 as $$
-begin
-  return query
-  select
-    pe.id,
-    pe.product_id,
-    pe.chunk_content,
-    1 - (pe.embedding <=> query_embedding) as similarity
-  from product_embeddings pe
-  where 1 - (pe.embedding <=> query_embedding) > match_threshold
-  order by similarity desc
+  select best.id, best.product_id, best.chunk_content, best.similarity
+  from (
+    select distinct on (pe.product_id)
+      pe.id,
+      pe.product_id,
+      pe.chunk_content,
+      1 - (pe.embedding <=> query_embedding) as similarity
+    from product_embeddings pe
+    where 1 - (pe.embedding <=> query_embedding) > match_threshold
+    order by pe.product_id, pe.embedding <=> query_embedding
+  ) best
+  order by best.similarity desc
   limit match_count;
+$$;
+
+-- 5. Catalog Version (bumped by ingestion so API workers can refresh in-process indexes)
+create table catalog_version (
+  id int primary key default 1 check (id = 1),
+  version bigint not null default 0,
+  updated_at timestamp with time zone default now()
+);
+
+insert into catalog_version (id, version) values (1, 0) on conflict (id) do nothing;
+
+create or replace function bump_catalog_version ()
+returns bigint
+language sql
+as $$
+  update catalog_version
+  set version = version + 1, updated_at = now()
+  where id = 1
+  returning version;
+$$;
+
+-- 6. Migration for databases created before content_hash / unique product_id
+-- (skipped once product_embeddings has chunk_index, see 8)
+alter table product_embeddings add column if not exists content_hash text;
+
+do $$
+begin
+  if not exists (
+    select 1 from information_schema.columns
+    where table_name = 'product_embeddings' and column_name = 'chunk_index'
+  ) then
+    delete from product_embeddings a
+    using product_embeddings b
+    where a.product_id = b.product_id and a.id < b.id;
+
+    if not exists (
+      select 1 from pg_constraint where conname = 'product_embeddings_product_id_key'
+    ) then
+      alter table product_embeddings add constraint product_embeddings_product_id_key unique (product_id);
+    end if;
+  end if;
+end;
+$$;
+
+-- 7. Migration for ingest-time enrichment: precomputed product columns and several embedding chunks per product
+alter table products add column if not exists description text;
+alter table products add column if not exists search_document text;
+alter table products add column if not exists summary text;
+alter table products add column if not exists price_bucket text;
+alter table products add column if not exists collection text;
+alter table products add column if not exists colors text[];
+
+create index if not exists products_price_bucket_idx on products (price_bucket);
+create index if not exists products_collection_idx on products (collection);
+create index if not exists products_colors_idx on products using gin (colors);
+
+alter table product_embeddings add column if not exists chunk_index int not null default 0;
+alter table product_embeddings drop constraint if exists product_embeddings_product_id_key;
+
+do $$
+begin
+  if not exists (
+    select 1 from pg_constraint where conname = 'product_embeddings_product_id_chunk_index_key'
+  ) then
+    alter table product_embeddings add constraint product_embeddings_product_id_chunk_index_key unique (product_id, chunk_index);
+  end if;
 end;
 $$;
+
+-- 8. Search Function returning ranked product rows (one round trip instead of match_products + products lookup)
+drop function if exists match_products_full(vector, float, int);
+
+create or replace function match_products_full (
+  query_embedding vector(768),
+  match_threshold float,
+  match_count int
+)
+returns table (
+  id uuid,
+  sku_id text,
+  title text,
+  price integer,
+  image_url text,
+  source_url text,
+  features jsonb,
+  category text,
+  description text,
+  summary text,
+  price_bucket text,
+  collection text,
+  colors text[],
+  similarity float
+)
+language sql stable
+as $$
+  select
+    p.id,
+    p.sku_id,
+    p.title,
+    p.price,
+    p.image_url,
+    p.source_url,
+    p.features,
+    p.category,
+    p.description,
+    p.summary,
+    p.price_bucket,
+    p.collection,
+    p.colors,
+    m.similarity
+  from match_products(query_embedding, match_threshold, match_count) m
+  join products p on p.id = m.product_id
+  order by m.similarity desc;
+$$;
+
+-- 9. Migration for row hashes: ingestion only rewrites products whose content changed
+alter table products add column if not exists content_hash text;
@@ -0,0 +1,72 @@
+import asyncio
+import functools
+import json
+from typing import Any, Awaitable, Callable, Dict
+
+from app.core import metrics
+from app.core.config import SINGLE_FLIGHT_ENABLED
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller starts the
+    computation, later callers await the same task, and everyone receives its
+    result (or exception). Nothing is kept once the call completes.
+    The LLM tokens the call spent are added to every caller's trace, so each
+    request is charged for the answer it got.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[str, asyncio.Task] = {}
+
+    def _done(self, key: str, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved even if every caller went away
+            task.exception()
+
+    @staticmethod
+    async def _run(fn: Callable[..., Awaitable[Any]], *args, **kwargs):
+        with metrics.token_scope() as usage:
+            return await fn(*args, **kwargs), usage
+
+    async def do(self, key: str, fn: Callable[..., Awaitable[Any]], *args, **kwargs):
+        task = self._calls.get(key)
+        coalesced = task is not None
+        if not coalesced:
+            task = asyncio.ensure_future(self._run(fn, *args, **kwargs))
+            self._calls[key] = task
+            task.add_done_callback(functools.partial(self._done, key))
+            metrics.inc(f"singleflight_{self.name}_calls")
+        else:
+            metrics.inc(f"singleflight_{self.name}_coalesced")
+        # Shielded so one caller cancelling does not cancel the others
+        result, usage = await asyncio.shield(task)
+        if coalesced:
+            # The first caller's trace already has them: the task runs in its context
+            metrics.add_token_usage(usage)
+        return result
+
+
+def _make_key(args, kwargs) -> str:
+    return json.dumps([args, kwargs], sort_keys=True, default=str)
+
+
+def single_flight(name: str):
+    """
+    Decorator applying a SingleFlight to an async function, keyed by its arguments.
+    """
+    def decorator(fn):
+        if not SINGLE_FLIGHT_ENABLED:
+            return fn
+        flight = SingleFlight(name)
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            return await flight.do(_make_key(args, kwargs), fn, *args, **kwargs)
+
+        wrapper.flight = flight
+        return wrapper
+    return decorator
@@ -1,24 +1,116 @@
-from fastapi import FastAPI, HTTPException, Query, Request
+import time
+_import_started = time.perf_counter()
+
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Any, Dict, List, Literal, Optional
+from contextlib import asynccontextmanager
+import asyncio
+import hashlib
+import json
 import logging
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
 
+from app.core import admission, metrics, lifecycle
+from app.core.db import close_async_client
 from app.services.product_service import ProductService
-from app.services import llm, rag
+from app.services import llm, rag, catalog, context_builder, vector_index, lexical_index, query_router
+from app.services.lexical_index import reciprocal_rank_fusion
+from app.core.config import (
+    QUERY_ROUTER_ENABLED,
+    METRICS_ENABLED,
+    SERVER_TIMING_ENABLED,
+    WARMUP_ENABLED,
+    IMPORT_BUDGET_SECONDS,
+    RATE_LIMIT_STORAGE_URI,
+    CHAT_RATE_LIMIT,
+    DEGRADE_SKIP_EXPAND,
+    DEGRADE_RETRIEVAL_ONLY,
+)
+from app.services.embedders import get_embedder
+from app.services.generators import get_generator
+from app.services.stores import get_store
+from app.services.response_cache import cache as response_cache
+from app.services.product_cache import cache as product_cache
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-limiter = Limiter(key_func=get_remote_address)
-app = FastAPI(title="Product Discovery Assistant")
+async def _warm_store():
+    await get_store().warm_up()
+
+async def _warm_generator():
+    await get_generator().warm_up()
+
+async def _warm_product_cache():
+    # The home page's request
+    await ProductService.get_products(20, fields="summary")
+
+def startup_hooks():
+    """
+    What runs before the app starts serving. Clients are otherwise created
+    on first use; warming them up moves that cost (imports, connections,
+    loading the memory catalog) out of the first requests.
+    """
+    hooks = []
+    if WARMUP_ENABLED:
+        hooks += [("store", _warm_store), ("embedder", get_embedder), ("generator", _warm_generator)]
+    # The in-process indexes (each is a no-op unless enabled in config).
+    # Without them search falls back to the database.
+    hooks += [("vector_index", vector_index.load), ("lexical_index", lexical_index.load)]
+    if WARMUP_ENABLED and product_cache is not None:
+        hooks.append(("product_cache", _warm_product_cache))
+    return hooks
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    await lifecycle.run_hooks(startup_hooks())
+    logger.info(f"Startup finished in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    # Reload the indexes and drop cached results whenever ingestion bumps the catalog version
+    listeners = [vector_index.load, lexical_index.load, context_builder.clear]
+    listeners += [cache.clear for cache in (response_cache, product_cache) if cache is not None]
+    for callback in listeners:
+        catalog.on_change(callback)
+    watcher = asyncio.create_task(catalog.watch())
+    yield
+    watcher.cancel()
+    # Unregistered so a restarted app (e.g. in tests) does not run them twice
+    for callback in listeners:
+        catalog.remove_listener(callback)
+    await close_async_client()
+
+# Counters live in RATE_LIMIT_STORAGE_URI; if a shared storage is unreachable, fall back to per-worker memory
+limiter = Limiter(key_func=get_remote_address, storage_uri=RATE_LIMIT_STORAGE_URI, in_memory_fallback_enabled=True)
+app = FastAPI(title="Product Discovery Assistant", lifespan=lifespan)
 app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+
+def rate_limit_exceeded(request: Request, exc: RateLimitExceeded):
+    response = _rate_limit_exceeded_handler(request, exc)
+    try:
+        limit, keys = request.state.view_rate_limit
+        reset_at = limiter.limiter.get_window_stats(limit, *keys).reset_time
+        response.headers["Retry-After"] = str(max(1, int(reset_at - time.time()) + 1))
+    except Exception as e:
+        logger.debug(f"No Retry-After for rate limited request: {e}")
+    return response
+
+def overloaded(request: Request, exc: admission.Overloaded):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "The assistant is busy, please try again shortly."},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+app.add_exception_handler(RateLimitExceeded, rate_limit_exceeded)
+app.add_exception_handler(admission.Overloaded, overloaded)
 app.add_middleware(SlowAPIMiddleware)
 
 # Configure CORS
@@ -35,8 +127,30 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "Server-Timing"],
 )
 
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """
+    Opens a trace for the request, records its duration per route and,
+    when SERVER_TIMING_ENABLED, reports the stage timings in a Server-Timing
+    header. Streaming responses only include the stages run before the
+    first byte.
+    """
+    trace, token = metrics.start_trace()
+    try:
+        response = await call_next(request)
+    finally:
+        metrics.end_trace(token)
+    route = request.scope.get("route")
+    metrics.observe(metrics.REQUEST_HISTOGRAM, trace.elapsed(), route=getattr(route, "path", "unmatched"), method=request.method)
+    if SERVER_TIMING_ENABLED:
+        response.headers["Server-Timing"] = metrics.server_timing(trace)
+    if trace.stages:
+        logger.debug(f"{request.method} {request.url.path} stages={trace.stage_totals()} attributes={trace.attributes}")
+    return response
+
 class Product(BaseModel):
     id: str
     sku_id: str
@@ -52,83 +166,322 @@ class Product(BaseModel):
 async def read_root():
     return {"message": "Welcome to Product Discovery Assistant API"}
 
+if METRICS_ENABLED:
+    @app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+    async def get_metrics():
+        """
+        Counters and latency histograms in the Prometheus text format.
+        """
+        return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+def _etag(data) -> str:
+    """
+    Weak ETag derived from the response content.
+    """
+    digest = hashlib.sha1(json.dumps(data, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+    return f'W/"{digest}"'
+
+def _not_modified(request: Request, etag: str) -> bool:
+    """
+    Whether If-None-Match lists `etag` or is "*". Tags are compared whole,
+    with the weak comparison GET requests use (W/ prefixes ignored).
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return "*" in tags or etag.removeprefix("W/") in tags
+
 @app.get("/products", response_model=List[Product])
-@limiter.limit("100/minute")
 async def get_products(
     request: Request,
+    response: Response,
     limit: int = Query(20, ge=1, le=100),
-    offset: int = Query(0, ge=0)
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="Keyset pagination: last product ID of the previous page, empty for the first page"),
+    fields: Literal["full", "summary"] = Query("full", description="'summary' omits description and features")
 ):
     """
     List products with pagination.
+    The ID to pass as `cursor` for the next page is returned in the X-Next-Cursor header.
     """
     try:
-        products_data = ProductService.get_products(limit, offset)
-        return products_data
+        products_data = await ProductService.get_products(limit, offset, cursor, fields)
     except Exception as e:
         logger.error(f"Error fetching products: {e}")
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
+    headers = {"ETag": _etag(products_data)}
+    if len(products_data) == limit:
+        headers["X-Next-Cursor"] = products_data[-1]["id"]
+    if _not_modified(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return products_data
+
 @app.get("/products/{product_id}", response_model=Product)
-async def get_product(product_id: str):
+async def get_product(product_id: str, request: Request, response: Response):
     """
     Get a single product by ID.
     """
     try:
-        product_data = ProductService.get_product_by_id(product_id)
+        product_data = await ProductService.get_product_by_id(product_id)
         if not product_data:
             raise HTTPException(status_code=404, detail="Product not found")
-        return product_data
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error fetching product {product_id}: {e}")
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
+    etag = _etag(product_data)
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return product_data
+
 # --- Chat / RAG Endpoint ---
 
 class ChatRequest(BaseModel):
     query: str = Field(..., max_length=1000)
 
+class RankedProduct(Product):
+    # Cosine similarity to the query; None for products matched only lexically
+    similarity: Optional[float] = None
+
 class ChatResponse(BaseModel):
     response: str
-    products: List[Product]
+    products: List[RankedProduct]
+    metadata: Dict[str, Any] = Field(default_factory=dict)
+
+async def _cached_response(query: str):
+    """
+    Looks the query up in the response cache.
+    Returns (cached_response_or_None, query_embedding_or_None).
+    """
+    if response_cache is None:
+        return None, None
+    with metrics.span("cache_lookup"):
+        cached = response_cache.get_exact(query)
+    if cached is not None:
+        metrics.annotate(cache="exact")
+        return {**cached, "metadata": {**cached["metadata"], "cache": "exact", "tokens": metrics.token_usage()}}, None
+    query_embedding = await rag.embed_query(query)
+    if query_embedding:
+        with metrics.span("cache_lookup"):
+            cached = response_cache.get_semantic(query_embedding)
+        if cached is not None:
+            cached = {**cached, "metadata": {**cached["metadata"], "cache": "semantic", "tokens": metrics.token_usage()}}
+    if cached is None:
+        # Missed both tiers (or the query could not be embedded): the pipeline runs
+        metrics.inc("chat_cache_misses")
+    metrics.annotate(cache="semantic" if cached is not None else "miss")
+    return cached, query_embedding
+
+async def _search_with_expansion(query: str, query_embedding=None):
+    """
+    Runs LLM expansion concurrently with a search on the raw query, then
+    merges the raw-query results with those of the expanded query.
+    Returns (product rows, expanded query).
+    """
+    raw_search = asyncio.create_task(rag.search_products(query, query_embedding=query_embedding))
+    try:
+        expanded_query = await llm.expand_query(query)
+        logger.info(f"Original Query: {query} -> Expanded: {expanded_query}")
+
+        expanded_results = await rag.search_products(expanded_query) if expanded_query != query else []
+        raw_results = await raw_search
+    finally:
+        # If expansion or the expanded search failed, don't leave the raw
+        # search running with nobody to collect its result
+        raw_search.cancel()
+        await asyncio.gather(raw_search, return_exceptions=True)
+
+    rows_by_id = {p['id']: p for p in raw_results + expanded_results}
+    fused = reciprocal_rank_fusion([[p['id'] for p in expanded_results], [p['id'] for p in raw_results]])
+    limit = max(len(expanded_results), len(raw_results))
+    return [rows_by_id[product_id] for product_id in fused][:limit], expanded_query
+
+async def _retrieve_products(query: str, query_embedding=None):
+    """
+    Routes the query, then runs query expansion (if needed) and vector search.
+    Searches for the query as typed reuse `query_embedding` when given.
+    Returns (raw product rows, validated RankedProduct models, response metadata).
+    """
+    # 1. Route / Expand Query
+    if QUERY_ROUTER_ENABLED:
+        with metrics.span("route"):
+            metadata = query_router.route(query)
+    else:
+        metadata = {"route": query_router.ROUTE_EXPAND, "matched": []}
+
+    # Every LLM slot is busy: don't queue an expansion call, search the query as typed
+    skip_expand = metadata["route"] == query_router.ROUTE_EXPAND and DEGRADE_SKIP_EXPAND and admission.llm_busy()
+    if skip_expand:
+        metrics.inc("admission_degraded_skip_expand")
+        metadata.setdefault("degraded", []).append("skip_expand")
+
+    # 2. Vector Search
+    # Now async!
+    if metadata["route"] == query_router.ROUTE_DIRECT or skip_expand:
+        products_data = await rag.search_products(query, query_embedding=query_embedding)
+    elif QUERY_ROUTER_ENABLED:
+        products_data, metadata["expanded_query"] = await _search_with_expansion(query, query_embedding)
+    else:
+        expanded_query = await llm.expand_query(query)
+        logger.info(f"Original Query: {query} -> Expanded: {expanded_query}")
+        products_data = await rag.search_products(expanded_query)
+        metadata["expanded_query"] = expanded_query
+    
+    # Convert to Pydantic models (handling potential missing fields safely)
+    products = []
+    for p in products_data:
+        try:
+            products.append(RankedProduct(**p))
+        except Exception as e:
+            logger.warning(f"Skipping invalid product data: {e}")
+    return products_data, products, metadata
+
+def _store_response(query: str, query_embedding, result: dict):
+    # Only cache full answers grounded in actual products
+    if response_cache is not None and result["products"] and "degraded" not in result["metadata"]:
+        response_cache.put(query, query_embedding, result)
+
+def _check_token_budget(request: Request):
+    """
+    Rejects the request with 429 if the client has spent its LLM token budget.
+    """
+    if admission.token_budget is None or not limiter.enabled:
+        return
+    client = get_remote_address(request)
+    if not admission.token_budget.allowed(client):
+        metrics.inc("admission_token_budget_exceeded")
+        raise HTTPException(
+            status_code=429,
+            detail="Token budget exceeded, please try again later.",
+            headers={"Retry-After": str(admission.token_budget.retry_after(client))},
+        )
+
+def _charge_tokens(request: Request):
+    if admission.token_budget is not None and limiter.enabled:
+        usage = metrics.token_usage()
+        admission.token_budget.charge(get_remote_address(request), usage["prompt"] + usage["output"])
+
+def _check_capacity():
+    """
+    Sheds the request up front (503) when generation would be shed anyway
+    and retrieval-only answers are disabled.
+    """
+    if not DEGRADE_RETRIEVAL_ONLY and admission.llm_saturated():
+        raise admission.llm_slots.shed()
+
+async def _generate_or_degrade(query: str, products_data: list, metadata: dict) -> str:
+    try:
+        return await llm.generate_response(query, products_data)
+    except admission.Overloaded:
+        if not DEGRADE_RETRIEVAL_ONLY:
+            raise
+        metrics.inc("admission_degraded_retrieval_only")
+        metadata.setdefault("degraded", []).append("retrieval_only")
+        return llm.RETRIEVAL_ONLY_MESSAGE
 
 @app.post("/chat", response_model=ChatResponse)
-@limiter.limit("5/minute")
+@limiter.limit(CHAT_RATE_LIMIT)
 async def chat_endpoint(request: Request, chat_request: ChatRequest):
     """
     Handle chat requests using RAG pipeline:
-    1. Expand Query (LLM)
+    0. Response Cache (exact query, then semantically similar query)
+    1. Route Query (local), Expand Query (LLM) only for abstract queries
     2. Vector Search (Supabase)
     3. Synthesize Response (LLM)
+    Under LLM pressure expansion is skipped, and the response may be
+    retrieval-only (metadata "degraded") or shed with 503 and Retry-After.
     """
+    _check_token_budget(request)
     try:
-        # 1. Expand Query
-        expanded_query = await llm.expand_query(chat_request.query)
-        logger.info(f"Original Query: {chat_request.query} -> Expanded: {expanded_query}")
-        
-        # 2. Vector Search
-        # Now async!
-        products_data = await rag.search_products(expanded_query)
-        
-        # Convert to Pydantic models (handling potential missing fields safely)
-        products = []
-        for p in products_data:
-            try:
-                products.append(Product(**p))
-            except Exception as e:
-                logger.warning(f"Skipping invalid product data: {e}")
+        cached, query_embedding = await _cached_response(chat_request.query)
+        if cached is not None:
+            return cached
+
+        _check_capacity()
+        products_data, products, metadata = await _retrieve_products(chat_request.query, query_embedding)
 
         # 3. Synthesis
-        response_text = await llm.generate_response(chat_request.query, products_data)
+        response_text = await _generate_or_degrade(chat_request.query, products_data, metadata)
         
-        return {
+        result = {
             "response": response_text,
-            "products": products
+            "products": products,
+            "metadata": metadata
         }
+        _store_response(chat_request.query, query_embedding, result)
+        _charge_tokens(request)
+        return {**result, "metadata": {**metadata, "tokens": metrics.token_usage()}}
 
+    except admission.Overloaded:
+        raise
     except Exception as e:
         logger.error(f"Error in chat endpoint: {e}")
         # Sanitize error message for client
         raise HTTPException(status_code=500, detail="An error occurred while processing your request.")
+
+def _event(event_type: str, **payload) -> str:
+    return json.dumps({"type": event_type, **payload}) + "\n"
+
+@app.post("/chat/stream")
+@limiter.limit(CHAT_RATE_LIMIT)
+async def chat_stream_endpoint(request: Request, chat_request: ChatRequest):
+    """
+    Streaming variant of /chat. Responds with newline-delimited JSON events:
+    - {"type": "products", "products": [...]} as soon as retrieval finishes
+    - {"type": "token", "text": "..."} for each chunk of the synthesized response
+    - {"type": "done", "metadata": {...}} at the end, or {"type": "error", "detail": "..."} on failure
+    Shed with 503 and Retry-After before streaming under LLM pressure, like /chat.
+    """
+    _check_token_budget(request)
+    _check_capacity()
+
+    async def events():
+        try:
+            cached, query_embedding = await _cached_response(chat_request.query)
+            if cached is not None:
+                yield _event("products", products=[p.model_dump() for p in cached["products"]])
+                yield _event("token", text=cached["response"])
+                yield _event("done", metadata=cached["metadata"])
+                return
+
+            products_data, products, metadata = await _retrieve_products(chat_request.query, query_embedding)
+            yield _event("products", products=[p.model_dump() for p in products])
+
+            # 3. Synthesis, forwarded as it is generated
+            parts = []
+            try:
+                async for text in llm.stream_response(chat_request.query, products_data):
+                    parts.append(text)
+                    yield _event("token", text=text)
+            except admission.Overloaded as e:
+                if not DEGRADE_RETRIEVAL_ONLY:
+                    yield _event("error", detail="The assistant is busy, please try again shortly.", retry_after=e.retry_after)
+                    return
+                metrics.inc("admission_degraded_retrieval_only")
+                metadata.setdefault("degraded", []).append("retrieval_only")
+                parts.append(llm.RETRIEVAL_ONLY_MESSAGE)
+                yield _event("token", text=llm.RETRIEVAL_ONLY_MESSAGE)
+            _charge_tokens(request)
+            yield _event("done", metadata={**metadata, "tokens": metrics.token_usage()})
+
+            _store_response(chat_request.query, query_embedding, {
+                "response": "".join(parts).strip(),
+                "products": products,
+                "metadata": metadata
+            })
+
+        except Exception as e:
+            logger.error(f"Error in chat stream endpoint: {e}")
+            yield _event("error", detail="An error occurred while processing your request.")
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+IMPORT_SECONDS = time.perf_counter() - _import_started
+if IMPORT_SECONDS > IMPORT_BUDGET_SECONDS:
+    logger.warning(f"Importing app.main took {IMPORT_SECONDS:.2f}s, over the {IMPORT_BUDGET_SECONDS:.2f}s budget")
@@ -0,0 +1,125 @@
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import CATALOG_POLL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Last catalog version seen by this process
+_version: Optional[int] = None
+_listeners: List[Callable[[], None]] = []
+
+# Longest wait between version checks while the database is unreachable
+MAX_BACKOFF_SECONDS = 600
+
+
+def current_version() -> int:
+    """
+    Last catalog version seen by this process (0 until the first check).
+    """
+    return _version or 0
+
+
+def on_change(callback: Callable[[], None]):
+    """
+    Registers a callback to run whenever the catalog changes.
+    """
+    _listeners.append(callback)
+
+
+def remove_listener(callback: Callable[[], None]):
+    """
+    Unregisters a callback added with on_change.
+    """
+    if callback in _listeners:
+        _listeners.remove(callback)
+
+
+def notify_changed():
+    """
+    Runs every registered callback. Used directly when the catalog is changed
+    in-process, and by the watcher when another process bumped the version.
+    """
+    for callback in _listeners:
+        try:
+            callback()
+        except Exception as e:
+            logger.error(f"Error in catalog change listener {callback}: {e}")
+
+
+def bump_version():
+    """
+    Increments the shared catalog version. Called by ingestion once it has
+    written new products or embeddings.
+    """
+    from app.services.stores import get_store
+
+    try:
+        get_store().bump_version()
+    except Exception as e:
+        logger.error(f"Error bumping catalog version: {e}")
+    notify_changed()
+
+
+def fetch_all_rows(table: str, columns: str = "*") -> List[Dict[str, Any]]:
+    """
+    Reads every row of a table from the configured store.
+    """
+    from app.services.stores import get_store
+
+    return get_store().fetch_all_rows(table, columns)
+
+
+def current_snapshot():
+    """
+    The memory-mapped catalog snapshot served by the configured store, or
+    None when the store is not snapshot-backed.
+    """
+    from app.services.stores import get_store
+
+    return get_store().snapshot()
+
+
+def fetch_version() -> int:
+    from app.services.stores import get_store
+
+    return get_store().fetch_version()
+
+
+def check_for_updates() -> bool:
+    """
+    Compares the shared catalog version with the last one seen and notifies
+    listeners if it moved. Returns True when a change was detected.
+    """
+    global _version
+    current = fetch_version()
+    if _version is None:
+        _version = current
+        return False
+    if current == _version:
+        return False
+    logger.info(f"Catalog version changed {_version} -> {current}")
+    _version = current
+    notify_changed()
+    return True
+
+
+async def watch(interval: int = CATALOG_POLL_SECONDS):
+    """
+    Background task that polls the catalog version for the lifetime of the app.
+    Failed checks are retried with a backoff doubling up to
+    MAX_BACKOFF_SECONDS, so a database outage does not stop the watcher.
+    """
+    failures = 0
+    while True:
+        try:
+            await run_in_threadpool(check_for_updates)
+            failures = 0
+        except Exception as e:
+            failures += 1
+            logger.warning(f"Catalog version check failed ({failures} in a row): {e}")
+        delay = interval if not failures else min(interval * 2 ** failures, MAX_BACKOFF_SECONDS)
+        await asyncio.sleep(delay)
@@ -0,0 +1,98 @@
+import logging
+import threading
+from typing import Any, Dict, List, Tuple
+
+from app.core.config import LLM_CONTEXT_TOKEN_BUDGET
+
+logger = logging.getLogger(__name__)
+
+# Characters of description kept in a product summary
+SUMMARY_DESCRIPTION_CHARS = 160
+
+# Feature attributes and colors kept in a product summary
+SUMMARY_MAX_FEATURES = 4
+SUMMARY_MAX_COLORS = 3
+
+# Summaries are computed once per product and reused by every prompt that
+# includes it; cleared when the catalog changes.
+_summaries: Dict[Any, str] = {}
+_lock = threading.Lock()
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token count (about 4 characters per token), for budgeting prompts
+    and for backends that do not report usage.
+    """
+    return max(1, len(text) // 4) if text else 0
+
+
+def _truncate(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    if len(text) <= limit:
+        return text
+    return text[:limit].rsplit(" ", 1)[0].rstrip(",.;:") + "..."
+
+
+def summarize_product(product: Dict[str, Any]) -> str:
+    """
+    One compact line describing a product: title, price, category, the first
+    few features and colors, and the start of the description.
+    """
+    features = product.get("features") or {}
+    if isinstance(features, dict):
+        attributes, colors = features.get("attributes") or [], features.get("colors") or []
+    else:
+        attributes, colors = list(features), []
+
+    parts = [f"{product['title']} (Price: {product['price']})"]
+    if product.get("category"):
+        parts.append(product["category"].title())
+    if attributes:
+        parts.append(", ".join(attributes[:SUMMARY_MAX_FEATURES]))
+    if colors:
+        parts.append("Colors: " + ", ".join(colors[:SUMMARY_MAX_COLORS]))
+    summary = " | ".join(parts)
+    if product.get("description"):
+        summary += ": " + _truncate(product["description"], SUMMARY_DESCRIPTION_CHARS)
+    return summary
+
+
+def product_summary(product: Dict[str, Any]) -> str:
+    """
+    The product's precomputed summary: the row's own `summary` field when
+    ingestion stored one, otherwise summarize_product, computed once per ID.
+    """
+    if product.get("summary"):
+        return product["summary"]
+    key = product.get("id") or product["title"]
+    summary = _summaries.get(key)
+    if summary is None:
+        summary = summarize_product(product)
+        with _lock:
+            _summaries[key] = summary
+    return summary
+
+
+def clear():
+    with _lock:
+        _summaries.clear()
+
+
+def build_context(products: List[Dict[str, Any]], budget_tokens: int = LLM_CONTEXT_TOKEN_BUDGET) -> Tuple[str, int]:
+    """
+    The product list for the response prompt, one summary line per product in
+    rank order, stopping before the line that would exceed `budget_tokens`.
+    The best product is always included. Returns (context, estimated tokens).
+    """
+    lines = []
+    used = 0
+    for product in products:
+        line = f"- {product_summary(product)}"
+        tokens = estimate_tokens(line)
+        if lines and used + tokens > budget_tokens:
+            logger.debug(f"Context budget of {budget_tokens} tokens reached, dropped {len(products) - len(lines)} product(s)")
+            break
+        lines.append(line)
+        used += tokens
+    return "\n".join(lines), used
@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+DEFAULT_STATE_PATH = os.path.join(os.path.dirname(__file__), 'crawl_state.sqlite')
+
+# Commit after this many writes so a crashed crawl keeps most of its progress
+COMMIT_EVERY = 100
+
+
+def content_hash(body):
+    """Hash of a fetched page body, used to skip parsing pages that did not change."""
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    return hashlib.sha256(body).hexdigest()
+
+
+class CrawlState:
+    """
+    Persistent per-URL crawl state for incremental re-scrapes.
+
+    Stores the ETag, Last-Modified and content hash of every product page seen,
+    together with the product parsed from it, so the next crawl can send
+    conditional requests and only re-parse pages that actually changed.
+    """
+
+    def __init__(self, path=DEFAULT_STATE_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("""
+            create table if not exists pages (
+                url text primary key,
+                etag text,
+                last_modified text,
+                content_hash text,
+                product text,
+                last_seen real
+            )
+        """)
+        self.conn.commit()
+        self.run_started = time.time()
+        self.pending_writes = 0
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    def get(self, url):
+        return self.conn.execute("select * from pages where url = ?", (url,)).fetchone()
+
+    def conditional_headers(self, url):
+        """If-None-Match / If-Modified-Since headers for a previously seen URL."""
+        row = self.get(url)
+        headers = {}
+        if row is not None:
+            if row["etag"]:
+                headers["If-None-Match"] = row["etag"]
+            if row["last_modified"]:
+                headers["If-Modified-Since"] = row["last_modified"]
+        return headers
+
+    def _written(self):
+        self.pending_writes += 1
+        if self.pending_writes >= COMMIT_EVERY:
+            self.conn.commit()
+            self.pending_writes = 0
+
+    def touch(self, url, etag=None, last_modified=None):
+        """Marks an unchanged URL as seen in this run, refreshing its validators if the server sent new ones."""
+        self.conn.execute(
+            """
+            update pages set
+                etag = coalesce(?, etag),
+                last_modified = coalesce(?, last_modified),
+                last_seen = ?
+            where url = ?
+            """,
+            (etag, last_modified, time.time(), url),
+        )
+        self._written()
+
+    def record(self, url, etag, last_modified, page_hash, product):
+        self.conn.execute(
+            """
+            insert into pages (url, etag, last_modified, content_hash, product, last_seen)
+            values (?, ?, ?, ?, ?, ?)
+            on conflict(url) do update set
+                etag = excluded.etag,
+                last_modified = excluded.last_modified,
+                content_hash = excluded.content_hash,
+                product = excluded.product,
+                last_seen = excluded.last_seen
+            """,
+            (url, etag, last_modified, page_hash, json.dumps(product, ensure_ascii=False), time.time()),
+        )
+        self._written()
+
+    def product(self, url):
+        row = self.get(url)
+        return json.loads(row["product"]) if row is not None and row["product"] else None
+
+    def products(self):
+        """Yields every product currently known, i.e. the full catalog as of the last crawl."""
+        rows = self.conn.execute("select product from pages where product is not null order by url")
+        for row in rows:
+            yield json.loads(row["product"])
+
+    def pop_unseen(self):
+        """Removes and returns the products of URLs that were not seen during this run."""
+        rows = self.conn.execute(
+            "select url, product from pages where last_seen < ?", (self.run_started,)
+        ).fetchall()
+        self.conn.execute("delete from pages where last_seen < ?", (self.run_started,))
+        self.conn.commit()
+        return [json.loads(row["product"]) if row["product"] else {"url": row["url"]} for row in rows]
@@ -0,0 +1,126 @@
+import hashlib
+import logging
+import re
+import threading
+import time
+from typing import List, Optional
+
+import numpy as np
+
+from app.core.config import EMBEDDING_BACKEND, LOCAL_EMBEDDING_LATENCY_MS
+from app.core.gemini import get_genai
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL = "models/gemini-embedding-001"
+EMBEDDING_DIMENSIONS = 768
+
+
+class Embedder:
+    """
+    Turns texts into vectors. `model` and `dimensions` identify the vector
+    space, so vectors from different embedders are never mixed up (see
+    embedding_store.embedding_key).
+    """
+
+    model: str
+    dimensions: int
+
+    def embed(self, texts: List[str], task_type: str = "retrieval_document") -> List[Optional[List[float]]]:
+        raise NotImplementedError
+
+
+class GeminiEmbedder(Embedder):
+    """
+    Gemini embedding API. One request per call, so callers should batch.
+    """
+
+    def __init__(self, model: str = EMBEDDING_MODEL, dimensions: int = EMBEDDING_DIMENSIONS):
+        self._genai = get_genai()
+        self.model = model
+        self.dimensions = dimensions
+
+    def embed(self, texts: List[str], task_type: str = "retrieval_document") -> List[Optional[List[float]]]:
+        result = self._genai.embed_content(
+            model=self.model,
+            content=texts,
+            task_type=task_type,
+            output_dimensionality=self.dimensions
+        )
+        return result['embedding']
+
+
+class HashingEmbedder(Embedder):
+    """
+    Deterministic offline embedder for tests and benchmarks.
+
+    Words and character trigrams are hashed into `dimensions - 1` buckets
+    with a random sign (the "hashing trick"). Texts sharing words or word
+    fragments get a high cosine similarity, which is enough for retrieval to
+    behave sensibly without a model.
+
+    Dense models score unrelated texts around 0.5 rather than 0, and the
+    match threshold and cache distance are tuned for that. The last
+    dimension is a constant component that lifts the similarity of unrelated
+    texts from 0 to `baseline`, so the same settings work here.
+
+    `latency_ms` is slept once per embed() call, like one API round trip.
+    """
+
+    model = "local/hashing-v1"
+
+    def __init__(self, dimensions: int = EMBEDDING_DIMENSIONS, baseline: float = 0.5, latency_ms: float = LOCAL_EMBEDDING_LATENCY_MS):
+        self.dimensions = dimensions
+        self.baseline = baseline
+        self.latency = latency_ms / 1000
+
+    def _features(self, text: str) -> List[str]:
+        words = re.findall(r"[a-z0-9]+", text.lower())
+        features = [f"w:{w}" for w in words]
+        for word in words:
+            padded = f"#{word}#"
+            features.extend(f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2))
+        return features
+
+    def embed_one(self, text: str) -> List[float]:
+        buckets = self.dimensions - 1
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for feature in self._features(text):
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % buckets
+            # Whole words weigh more than their fragments
+            weight = 2.0 if feature.startswith("w:") else 1.0
+            vector[bucket] += weight if digest[4] & 1 else -weight
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector *= np.sqrt(1 - self.baseline) / norm
+        vector[-1] = np.sqrt(self.baseline)
+        return vector.tolist()
+
+    def embed(self, texts: List[str], task_type: str = "retrieval_document") -> List[Optional[List[float]]]:
+        if self.latency:
+            time.sleep(self.latency)
+        return [self.embed_one(text) for text in texts]
+
+
+BACKENDS = {
+    "gemini": GeminiEmbedder,
+    "local": HashingEmbedder,
+}
+
+_embedder: Optional[Embedder] = None
+_lock = threading.Lock()
+
+
+def get_embedder() -> Embedder:
+    """
+    Returns the embedder selected by EMBEDDING_BACKEND, creating it on first use.
+    """
+    global _embedder
+    if _embedder is None:
+        with _lock:
+            if _embedder is None:
+                if EMBEDDING_BACKEND not in BACKENDS:
+                    raise ValueError(f"Unknown EMBEDDING_BACKEND '{EMBEDDING_BACKEND}', expected one of {sorted(BACKENDS)}")
+                _embedder = BACKENDS[EMBEDDING_BACKEND]()
+    return _embedder
@@ -0,0 +1,87 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
+from app.core import metrics
+
+logger = logging.getLogger(__name__)
+
+EmbedBatchFn = Callable[[List[str]], List[Optional[List[float]]]]
+
+
+class EmbeddingBatcher:
+    """
+    Micro-batches embedding requests.
+
+    Texts submitted within `max_wait_ms` of each other (or until
+    `max_batch_size` texts are waiting) are embedded with a single call to
+    `embed_batch`, and each caller gets back its own vector. Works for both
+    coroutines (`embed`) and worker threads (`embed_blocking`), so the API and
+    ingestion can share it.
+    """
+
+    def __init__(self, embed_batch: EmbedBatchFn, max_batch_size: int = 32, max_wait_ms: float = 5, max_concurrent_batches: int = 4):
+        self.embed_batch = embed_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._pending: List[Tuple[str, Future]] = []
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent_batches, thread_name_prefix="embed-batch")
+
+    def submit(self, text: str) -> Future:
+        future = Future()
+        batch = None
+        with self._lock:
+            self._pending.append((text, future))
+            if len(self._pending) >= self.max_batch_size:
+                batch = self._take()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.max_wait, self._flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if batch:
+            self._executor.submit(self._run, batch)
+        return future
+
+    async def embed(self, text: str) -> Optional[List[float]]:
+        return await asyncio.wrap_future(self.submit(text))
+
+    def embed_blocking(self, text: str) -> Optional[List[float]]:
+        return self.submit(text).result()
+
+    def _take(self) -> List[Tuple[str, Future]]:
+        # Caller holds self._lock
+        batch, self._pending = self._pending, []
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        return batch
+
+    def _flush(self):
+        with self._lock:
+            batch = self._take()
+        if batch:
+            self._executor.submit(self._run, batch)
+
+    def _run(self, batch: List[Tuple[str, Future]]):
+        # Drop callers that gave up (cancelled); the rest can no longer be
+        # cancelled, so setting their results below cannot fail
+        batch = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        metrics.inc("embedding_batches")
+        metrics.inc("embedding_batched_texts", len(batch))
+        try:
+            vectors = self.embed_batch([text for text, _ in batch])
+            if len(vectors) != len(batch):
+                raise ValueError(f"Expected {len(batch)} embeddings, got {len(vectors)}")
+        except Exception as e:
+            logger.error(f"Error embedding batch of {len(batch)}: {e}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), vector in zip(batch, vectors):
+            future.set_result(vector)
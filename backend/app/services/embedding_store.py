@@ -0,0 +1,58 @@
+import hashlib
+import os
+import sqlite3
+import threading
+
+import numpy as np
+
+DEFAULT_STORE_PATH = os.path.join(os.path.dirname(__file__), 'embedding_store.sqlite')
+
+
+def embedding_key(text, model, dimensions):
+    """
+    Content address of an embedding: the same text embedded by the same model
+    at the same dimensionality always yields the same vector.
+    """
+    return hashlib.sha256(f"{model}\n{dimensions}\n{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """
+    On-disk, content-addressed cache of embedding vectors, stored as float32 blobs.
+    """
+
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("create table if not exists embeddings (key text primary key, vector blob not null)")
+        self.conn.commit()
+        # Ingestion batches run on a thread pool and share one connection
+        self.lock = threading.Lock()
+
+    def close(self):
+        self.conn.close()
+
+    def get_many(self, keys):
+        """Returns {key: vector} for the keys that are stored."""
+        found = {}
+        keys = list(keys)
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            with self.lock:
+                rows = self.conn.execute(
+                    f"select key, vector from embeddings where key in ({placeholders})", chunk
+                ).fetchall()
+            for key, blob in rows:
+                found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+        return found
+
+    def put_many(self, items):
+        """Stores {key: vector}."""
+        with self.lock:
+            self.conn.executemany(
+                "insert or replace into embeddings (key, vector) values (?, ?)",
+                [(key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in items.items()],
+            )
+            self.conn.commit()
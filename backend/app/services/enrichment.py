@@ -0,0 +1,101 @@
+import re
+from typing import Any, Dict, List, Optional
+
+from app.services.context_builder import summarize_product
+from app.services.query_router import COLLECTIONS
+
+# Upper bounds of the price facet buckets; prices at or above the last bound
+# fall in the open-ended bucket
+PRICE_BUCKET_BOUNDS = [1000, 2000, 3000]
+
+# Colors listed in the colors chunk
+CHUNK_MAX_COLORS = 10
+
+
+def normalize_text(text: str) -> str:
+    """
+    Lowercased text with punctuation removed and whitespace collapsed.
+    """
+    return " ".join(re.findall(r"[a-z0-9]+(?:['/][a-z0-9]+)*", text.lower()))
+
+
+def price_bucket(price: Optional[int]) -> Optional[str]:
+    """
+    Facet label for a price, e.g. "1000-1999" or "3000+".
+    """
+    if price is None:
+        return None
+    lower = 0
+    for bound in PRICE_BUCKET_BOUNDS:
+        if price < bound:
+            return f"under-{bound}" if lower == 0 else f"{lower}-{bound - 1}"
+        lower = bound
+    return f"{lower}+"
+
+
+def collection_of(title: str) -> Optional[str]:
+    """
+    The collection named in a product title (longest match wins), e.g.
+    "Safari Chic" for "Safari Chic Co-ord Set".
+    """
+    words = f" {normalize_text(title)} "
+    matches = [name for name in COLLECTIONS if f" {name} " in words]
+    return max(matches, key=len).title() if matches else None
+
+
+def build_search_document(product: Dict[str, Any]) -> str:
+    """
+    Normalized text the lexical index searches: title, collection, category,
+    features, colors and description of a scraped product.
+    """
+    return normalize_text(" ".join([
+        product.get("title") or "",
+        collection_of(product.get("title") or "") or "",
+        product.get("category") or "",
+        " ".join(product.get("features") or []),
+        " ".join(product.get("colors") or []),
+        product.get("description") or "",
+    ]))
+
+
+def build_summary(product: Dict[str, Any]) -> str:
+    """
+    The compact, LLM-ready line used for the product in response prompts.
+    """
+    return summarize_product({
+        "title": product["title"],
+        "price": product["price"],
+        "category": product.get("category"),
+        "features": {"attributes": product.get("features", []), "colors": product.get("colors", [])},
+        "description": product.get("description"),
+    })
+
+
+def build_chunks(product: Dict[str, Any], attribute_text: str) -> List[str]:
+    """
+    The texts embedded for a product, one product_embeddings row each:
+    `attribute_text` (title, features, category) first, then the description
+    and the colors when the product has them. Queries about either then match
+    the product without diluting the attribute embedding.
+    """
+    chunks = [attribute_text]
+    if product.get("description"):
+        chunks.append(f"{product['title']}: {' '.join(product['description'].split())}")
+    if product.get("colors"):
+        chunks.append(f"{product['title']} in {', '.join(product['colors'][:CHUNK_MAX_COLORS])}")
+    return chunks
+
+
+def enrich(product: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The precomputed columns stored with a product row: search document,
+    summary and facets.
+    """
+    return {
+        "description": product.get("description"),
+        "search_document": build_search_document(product),
+        "summary": build_summary(product),
+        "price_bucket": price_bucket(product.get("price")),
+        "collection": collection_of(product["title"]),
+        "colors": product.get("colors", []),
+    }
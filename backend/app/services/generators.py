@@ -0,0 +1,194 @@
+import asyncio
+import logging
+import threading
+from typing import AsyncIterator, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core import metrics
+from app.core.config import LLM_BACKEND, LOCAL_LLM_LATENCY_MS
+from app.core.gemini import get_genai
+from app.services.context_builder import build_context, estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+GENERATION_MODEL = "gemini-2.5-flash"
+
+# Static instructions, sent as the system instruction so each call only
+# carries the query and the products.
+EXPANSION_INSTRUCTIONS = """
+You are an expert salesperson for 'Hunnit', a premium activewear brand known for comfort, style, and versatility.
+Your task is to translate the user's abstract query into specific, keyword-rich search terms that would match our product catalog.
+
+Our Catalog Highlights:
+- Collections: Zen (Soft, Flare), Safari Chic (Prints), Cosmic Waves (Bold), Epic Pop (Vibrant).
+- Categories: Leggings, Sports Bras, Crop Tops, Co-ord Sets, Shorts, Skorts, Jackets.
+- Key Features: Moisture Wicking, 4 Way Stretch, Pockets, High Waist, Buttery Soft.
+
+Goal: Identify the best product attributes (category, collection, feature, color) that solve the user's need.
+Return ONLY the expanded search terms as a single string.
+"""
+
+RESPONSE_INSTRUCTIONS = """
+You are 'Hunnit AI', a friendly and knowledgeable salesperson for 'Hunnit', a premium activewear brand.
+You are given the user's request and the products from our catalog that match it.
+
+Your Goal: Persuade the user that these are the perfect choices for them.
+- Be enthusiastic, warm, and professional.
+- Explicitly link the product features (e.g., "Buttery Soft", "High Waist", "Pockets") to the user's specific needs.
+- If suggesting a Co-ord set, mention how it takes the guesswork out of styling.
+- Keep the tone encouraging and helpful.
+"""
+
+
+def build_expansion_prompt(user_query: str) -> str:
+    return f'User Query: "{user_query}"'
+
+
+def build_response_prompt(user_query: str, context: list) -> str:
+    # Product summaries, in rank order, up to the context token budget
+    context_str, _ = build_context(context)
+
+    return f"""The user asked: "{user_query}"
+
+Here are the products from our catalog that match their request:
+{context_str}
+"""
+
+
+def record_usage(operation: str, response):
+    """
+    Records the token usage Gemini reports on a response.
+    """
+    usage = getattr(response, "usage_metadata", None)
+    if usage is not None:
+        metrics.record_tokens(
+            operation,
+            usage.prompt_token_count or 0,
+            usage.candidates_token_count or 0,
+            getattr(usage, "cached_content_token_count", 0) or 0,
+        )
+
+
+class Generator:
+    """
+    Text generation for the two LLM steps of the chat pipeline. Errors are
+    raised to the caller (llm.py), which owns the fallbacks.
+    """
+
+    async def warm_up(self):
+        pass
+
+    async def expand_query(self, user_query: str) -> str:
+        raise NotImplementedError
+
+    async def generate_response(self, user_query: str, context: list) -> str:
+        raise NotImplementedError
+
+    def stream_response(self, user_query: str, context: list) -> AsyncIterator[str]:
+        raise NotImplementedError
+
+
+class GeminiGenerator(Generator):
+    def __init__(self, model_name: str = GENERATION_MODEL):
+        self.model_name = model_name
+        self._expansion_model = None
+        self._response_model = None
+
+    def _load(self):
+        genai = get_genai()
+        self._expansion_model = genai.GenerativeModel(self.model_name, system_instruction=EXPANSION_INSTRUCTIONS)
+        self._response_model = genai.GenerativeModel(self.model_name, system_instruction=RESPONSE_INSTRUCTIONS)
+
+    async def _models(self):
+        if self._response_model is None:
+            await run_in_threadpool(self._load)
+        return self._expansion_model, self._response_model
+
+    async def warm_up(self):
+        # Imports the SDK and builds both models
+        await self._models()
+
+    async def expand_query(self, user_query: str) -> str:
+        model, _ = await self._models()
+        response = await model.generate_content_async(build_expansion_prompt(user_query))
+        record_usage("expand", response)
+        return response.text.strip()
+
+    async def generate_response(self, user_query: str, context: list) -> str:
+        _, model = await self._models()
+        response = await model.generate_content_async(build_response_prompt(user_query, context))
+        record_usage("generate", response)
+        return response.text.strip()
+
+    async def stream_response(self, user_query: str, context: list) -> AsyncIterator[str]:
+        _, model = await self._models()
+        response = await model.generate_content_async(build_response_prompt(user_query, context), stream=True)
+        async for chunk in response:
+            if chunk.text:
+                yield chunk.text
+        # Usage is complete once the stream is exhausted
+        record_usage("generate", response)
+
+
+class TemplateGenerator(Generator):
+    """
+    Deterministic offline generator for tests and benchmarks: queries are
+    searched as typed and responses are filled in from the product rows.
+    Each call waits `latency_ms` first (time to first token when streaming).
+    Token usage is estimated from the prompts Gemini would have been sent,
+    instructions included.
+    """
+
+    def __init__(self, latency_ms: float = LOCAL_LLM_LATENCY_MS):
+        self.latency = latency_ms / 1000
+
+    async def expand_query(self, user_query: str) -> str:
+        await asyncio.sleep(self.latency)
+        metrics.record_tokens("expand", estimate_tokens(EXPANSION_INSTRUCTIONS + build_expansion_prompt(user_query)), estimate_tokens(user_query))
+        return user_query
+
+    def render(self, user_query: str, context: list) -> str:
+        lines = [f'Here are {len(context)} picks for "{user_query}":']
+        for item in context:
+            features = (item.get("features") or {}).get("attributes") or []
+            highlight = f" - {', '.join(features[:3])}" if features else ""
+            lines.append(f"- {item['title']} (Rs. {item['price']}){highlight}")
+        return "\n".join(lines)
+
+    def _respond(self, user_query: str, context: list) -> str:
+        text = self.render(user_query, context)
+        metrics.record_tokens("generate", estimate_tokens(RESPONSE_INSTRUCTIONS + build_response_prompt(user_query, context)), estimate_tokens(text))
+        return text
+
+    async def generate_response(self, user_query: str, context: list) -> str:
+        await asyncio.sleep(self.latency)
+        return self._respond(user_query, context)
+
+    async def stream_response(self, user_query: str, context: list) -> AsyncIterator[str]:
+        await asyncio.sleep(self.latency)
+        for line in self._respond(user_query, context).splitlines(keepends=True):
+            yield line
+
+
+BACKENDS = {
+    "gemini": GeminiGenerator,
+    "local": TemplateGenerator,
+}
+
+_generator: Optional[Generator] = None
+_lock = threading.Lock()
+
+
+def get_generator() -> Generator:
+    """
+    Returns the generator selected by LLM_BACKEND, creating it on first use.
+    """
+    global _generator
+    if _generator is None:
+        with _lock:
+            if _generator is None:
+                if LLM_BACKEND not in BACKENDS:
+                    raise ValueError(f"Unknown LLM_BACKEND '{LLM_BACKEND}', expected one of {sorted(BACKENDS)}")
+                _generator = BACKENDS[LLM_BACKEND]()
+    return _generator
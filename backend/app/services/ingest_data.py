@@ -1,78 +1,352 @@
+import argparse
+import hashlib
 import json
 import os
 import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from urllib.parse import urlparse
 
 # Add the backend directory to sys.path to allow imports from app
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 
-from app.core.db import supabase
-from app.services.rag import generate_embedding
+from app.core.db import get_client
+from app.services.rag import generate_embeddings
+from app.services.embedders import get_embedder
+from app.services import catalog
+from app.services.enrichment import build_chunks, enrich
+from app.services.embedding_store import EmbeddingStore, embedding_key
+from app.services.product_stream import DEFAULT_PRODUCTS_PATH, ProductQueue, batched, read_products
 
-def ingest_data():
+BATCH_SIZE = 100        # Products per upsert / embedding request
+CONCURRENCY = 4         # Batches in flight at once
+CHECKPOINT_PATH = os.path.join(os.path.dirname(__file__), 'ingest_checkpoint.json')
+# The curated catalog: its products carry the IDs the stored SKUs are made of
+CATALOG_PATH = os.path.join(os.path.dirname(__file__), 'hunnit_products.json')
+
+def sku_id(product):
+    """
+    The product's SKU: from its catalog ID, or the URL handle for products
+    straight from the scraper. The two never match, so a catalog is ingested
+    either from the curated file or from scraper output, not both.
+    """
+    key = product['id'] if product.get('id') is not None else urlparse(product['url']).path.rstrip('/').rsplit('/', 1)[-1]
+    return f"HUNNIT-{key}"
+
+def row_hash(row):
     """
-    Reads product data from JSON and ingests it into Supabase.
+    Hash of a product row's content, stored with it so ingestion can tell
+    which rows actually changed.
     """
-    json_path = os.path.join(os.path.dirname(__file__), 'hunnit_products.json')
-    
+    return hashlib.sha256(json.dumps(row, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")).hexdigest()
+
+def build_product_row(product):
+    """
+    Maps a scraped product to a row of the products table.
+    """
+    # Schema: id, sku_id, title, price, description, image_url, source_url, features (jsonb), category,
+    # plus the precomputed search_document, summary and facets (price_bucket, collection, colors)
+    # and the row's content_hash
+    row = {
+        "sku_id": sku_id(product),
+        "title": product['title'],
+        "price": product['price'],
+        "image_url": product['image_url'],
+        "source_url": "https://hunnit.com/collections/all", # Hardcoded source
+        "features": {
+            "attributes": product.get('features', []),
+            "colors": product.get('colors', []),
+            "rating": product.get('rating')
+        },
+        "category": product.get('category', 'Uncategorized'),
+        **enrich(product)
+    }
+    row["content_hash"] = row_hash(row)
+    return row
+
+def build_embedding_text(product):
+    """
+    Creates a rich text representation for embedding.
+    """
+    return f"{product['title']} {', '.join(product.get('features', []))} {product.get('category', '')}"
+
+def build_embedding_chunks(product):
+    """
+    Texts embedded for a product, in chunk_index order.
+    """
+    return build_chunks(product, build_embedding_text(product))
+
+def load_checkpoint():
     try:
-        with open(json_path, 'r', encoding='utf-8') as f:
-            products = json.load(f)
-            
-        print(f"Read {len(products)} products from {json_path}")
-        
-        for product in products:
-            print(f"Processing: {product['title']}")
-            
-            # 1. Insert into products table
-            # Schema: id, sku_id, title, price, description, image_url, source_url, features (jsonb), category
-            
-            product_data = {
-                "sku_id": f"HUNNIT-{product['id']}", # Generate a SKU
-                "title": product['title'],
-                "price": product['price'],
-                "image_url": product['image_url'],
-                "source_url": "https://hunnit.com/collections/all", # Hardcoded source
-                "features": {
-                    "attributes": product.get('features', []),
-                    "colors": product.get('colors', []),
-                    "rating": product.get('rating')
-                },
-                "category": product.get('category', 'Uncategorized')
-            }
-            
-            # Upsert product
-            response = supabase.table('products').upsert(product_data, on_conflict='sku_id').execute()
-            
-            if not response.data:
-                print(f"Failed to upsert product: {product['title']}")
-                continue
-                
-            product_id = response.data[0]['id']
-            
-            # 2. Generate Embedding
-            # Create a rich text representation for embedding
-            text_to_embed = f"{product['title']} {', '.join(product.get('features', []))} {product.get('category', '')}"
-            embedding = generate_embedding(text_to_embed)
-            
+        with open(CHECKPOINT_PATH, 'r', encoding='utf-8') as f:
+            return set(json.load(f)['completed_skus'])
+    except FileNotFoundError:
+        return set()
+
+def save_checkpoint(completed_skus):
+    # Write-then-rename so an interrupted run never leaves a corrupt checkpoint
+    tmp_path = CHECKPOINT_PATH + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({"completed_skus": sorted(completed_skus)}, f)
+    os.replace(tmp_path, CHECKPOINT_PATH)
+
+def fetch_product_hashes(skus):
+    """
+    Returns {sku_id: (id, content_hash)} of the products already stored.
+    """
+    if not skus:
+        return {}
+    response = get_client().table('products').select("id, sku_id, content_hash").in_("sku_id", skus).execute()
+    return {row['sku_id']: (row['id'], row['content_hash']) for row in response.data}
+
+def fetch_embedding_hashes(product_ids):
+    """
+    Returns {(product_id, chunk_index): content_hash} of the embeddings already stored for these products.
+    """
+    if not product_ids:
+        return {}
+    response = get_client().table('product_embeddings') \
+        .select("product_id, chunk_index, content_hash").in_("product_id", product_ids).execute()
+    return {(row['product_id'], row['chunk_index']): row['content_hash'] for row in response.data}
+
+def delete_stale_chunks(chunk_counts, current_hashes):
+    """
+    Deletes stored chunks past a product's current chunk count (e.g. its
+    description was removed).
+    """
+    for product_id, count in chunk_counts.items():
+        if any(pid == product_id and index >= count for pid, index in current_hashes):
+            get_client().table('product_embeddings').delete() \
+                .eq("product_id", product_id).gte("chunk_index", count).execute()
+
+def ingest_batch(products, embedding_store):
+    """
+    Upserts the products of a batch whose row changed in one call, embeds the
+    chunk texts that changed with one batched request and upserts the
+    embedding rows in bulk.
+    Returns the ingested sku_ids, the number of duplicate products skipped,
+    the number of products whose row or embeddings changed and embedding
+    counts (counted per chunk).
+    """
+    # One row per SKU, the last occurrence winning: Postgres rejects an
+    # upsert that would update the same row twice
+    by_sku = {}
+    for product in products:
+        by_sku[sku_id(product)] = product
+    duplicates = len(products) - len(by_sku)
+    if duplicates:
+        print(f"Skipping {duplicates} duplicate SKUs in batch")
+        products = list(by_sku.values())
+    rows = [build_product_row(p) for p in products]
+
+    # 1. Upsert the products whose row content changed, in one call
+    stored = fetch_product_hashes([row['sku_id'] for row in rows])
+    ids_by_sku = {sku: product_id for sku, (product_id, _) in stored.items()}
+    changed_rows = [row for row in rows if stored.get(row['sku_id'], (None, None))[1] != row['content_hash']]
+    if changed_rows:
+        response = get_client().table('products').upsert(changed_rows, on_conflict='sku_id').execute()
+        ids_by_sku.update({row['sku_id']: row['id'] for row in response.data})
+    changed_skus = {row['sku_id'] for row in changed_rows}
+
+    # 2. Work out which chunk texts actually need a new embedding.
+    # Skip chunks whose stored embedding already has the same content hash,
+    # and reuse vectors from the local store before calling the API.
+    embedder = get_embedder()
+    current_hashes = fetch_embedding_hashes(list(ids_by_sku.values()))
+
+    stats = {"ingested": [], "duplicates": duplicates, "changed": 0, "unchanged": 0, "reused": 0, "embedded": 0}
+    pending = []
+    chunk_counts = {}
+    for product, row in zip(products, rows):
+        product_id = ids_by_sku.get(row['sku_id'])
+        if not product_id:
+            print(f"Failed to upsert product: {row['title']}")
+            continue
+        chunks = build_embedding_chunks(product)
+        chunk_counts[product_id] = len(chunks)
+        changed = []
+        for chunk_index, text in enumerate(chunks):
+            key = embedding_key(text, embedder.model, embedder.dimensions)
+            if current_hashes.get((product_id, chunk_index)) == key:
+                stats["unchanged"] += 1
+            else:
+                changed.append((chunk_index, text, key))
+        if changed:
+            pending.append((row, product_id, changed))
+        else:
+            stats["ingested"].append(row['sku_id'])
+
+    stats["changed"] = len(changed_skus | {row['sku_id'] for row, _, _ in pending})
+    delete_stale_chunks(chunk_counts, current_hashes)
+
+    keys = [key for _, _, changed in pending for _, _, key in changed]
+    vectors = embedding_store.get_many(keys)
+    stats["reused"] = len(vectors)
+    to_embed = {key: text for _, _, changed in pending for _, text, key in changed if key not in vectors}
+    if to_embed:
+        embeddings = generate_embeddings(list(to_embed.values()))
+        new_vectors = {key: embedding for key, embedding in zip(to_embed, embeddings) if embedding}
+        embedding_store.put_many(new_vectors)
+        vectors.update(new_vectors)
+        stats["embedded"] = len(new_vectors)
+
+    # 3. Upsert into product_embeddings table in bulk (one row per product chunk)
+    embedding_rows = []
+    for row, product_id, changed in pending:
+        complete = True
+        for chunk_index, text, key in changed:
+            embedding = vectors.get(key)
             if not embedding:
-                print(f"Failed to generate embedding for: {product['title']}")
+                complete = False
                 continue
-                
-            # 3. Insert into product_embeddings table
-            embedding_data = {
+            embedding_rows.append({
                 "product_id": product_id,
-                "chunk_content": text_to_embed,
+                "chunk_index": chunk_index,
+                "chunk_content": text,
+                "content_hash": key,
                 "embedding": embedding
-            }
-            
-            supabase.table('product_embeddings').insert(embedding_data).execute()
-            
-        print("Data ingestion complete!")
-            
+            })
+        if complete:
+            stats["ingested"].append(row['sku_id'])
+        else:
+            print(f"Failed to generate embedding for: {row['title']}")
+
+    if embedding_rows:
+        get_client().table('product_embeddings').upsert(embedding_rows, on_conflict='product_id,chunk_index').execute()
+    return stats
+
+def ingest_products(products, batch_size=BATCH_SIZE, concurrency=CONCURRENCY, resume=False):
+    """
+    Ingests a stream of products into Supabase in concurrent batches, pulling
+    the next batch from `products` only when fewer than `concurrency` batches
+    are in flight, so memory stays bounded however long the stream is.
+    With `resume`, products completed by a previous interrupted run are skipped.
+    """
+    completed = load_checkpoint() if resume else set()
+    if completed:
+        print(f"Resuming: skipping {len(completed)} products already ingested")
+        products = (p for p in products if sku_id(p) not in completed)
+
+    started = time.perf_counter()
+    totals = {"products": 0, "batches": 0, "failed_batches": 0, "ingested": 0, "duplicates": 0, "changed": 0, "unchanged": 0, "reused": 0, "embedded": 0}
+    embedding_store = EmbeddingStore()
+
+    def finish(future, batch):
+        try:
+            stats = future.result()
+        except Exception as e:
+            totals["failed_batches"] += 1
+            print(f"Batch starting at '{batch[0]['title']}' failed: {e}")
+            return
+        totals["ingested"] += len(stats["ingested"])
+        for name in ("duplicates", "changed", "unchanged", "reused", "embedded"):
+            totals[name] += stats[name]
+        completed.update(stats["ingested"])
+        save_checkpoint(completed)
+        print(f"Ingested {totals['ingested']}/{totals['products']} products read so far")
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        in_flight = {}
+        for batch in batched(products, batch_size):
+            totals["products"] += len(batch)
+            totals["batches"] += 1
+            in_flight[executor.submit(ingest_batch, batch, embedding_store)] = batch
+            if len(in_flight) >= concurrency:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    finish(future, in_flight.pop(future))
+        for future in as_completed(in_flight):
+            finish(future, in_flight[future])
+
+    embedding_store.close()
+
+    elapsed = time.perf_counter() - started
+    rate = totals["ingested"] / elapsed if elapsed > 0 else 0.0
+    print(
+        f"Ingested {totals['ingested']} products in {totals['batches']} batches "
+        f"({totals['failed_batches']} failed) in {elapsed:.1f}s - {rate:.1f} products/s"
+    )
+    print(
+        f"Embeddings: {totals['embedded']} generated, {totals['reused']} reused "
+        f"from the local store, {totals['unchanged']} unchanged"
+    )
+
+    if totals["changed"]:
+        # Some product rows or embeddings changed: let running API workers
+        # know they should reload their indexes and drop cached results
+        catalog.bump_version()
+    if totals["ingested"] + totals["duplicates"] == totals["products"] and os.path.exists(CHECKPOINT_PATH):
+        os.remove(CHECKPOINT_PATH)
+    print("Data ingestion complete!")
+    return totals
+
+def ingest_data(path=CATALOG_PATH, batch_size=BATCH_SIZE, concurrency=CONCURRENCY, resume=False):
+    """
+    Streams products from a JSON list file (by default the curated catalog)
+    or the scraper's JSONL file and ingests them. Returns True when every batch was ingested.
+    """
+    try:
+        print(f"Reading products from {path}")
+        totals = ingest_products(read_products(path), batch_size, concurrency, resume)
     except FileNotFoundError:
-        print(f"Error: File not found at {json_path}")
+        print(f"Error: File not found at {path}")
+        return False
     except Exception as e:
         print(f"An error occurred: {e}")
+        return False
+    return not totals["failed_batches"]
+
+def scrape_and_ingest(batch_size=BATCH_SIZE, concurrency=CONCURRENCY, resume=False, **scrape_options):
+    """
+    Runs the scraper in a background thread and ingests its products as they
+    are parsed, through a bounded in-process queue, so crawling, embedding and
+    upserting overlap. The scraper still writes its JSONL file.
+    If the scraper fails, ingestion stops without bumping the catalog version.
+    Returns True when the crawl finished and every batch was ingested.
+    """
+    # Imported here: ingesting from a file does not need the crawler
+    from app.services.scraper import scrape_hunnit_products
+
+    products = ProductQueue()
+
+    def produce():
+        try:
+            scrape_hunnit_products(sink=products.put, **scrape_options)
+        except BaseException as e:
+            products.close(e)
+        else:
+            products.close()
+
+    # Daemon: if ingestion fails, a scraper blocked on the full queue must not keep the process alive
+    scraper = threading.Thread(target=produce, name="scraper", daemon=True)
+    scraper.start()
+    try:
+        totals = ingest_products(products, batch_size, concurrency, resume)
+    except Exception as e:
+        print(f"An error occurred, catalog left partially ingested: {e}")
+        return False
+    scraper.join()
+    return not totals["failed_batches"]
 
 if __name__ == "__main__":
-    ingest_data()
+    parser = argparse.ArgumentParser(description="Ingest scraped products into Supabase.")
+    parser.add_argument("--input", default=None, help="Products file, JSONL or a JSON list (default: the curated catalog; with --live, the scraper's output file)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Products per batch")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY, help="Batches processed in parallel")
+    parser.add_argument("--resume", action="store_true", help="Skip products completed by a previous interrupted run")
+    parser.add_argument("--live", action="store_true", help="Scrape the catalog and ingest products as they are scraped")
+    parser.add_argument("--limit", type=int, default=None, help="With --live: max number of products to scrape")
+    parser.add_argument("--snapshot", action="store_true", help="Export and publish a catalog snapshot once ingestion is done")
+    args = parser.parse_args()
+    if args.live:
+        succeeded = scrape_and_ingest(args.batch_size, args.concurrency, args.resume, limit=args.limit, output_path=args.input or DEFAULT_PRODUCTS_PATH)
+    else:
+        succeeded = ingest_data(args.input or CATALOG_PATH, args.batch_size, args.concurrency, args.resume)
+    if not succeeded:
+        if args.snapshot:
+            print("Ingestion did not complete, not exporting a catalog snapshot.")
+        sys.exit(1)
+    if args.snapshot:
+        from app.services.snapshot import export_snapshot
+        print(f"Exported catalog snapshot to {export_snapshot()}")
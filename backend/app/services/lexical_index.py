@@ -0,0 +1,230 @@
+import logging
+import math
+import re
+import threading
+import time
+from collections import defaultdict
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from app.services import catalog
+from app.core.config import RETRIEVAL_MODE
+
+logger = logging.getLogger(__name__)
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+STOPWORDS = {
+    "a", "an", "and", "the", "for", "with", "in", "on", "of", "to", "or", "is", "are",
+    "i", "me", "my", "need", "want", "looking", "some", "something", "show", "find",
+    "rs", "inr", "price", "priced",
+}
+
+PRICE_PATTERNS = [
+    (re.compile(r"\bbetween\s*(?:rs\.?\s*)?(\d[\d,]*)\s*(?:and|-|to)\s*(?:rs\.?\s*)?(\d[\d,]*)"), "between"),
+    (re.compile(r"\b(?:under|below|less than|cheaper than|upto|up to|max|<)\s*(?:rs\.?\s*)?(\d[\d,]*)"), "max"),
+    (re.compile(r"\b(?:over|above|more than|at least|min|>)\s*(?:rs\.?\s*)?(\d[\d,]*)"), "min"),
+]
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = re.findall(r"[a-z0-9]+", text.lower())
+    return [t[:-1] if len(t) > 3 and t.endswith("s") and not t.endswith("ss") else t for t in tokens]
+
+
+def category_key(category: Optional[str]) -> str:
+    """
+    Normalized form of a category name, e.g. "SPORTS BRAS" -> "sport bra".
+    """
+    return " ".join(tokenize(category or ""))
+
+
+def parse_filters(query: str) -> Tuple[str, Dict[str, Any]]:
+    """
+    Pulls structured price constraints out of the query.
+    Returns the remaining text and {"min_price": ..., "max_price": ...}.
+    """
+    text = query.lower()
+    filters = {}
+    for pattern, kind in PRICE_PATTERNS:
+        match = pattern.search(text)
+        if not match:
+            continue
+        values = [int(v.replace(",", "")) for v in match.groups()]
+        if kind == "between":
+            filters["min_price"], filters["max_price"] = min(values), max(values)
+        elif kind == "max":
+            filters.setdefault("max_price", values[0])
+        else:
+            filters.setdefault("min_price", values[0])
+        text = text[:match.start()] + " " + text[match.end():]
+    return text, filters
+
+
+def product_document(product: Dict[str, Any]) -> str:
+    """
+    Searchable text of a product: the search_document precomputed at ingest
+    time, or title, features, colors and category for rows without one.
+    """
+    if product.get("search_document"):
+        return product["search_document"]
+    features = product.get("features") or {}
+    return " ".join([
+        product.get("title") or "",
+        " ".join(features.get("attributes") or []),
+        " ".join(features.get("colors") or []),
+        product.get("category") or "",
+    ])
+
+
+class LexicalIndex:
+    """
+    In-memory BM25 index over the product catalog.
+
+    Alongside the inverted index it keeps the filterable attributes as
+    columnar NumPy arrays (price, normalized category), so structured filters
+    are a single vectorized mask per query.
+    """
+
+    def __init__(self, products: List[Dict[str, Any]]):
+        self.loaded_at = time.time()
+        self.products = products
+        self.products_by_id = {p["id"]: p for p in products}
+        self.position_by_id = {p["id"]: i for i, p in enumerate(products)}
+
+        self.prices = np.array([p.get("price") or 0 for p in products], dtype=np.int64)
+        self.categories = np.array([category_key(p.get("category")) for p in products], dtype=object)
+
+        postings = defaultdict(lambda: defaultdict(int))
+        lengths = np.zeros(len(products), dtype=np.float32)
+        for i, product in enumerate(products):
+            tokens = [t for t in tokenize(product_document(product)) if t not in STOPWORDS]
+            lengths[i] = len(tokens)
+            for token in tokens:
+                postings[token][i] += 1
+
+        self.doc_lengths = lengths
+        self.avg_length = float(lengths.mean()) if len(products) else 0.0
+        self.postings = {
+            term: (np.fromiter(docs.keys(), dtype=np.int64), np.fromiter(docs.values(), dtype=np.float32))
+            for term, docs in postings.items()
+        }
+        self.vocabulary = set(self.postings)
+        self.category_values = {c for c in self.categories if c}
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    def filter_mask(self, filters: Dict[str, Any]) -> Optional[np.ndarray]:
+        """
+        Boolean mask of the products passing the filters, or None when there are no filters.
+        """
+        if not filters:
+            return None
+        mask = np.ones(len(self), dtype=bool)
+        if "min_price" in filters:
+            mask &= self.prices >= filters["min_price"]
+        if "max_price" in filters:
+            mask &= self.prices <= filters["max_price"]
+        if "category" in filters:
+            mask &= self.categories == filters["category"]
+        return mask
+
+    def parse_query(self, query: str) -> Tuple[List[str], Dict[str, Any]]:
+        text, filters = parse_filters(query)
+        terms = [t for t in tokenize(text) if t not in STOPWORDS and not t.isdigit()]
+        # A query naming a catalog category restricts results to it
+        padded = f" {category_key(text)} "
+        for category in self.category_values:
+            if f" {category} " in padded:
+                filters["category"] = category
+        return terms, filters
+
+    def search(self, query: str, limit: int) -> Tuple[List[Tuple[str, float]], bool, Dict[str, Any]]:
+        """
+        BM25 search with structured filters applied.
+        Returns ([(product_id, score)], fully_matched, filters), where
+        fully_matched is True when the best hit contains every query term.
+        """
+        terms, filters = self.parse_query(query)
+        mask = self.filter_mask(filters)
+        n = len(self)
+        if n == 0:
+            return [], False, filters
+
+        scores = np.zeros(n, dtype=np.float32)
+        matched_terms = np.zeros(n, dtype=np.int32)
+        unique_terms = list(dict.fromkeys(terms))
+        for term in unique_terms:
+            if term not in self.postings:
+                continue
+            docs, tf = self.postings[term]
+            idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = K1 * (1 - B + B * self.doc_lengths[docs] / (self.avg_length or 1.0))
+            scores[docs] += idf * tf * (K1 + 1) / (tf + norm)
+            matched_terms[docs] += 1
+
+        if unique_terms:
+            candidates = scores > 0
+        else:
+            # Filter-only query, e.g. "under 1500": rank the filtered products by price
+            candidates = np.ones(n, dtype=bool)
+            scores = -self.prices.astype(np.float32)
+        if mask is not None:
+            candidates &= mask
+
+        positions = np.flatnonzero(candidates)
+        if len(positions) == 0:
+            return [], False, filters
+        order = positions[np.argsort(-scores[positions], kind="stable")][:limit]
+
+        fully_matched = bool(unique_terms) and matched_terms[order[0]] == len(unique_terms)
+        return [(self.products[i]["id"], float(scores[i])) for i in order], fully_matched, filters
+
+    def passes(self, product_id: str, mask: Optional[np.ndarray]) -> bool:
+        """
+        Whether a product passes a mask from filter_mask().
+        """
+        position = self.position_by_id.get(product_id)
+        return mask is None or (position is not None and bool(mask[position]))
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[str]:
+    """
+    Fuses several ranked lists of IDs: each ID scores sum(1 / (k + rank)).
+    """
+    fused = defaultdict(float)
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            fused[item] += 1.0 / (k + rank)
+    return sorted(fused, key=fused.get, reverse=True)
+
+
+_index: Optional[LexicalIndex] = None
+_lock = threading.Lock()
+
+
+def load() -> Optional[LexicalIndex]:
+    """
+    (Re)builds the lexical index from the products table and swaps it in.
+    """
+    global _index
+    if RETRIEVAL_MODE != "hybrid":
+        return None
+
+    with _lock:
+        started = time.perf_counter()
+        index = LexicalIndex(catalog.fetch_all_rows("products"))
+        _index = index
+        logger.info(
+            f"Lexical index loaded: {len(index)} products, {len(index.vocabulary)} terms, "
+            f"{(time.perf_counter() - started) * 1000:.0f} ms"
+        )
+        return index
+
+
+def get_index() -> Optional[LexicalIndex]:
+    return _index
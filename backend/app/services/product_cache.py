@@ -0,0 +1,114 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional
+
+from app.core import metrics
+from app.core.config import (
+    PRODUCT_CACHE_ENABLED,
+    PRODUCT_CACHE_MAX_SIZE,
+    PRODUCT_CACHE_TTL_SECONDS,
+    PRODUCT_CACHE_REDIS_URL,
+)
+from app.services import catalog
+
+try:
+    import redis.asyncio as redis
+except ImportError:  # The shared backend is optional
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+
+class ProductCache:
+    """
+    Read-through cache for product reads.
+
+    Tier 1 is an in-process LRU with TTL. Tier 2, when PRODUCT_CACHE_REDIS_URL
+    is set, is a shared Redis so workers warm each other up. Keys embed the
+    catalog version, so a re-ingest makes every old entry unreachable in both
+    tiers; the local tier is also cleared outright.
+    """
+
+    def __init__(self, max_size: int = PRODUCT_CACHE_MAX_SIZE, ttl_seconds: int = PRODUCT_CACHE_TTL_SECONDS, redis_url: Optional[str] = PRODUCT_CACHE_REDIS_URL):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._shared = None
+        if redis_url:
+            if redis is None:
+                logger.warning("PRODUCT_CACHE_REDIS_URL is set but the redis package is not installed; using the local cache only")
+            else:
+                self._shared = redis.from_url(redis_url)
+
+    def key(self, *parts) -> str:
+        return ":".join(["products", str(catalog.current_version())] + [str(p) for p in parts])
+
+    def _get_local(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _set_local(self, key: str, value: Any):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    async def get(self, key: str):
+        value = self._get_local(key)
+        if value is not None:
+            metrics.inc("product_cache_local_hits")
+            return value
+        if self._shared is not None:
+            try:
+                raw = await self._shared.get(key)
+            except Exception as e:
+                logger.warning(f"Shared product cache unavailable: {e}")
+                raw = None
+            if raw is not None:
+                value = json.loads(raw)
+                self._set_local(key, value)
+                metrics.inc("product_cache_shared_hits")
+                return value
+        metrics.inc("product_cache_misses")
+        return None
+
+    async def set(self, key: str, value: Any):
+        self._set_local(key, value)
+        if self._shared is not None:
+            try:
+                await self._shared.set(key, json.dumps(value, default=str), ex=self.ttl_seconds)
+            except Exception as e:
+                logger.warning(f"Shared product cache unavailable: {e}")
+
+    async def read_through(self, key: str, loader: Callable[[], Awaitable[Any]]):
+        """
+        Returns the cached value for `key`, loading and caching it on a miss.
+        Empty results (None, []) are not cached.
+        """
+        value = await self.get(key)
+        if value is not None:
+            return value
+        value = await loader()
+        if value:
+            await self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+cache: Optional[ProductCache] = ProductCache() if PRODUCT_CACHE_ENABLED else None
@@ -1,46 +1,96 @@
-from app.core.db import supabase
+from app.core import metrics
+from app.core.singleflight import single_flight
+from app.services.product_cache import cache as product_cache
+from app.services.stores import get_store
 from typing import List, Optional, Dict, Any
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Column projections for GET /products. "summary" is what product cards need,
+# without the features JSON.
+PROJECTIONS = {
+    "full": "*",
+    "summary": "id, sku_id, title, price, image_url, category",
+}
+
 class ProductService:
     @staticmethod
-    def get_products(limit: int, offset: int) -> List[Dict[str, Any]]:
+    @single_flight("get_products")
+    async def get_products(limit: int, offset: int = 0, cursor: Optional[str] = None, fields: str = "full") -> List[Dict[str, Any]]:
         """
-        Fetch a list of products with pagination.
+        Fetch a list of products ordered by ID.
+        With `cursor` (the last ID of the previous page, or "" for the first
+        page) uses keyset pagination; otherwise offset pagination.
         """
+        async def load():
+            return await get_store().list_products(limit, offset, cursor, PROJECTIONS[fields])
+
         try:
-            response = supabase.table("products").select("*").range(offset, offset + limit - 1).execute()
-            return response.data
+            if product_cache is None:
+                return await load()
+            page = f"cursor={cursor}" if cursor is not None else f"offset={offset}"
+            return await product_cache.read_through(product_cache.key("list", fields, page, limit), load)
         except Exception as e:
             logger.error(f"Error fetching products: {e}")
             raise e
 
     @staticmethod
-    def get_product_by_id(product_id: str) -> Optional[Dict[str, Any]]:
+    @single_flight("get_product_by_id")
+    async def get_product_by_id(product_id: str) -> Optional[Dict[str, Any]]:
         """
         Fetch a single product by ID.
         """
+        async def load():
+            return await get_store().get_product(product_id)
+
         try:
-            response = supabase.table("products").select("*").eq("id", product_id).execute()
-            if response.data:
-                return response.data[0]
-            return None
+            if product_cache is None:
+                return await load()
+            return await product_cache.read_through(product_cache.key("item", product_id), load)
         except Exception as e:
             logger.error(f"Error fetching product {product_id}: {e}")
             raise e
 
     @staticmethod
-    def get_products_by_ids(product_ids: List[str]) -> List[Dict[str, Any]]:
+    @metrics.traced("fetch_products")
+    @single_flight("get_products_by_ids")
+    async def get_products_by_ids(product_ids: List[str]) -> List[Dict[str, Any]]:
         """
-        Fetch multiple products by their IDs.
+        Fetch multiple products by their IDs. Cached products are served from
+        the cache and only the missing ones are queried.
         """
         try:
             if not product_ids:
                 return []
-            response = supabase.table("products").select("*").in_("id", product_ids).execute()
-            return response.data
+
+            found = {}
+            if product_cache is not None:
+                for product_id in product_ids:
+                    product = await product_cache.get(product_cache.key("item", product_id))
+                    if product is not None:
+                        found[product_id] = product
+
+            missing = [product_id for product_id in product_ids if product_id not in found]
+            if missing:
+                for product in await get_store().get_products(missing):
+                    found[product["id"]] = product
+                    if product_cache is not None:
+                        await product_cache.set(product_cache.key("item", product["id"]), product)
+
+            return [found[product_id] for product_id in dict.fromkeys(product_ids) if product_id in found]
         except Exception as e:
             logger.error(f"Error fetching products by IDs: {e}")
             raise e
+
+    @staticmethod
+    async def cache_products(products: List[Dict[str, Any]]):
+        """
+        Stores product rows fetched by other queries (e.g. vector search) in
+        the cache, so later lookups by ID are served from it.
+        """
+        if product_cache is None:
+            return
+        for product in products:
+            row = {key: value for key, value in product.items() if key != "similarity"}
+            await product_cache.set(product_cache.key("item", row["id"]), row)
@@ -0,0 +1,126 @@
+import json
+import logging
+import os
+import queue
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Where the scraper streams products and ingestion reads them from
+DEFAULT_PRODUCTS_PATH = os.path.join(os.path.dirname(__file__), 'products.jsonl')
+
+# Products buffered between a live scraper and ingestion; a full queue makes
+# the scraper wait for ingestion to catch up
+QUEUE_SIZE = 200
+
+# Marks the end of a live product stream
+_DONE = object()
+
+
+def _ends_with_newline(path) -> bool:
+    with open(path, 'rb') as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+class JsonlWriter:
+    """
+    Appends products to a JSONL file, one object per line, flushed as they
+    are written so an interrupted crawl keeps every product written so far.
+    """
+
+    def __init__(self, path=DEFAULT_PRODUCTS_PATH, append=False):
+        self.path = path
+        self.count = 0
+        self._file = open(path, 'a' if append else 'w', encoding='utf-8')
+        if append and self._file.tell() and not _ends_with_newline(path):
+            # Start after a line cut off by an interrupted run, not inside it
+            self._file.write("\n")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, product: Dict[str, Any]):
+        self._file.write(json.dumps(product, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self.count += 1
+
+    def close(self):
+        self._file.close()
+
+
+def read_products(path=DEFAULT_PRODUCTS_PATH) -> Iterator[Dict[str, Any]]:
+    """
+    Yields the products of a JSONL file one at a time. A truncated last line
+    (the crawl was interrupted mid-write) is skipped. Files holding a single
+    JSON list (.json) are read whole.
+    """
+    if path.endswith('.json'):
+        with open(path, 'r', encoding='utf-8') as f:
+            yield from json.load(f)
+        return
+    with open(path, 'r', encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning(f"Skipping malformed line {number} of {path}")
+
+
+def seen_urls(path=DEFAULT_PRODUCTS_PATH) -> Set[str]:
+    """
+    URLs of the products already in a JSONL file, for resuming a crawl.
+    """
+    if not os.path.exists(path):
+        return set()
+    return {product['url'] for product in read_products(path) if product.get('url')}
+
+
+def batched(products: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Groups a product stream into lists of at most `size`, holding one batch
+    in memory at a time.
+    """
+    batch = []
+    for product in products:
+        batch.append(product)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class ProductQueue:
+    """
+    Bounded in-process hand-off from a producer thread (the scraper) to a
+    consumer (ingestion). `put` blocks while the queue is full; iterating
+    yields products until the producer calls `close`. A producer that failed
+    passes its exception to `close`, and iterating raises it after the
+    products put before it.
+    """
+
+    def __init__(self, maxsize=QUEUE_SIZE):
+        self._queue = queue.Queue(maxsize)
+        self._error: Optional[BaseException] = None
+
+    def put(self, product: Dict[str, Any]):
+        self._queue.put(product)
+
+    def close(self, error: Optional[BaseException] = None):
+        self._error = error
+        self._queue.put(_DONE)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        while True:
+            product = self._queue.get()
+            if product is _DONE:
+                if self._error is not None:
+                    raise self._error
+                return
+            yield product
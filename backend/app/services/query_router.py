@@ -0,0 +1,61 @@
+import logging
+from typing import List, Dict, Any, Set
+
+from app.core import metrics
+from app.services import lexical_index
+from app.services.lexical_index import tokenize
+
+logger = logging.getLogger(__name__)
+
+ROUTE_DIRECT = "direct"      # Query already uses catalog vocabulary, search it as-is
+ROUTE_EXPAND = "expand"      # Abstract query, needs LLM expansion
+
+# Catalog vocabulary, kept in sync with the highlights in llm.expand_query
+CATEGORIES = [
+    "leggings", "sports bra", "crop top", "tank top", "co-ord set", "shorts", "cycling shorts",
+    "skort", "jacket", "hoodie", "capris", "flare pants", "half sleeve", "topwear", "bottomwear",
+]
+COLLECTIONS = ["zen", "safari chic", "cosmic waves", "epic pop", "majestic flora", "yin yang", "flo", "365"]
+FEATURES = [
+    "moisture wicking", "4 way stretch", "pockets", "high waist", "buttery soft",
+    "zero transparency", "anti bacterial", "removable cups", "7/8",
+]
+
+
+def _phrases(values) -> Set[str]:
+    return {" ".join(tokenize(v)) for v in values if tokenize(v)}
+
+
+CATEGORY_PHRASES = _phrases(CATEGORIES)
+DESCRIPTOR_PHRASES = _phrases(COLLECTIONS + FEATURES)
+
+
+def _category_phrases() -> Set[str]:
+    """
+    Static product types plus the categories of the loaded catalog, if any.
+    """
+    index = lexical_index.get_index()
+    if index is None:
+        return CATEGORY_PHRASES
+    return CATEGORY_PHRASES | index.category_values
+
+
+def matched_vocabulary(query: str) -> Dict[str, List[str]]:
+    padded = f" {' '.join(tokenize(query))} "
+    return {
+        "categories": sorted(p for p in _category_phrases() if f" {p} " in padded),
+        "descriptors": sorted(p for p in DESCRIPTOR_PHRASES if f" {p} " in padded),
+    }
+
+
+def route(query: str) -> Dict[str, Any]:
+    """
+    Classifies a query locally. Queries naming a product type, or combining
+    at least two collections/features, are specific enough to search
+    directly; everything else goes through LLM expansion.
+    """
+    matched = matched_vocabulary(query)
+    specific = bool(matched["categories"]) or len(matched["descriptors"]) >= 2
+    decision = ROUTE_DIRECT if specific else ROUTE_EXPAND
+    metrics.inc(f"query_route_{decision}")
+    return {"route": decision, "matched": matched["categories"] + matched["descriptors"]}
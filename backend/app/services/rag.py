@@ -1,81 +1,199 @@
-import google.generativeai as genai
-from app.core.config import GOOGLE_API_KEY
-from app.core.db import supabase
+from app.core.config import EMBED_BATCHING_ENABLED, EMBED_BATCH_MAX_SIZE, EMBED_BATCH_WAIT_MS, RERANK_ENABLED, RERANK_CANDIDATE_MULTIPLIER
+from app.core import metrics
+from app.core.singleflight import single_flight
+from app.services.product_service import ProductService
+from app.services import vector_index, lexical_index, reranker
+from app.services.embedding_batcher import EmbeddingBatcher
+from app.services.embedders import get_embedder
+from app.services.stores import get_store
+from app.services.lexical_index import reciprocal_rank_fusion
 from fastapi.concurrency import run_in_threadpool
 import logging
 
 logger = logging.getLogger(__name__)
 
-if not GOOGLE_API_KEY:
-    raise ValueError("GOOGLE_API_KEY must be set in .env file")
+# Max texts per batched embedding request
+EMBED_BATCH_SIZE = 100
 
-genai.configure(api_key=GOOGLE_API_KEY)
+# Hybrid search ranks this many times match_count candidates on each side before fusing
+HYBRID_CANDIDATE_MULTIPLIER = 4
+
+def generate_embeddings(texts: list[str], batch_size: int = EMBED_BATCH_SIZE, task_type: str = "retrieval_document") -> list[list[float] | None]:
+    """
+    Embeds many texts with one request to the configured embedder per
+    `batch_size` texts. Results line up with `texts`; a failed batch yields
+    None entries.
+    """
+    embeddings = []
+    for start in range(0, len(texts), batch_size):
+        batch = texts[start:start + batch_size]
+        try:
+            embeddings.extend(get_embedder().embed(batch, task_type))
+        except Exception as e:
+            logger.error(f"Error generating embeddings for batch of {len(batch)}: {e}")
+            embeddings.extend([None] * len(batch))
+    return embeddings
+
+def _embed_queries(texts: list[str]) -> list[list[float] | None]:
+    return generate_embeddings(texts, task_type="retrieval_query")
+
+# Micro-batchers: concurrent callers within a few ms share one embedding request
+query_batcher = EmbeddingBatcher(_embed_queries, EMBED_BATCH_MAX_SIZE, EMBED_BATCH_WAIT_MS)
+document_batcher = EmbeddingBatcher(generate_embeddings, EMBED_BATCH_MAX_SIZE, EMBED_BATCH_WAIT_MS)
 
 def generate_embedding(text: str) -> list[float] | None:
     """
     Generates an embedding for a given text suitable for document storage.
+    Safe to call from many threads at once; concurrent calls are batched.
     """
     try:
-        result = genai.embed_content(
-            model="models/gemini-embedding-001",
-            content=text,
-            task_type="retrieval_document",
-            output_dimensionality=768
-        )
-        return result['embedding']
+        if EMBED_BATCHING_ENABLED:
+            return document_batcher.embed_blocking(text)
+        return generate_embeddings([text])[0]
     except Exception as e:
         logger.error(f"Error generating embedding: {e}")
         return None
 
-async def search_products(query: str, match_threshold: float = 0.5, match_count: int = 5):
+@metrics.traced("embed")
+@single_flight("embed_query")
+async def embed_query(query: str) -> list[float] | None:
     """
-    Searches for products using vector similarity.
+    Generates an embedding for a search query.
     """
     # For query embedding, we use task_type="retrieval_query"
     try:
-        # genai.embed_content_async is not standard, using run_in_threadpool for safety if async not available
-        # But actually, let's use the sync method in threadpool to be safe and consistent
-        result = await run_in_threadpool(
-            genai.embed_content,
-            model="models/gemini-embedding-001",
-            content=query,
-            task_type="retrieval_query",
-            output_dimensionality=768
-        )
-        query_embedding = result['embedding']
+        if EMBED_BATCHING_ENABLED:
+            return await query_batcher.embed(query)
+        # Embedders are sync, so run it in a threadpool
+        embeddings = await run_in_threadpool(_embed_queries, [query])
+        return embeddings[0]
     except Exception as e:
         logger.error(f"Error generating query embedding: {e}")
+        return None
+
+@metrics.traced("vector_search")
+async def match_products(query_embedding: list[float], match_threshold: float, match_count: int) -> list[dict]:
+    """
+    Vector search for the closest product embeddings.
+    Served from the in-process index when it is enabled and loaded,
+    otherwise from the configured store (the match_products RPC on Supabase).
+    """
+    index = vector_index.get_index()
+    if index is not None:
+        return index.search(query_embedding, match_threshold, match_count)
+
+    return await get_store().match_embeddings(query_embedding, match_threshold, match_count)
+
+async def _match_rows_two_step(query_embedding: list[float], match_threshold: float, match_count: int) -> list[dict]:
+    matches = await match_products(query_embedding, match_threshold, match_count)
+    if not matches:
         return []
+    similarity = {match['product_id']: match['similarity'] for match in matches}
+    products = await ProductService.get_products_by_ids(list(similarity))
+    return [{**product, 'similarity': similarity[product['id']]} for product in products]
+
+async def match_product_rows(query_embedding: list[float], match_threshold: float, match_count: int) -> list[dict]:
+    """
+    Vector search returning full product rows, best first, each with its
+    `similarity`. With the in-process index the rows come from the product
+    cache; otherwise the store returns them in one round trip
+    (match_products_full), and they are cached for later lookups by ID.
+    Falls back to IDs then rows if the store lacks match_products_full.
+    """
+    if vector_index.get_index() is not None:
+        return await _match_rows_two_step(query_embedding, match_threshold, match_count)
+
+    try:
+        with metrics.span("vector_search"):
+            rows = await get_store().match_products_full(query_embedding, match_threshold, match_count)
+    except Exception as e:
+        logger.warning(f"match_products_full failed, falling back to two queries: {e}")
+        return await _match_rows_two_step(query_embedding, match_threshold, match_count)
+    await ProductService.cache_products(rows)
+    return rows
 
+@metrics.traced("search")
+@single_flight("search_products")
+async def search_products(query: str, match_threshold: float = 0.5, match_count: int = 5, query_embedding: list[float] | None = None):
+    """
+    Searches for products using vector similarity, or hybrid lexical + vector
+    retrieval when RETRIEVAL_MODE=hybrid and the lexical index is loaded.
+    Pass `query_embedding` when the query was already embedded (e.g. for the
+    response cache lookup) to skip embedding it again.
+    With RERANK_ENABLED, RERANK_CANDIDATE_MULTIPLIER x match_count candidates
+    are retrieved and re-ranked for diversity (see reranker.rerank).
+    """
+    candidate_count = match_count * RERANK_CANDIDATE_MULTIPLIER if RERANK_ENABLED else match_count
+    rows = await _retrieve(query, match_threshold, candidate_count, query_embedding)
+    if not RERANK_ENABLED:
+        return rows
+    vectors = await candidate_vectors(rows) if len(rows) > 1 else None
+    with metrics.span("rerank"):
+        return reranker.rerank(rows, query, match_count, vectors=vectors)
+
+async def candidate_vectors(rows: list[dict]):
+    """
+    The candidates' product embeddings for re-ranking: from the in-process
+    vector index when loaded, otherwise from the store. None (re-rank on
+    term vectors) when some candidate has no embeddings or the store fails.
+    """
+    product_ids = [row['id'] for row in rows]
+    index = vector_index.get_index()
+    if index is not None:
+        return index.product_vectors(product_ids)
+    try:
+        with metrics.span("candidate_vectors"):
+            return await get_store().product_vectors(product_ids)
+    except Exception as e:
+        logger.warning(f"Could not load candidate embeddings, re-ranking on terms: {e}")
+        return None
+
+async def _retrieve(query: str, match_threshold: float, match_count: int, query_embedding: list[float] | None = None):
+    lexical = lexical_index.get_index()
+    if lexical is not None:
+        return await hybrid_search(lexical, query, match_threshold, match_count, query_embedding)
+
+    query_embedding = query_embedding or await embed_query(query)
     if not query_embedding:
         return []
     
     try:
-        # 1. Get similar product IDs from vector search (Supabase RPC is sync)
-        response = await run_in_threadpool(
-            lambda: supabase.rpc(
-                'match_products',
-                {
-                    'query_embedding': query_embedding,
-                    'match_threshold': match_threshold,
-                    'match_count': match_count
-                }
-            ).execute()
-        )
-        
-        matches = response.data
-        if not matches:
-            return []
-            
-        # 2. Extract Product IDs
-        product_ids = [match['product_id'] for match in matches]
-        
-        # 3. Fetch full product details (Supabase select is sync)
-        products_response = await run_in_threadpool(
-            lambda: supabase.table("products").select("*").in_("id", product_ids).execute()
-        )
-        return products_response.data
-        
+        return await match_product_rows(query_embedding, match_threshold, match_count)
     except Exception as e:
         logger.error(f"Error searching products: {e}")
         return []
+
+async def hybrid_search(lexical, query: str, match_threshold: float, match_count: int, query_embedding: list[float] | None = None):
+    """
+    BM25 over title/features/colors/category fused with the vector ranking
+    via reciprocal rank fusion. Price and category constraints in the query
+    are applied to both sides. Product rows come from the lexical index, so
+    no products query is needed.
+    """
+    candidate_count = match_count * HYBRID_CANDIDATE_MULTIPLIER
+    with metrics.span("lexical_search"):
+        lexical_hits, fully_matched, filters = lexical.search(query, candidate_count)
+    lexical_ids = [product_id for product_id, _ in lexical_hits]
+
+    # Exact attribute queries are answered lexically, without an embedding call
+    if fully_matched:
+        return [{**lexical.products_by_id[product_id], 'similarity': None} for product_id in lexical_ids[:match_count]]
+
+    vector_ids = []
+    similarity = {}
+    query_embedding = query_embedding or await embed_query(query)
+    if query_embedding:
+        try:
+            matches = await match_products(query_embedding, match_threshold, candidate_count)
+            mask = lexical.filter_mask(filters)
+            vector_ids = [m['product_id'] for m in matches if lexical.passes(m['product_id'], mask)]
+            similarity = {m['product_id']: m['similarity'] for m in matches}
+        except Exception as e:
+            logger.error(f"Error in vector search, using lexical results only: {e}")
+
+    # Rows are copied so the lexical index's own rows stay unchanged
+    fused = reciprocal_rank_fusion([lexical_ids, vector_ids])
+    return [
+        {**lexical.products_by_id[product_id], 'similarity': similarity.get(product_id)}
+        for product_id in fused if product_id in lexical.products_by_id
+    ][:match_count]
@@ -0,0 +1,148 @@
+import logging
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.core.config import RERANK_MMR_LAMBDA, RERANK_MAX_PER_CATEGORY
+from app.services.lexical_index import category_key, parse_filters, product_document, tokenize
+
+logger = logging.getLogger(__name__)
+
+
+def mmr(relevance: np.ndarray, similarity: np.ndarray, k: int, lambda_: float = RERANK_MMR_LAMBDA,
+        groups: Optional[np.ndarray] = None, max_per_group: int = 0) -> List[int]:
+    """
+    Maximal Marginal Relevance: greedily picks up to `k` candidates, each
+    maximizing lambda * relevance - (1 - lambda) * its highest similarity to
+    the candidates already picked. `similarity` is the candidates' pairwise
+    similarity matrix. With `groups` (one integer per candidate) at most
+    `max_per_group` candidates of a group are picked.
+    Returns the positions of the picked candidates, in pick order.
+    """
+    n = len(relevance)
+    available = np.ones(n, dtype=bool)
+    # Highest similarity of each candidate to the picks so far
+    redundancy = np.zeros(n, dtype=np.float32)
+    group_counts = np.zeros(int(groups.max()) + 1 if groups is not None and n else 0, dtype=np.int64)
+    picked = []
+    for _ in range(min(k, n)):
+        scores = lambda_ * relevance - (1 - lambda_) * redundancy
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        if not available[best]:
+            break
+        picked.append(best)
+        available[best] = False
+        np.maximum(redundancy, similarity[best], out=redundancy)
+        if groups is not None and max_per_group > 0:
+            group_counts[groups[best]] += 1
+            if group_counts[groups[best]] >= max_per_group:
+                available &= groups != groups[best]
+    return picked
+
+
+def _relevance(rows: List[Dict[str, Any]]) -> np.ndarray:
+    """
+    Candidate relevance scaled to [0, 1]: from `similarity`, or from the rank
+    when some rows have none (lexical-only hybrid hits).
+    """
+    n = len(rows)
+    if all(row.get("similarity") is not None for row in rows):
+        scores = np.asarray([row["similarity"] for row in rows], dtype=np.float32)
+    else:
+        scores = np.linspace(1.0, 0.0, n, dtype=np.float32) if n > 1 else np.ones(n, dtype=np.float32)
+    spread = scores.max() - scores.min() if n else 0.0
+    if spread <= 0:
+        return np.ones(n, dtype=np.float32)
+    return (scores - scores.min()) / spread
+
+
+def _pairwise_similarity(vectors: np.ndarray) -> np.ndarray:
+    """
+    Cosine similarity between the candidates, rescaled so the least similar
+    pair is 0 and the most similar 1. Dense embeddings of one catalog are
+    all fairly similar; rescaling keeps the MMR trade-off comparable to the
+    relevance scale whatever the embedding model.
+    """
+    similarity = vectors @ vectors.T
+    off_diagonal = similarity[~np.eye(len(similarity), dtype=bool)]
+    low, high = off_diagonal.min(), off_diagonal.max()
+    if high - low <= 1e-6:
+        return np.ones_like(similarity)
+    return np.clip((similarity - low) / (high - low), 0.0, 1.0)
+
+
+def _term_vectors(rows: List[Dict[str, Any]]) -> np.ndarray:
+    """
+    Normalized bag-of-words vectors of the candidates' search documents, for
+    when their embeddings are not available.
+    """
+    vocabulary: Dict[str, int] = {}
+    documents = [[vocabulary.setdefault(t, len(vocabulary)) for t in tokenize(product_document(row))] for row in rows]
+    matrix = np.zeros((len(rows), max(1, len(vocabulary))), dtype=np.float32)
+    for i, terms in enumerate(documents):
+        np.add.at(matrix[i], terms, 1.0)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def candidate_vectors(rows: List[Dict[str, Any]], vectors: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    One normalized vector per candidate: the given product embeddings,
+    otherwise term vectors.
+    """
+    return vectors if vectors is not None else _term_vectors(rows)
+
+
+def price_mask(rows: List[Dict[str, Any]], query: str) -> np.ndarray:
+    """
+    Candidates passing the price constraints in the query ("under 1500").
+    """
+    _, filters = parse_filters(query)
+    prices = np.asarray([row.get("price") if row.get("price") is not None else np.nan for row in rows], dtype=np.float64)
+    mask = np.ones(len(rows), dtype=bool)
+    if "min_price" in filters:
+        mask &= prices >= filters["min_price"]
+    if "max_price" in filters:
+        mask &= prices <= filters["max_price"]
+    return mask
+
+
+def category_match(rows: List[Dict[str, Any]], query: str) -> np.ndarray:
+    """
+    Candidates in a category the query names, e.g. "sports bra".
+    """
+    categories = np.asarray([category_key(row.get("category")) for row in rows])
+    padded = f" {category_key(query)} "
+    named = [category for category in set(categories) if category and f" {category} " in padded]
+    return np.isin(categories, named)
+
+
+def rerank(rows: List[Dict[str, Any]], query: str, match_count: int, lambda_: float = RERANK_MMR_LAMBDA,
+           max_per_category: int = RERANK_MAX_PER_CATEGORY, vectors: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+    """
+    Re-ranks over-fetched search candidates (best first) down to
+    `match_count`: drops those failing the query's price constraints, puts
+    products of a category the query names first, and orders them by MMR so
+    near-duplicates (e.g. the same legging in several colorways) do not
+    crowd out other products. `vectors` are the candidates' product
+    embeddings, one row each; without them similarity is lexical.
+    """
+    if not rows:
+        return rows
+    keep = price_mask(rows, query)
+    rows = [row for row, kept in zip(rows, keep) if kept]
+    if vectors is not None:
+        vectors = vectors[keep]
+    if len(rows) <= 1:
+        return rows
+
+    similarity = _pairwise_similarity(candidate_vectors(rows, vectors))
+    groups = None
+    if max_per_category > 0:
+        _, groups = np.unique([row.get("category") or "" for row in rows], return_inverse=True)
+    # Candidates in a category the query names outrank all the others
+    relevance = _relevance(rows) + category_match(rows, query)
+    picked = mmr(relevance, similarity, match_count, lambda_, groups, max_per_category)
+    return [rows[i] for i in picked]
@@ -0,0 +1,147 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+from app.core import metrics
+from app.core.config import (
+    CHAT_CACHE_ENABLED,
+    CHAT_CACHE_MAX_SIZE,
+    CHAT_CACHE_TTL_SECONDS,
+    CHAT_CACHE_SEMANTIC_DISTANCE,
+)
+
+
+def normalize_query(query: str) -> str:
+    """
+    Lowercases, strips punctuation and collapses whitespace so trivially
+    different spellings of the same query share an exact-match key.
+    """
+    return re.sub(r"\s+", " ", re.sub(r"[^\w\s]", " ", query.lower())).strip()
+
+
+class ResponseCache:
+    """
+    Two-tier cache of /chat responses.
+
+    Tier 1 is an LRU keyed on the normalized query text. Tier 2 compares the
+    query embedding against the embeddings of every cached query and reuses a
+    response whose cosine distance is within `semantic_distance`. Both tiers
+    share the same entries, so TTL and size eviction apply to both.
+    """
+
+    def __init__(
+        self,
+        max_size: int = CHAT_CACHE_MAX_SIZE,
+        ttl_seconds: int = CHAT_CACHE_TTL_SECONDS,
+        semantic_distance: float = CHAT_CACHE_SEMANTIC_DISTANCE,
+    ):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.semantic_distance = semantic_distance
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # Normalized query embeddings, one row per slot
+        self._vectors: Optional[np.ndarray] = None
+        self._slot_keys: List[Optional[str]] = [None] * max_size
+        self._free_slots = list(range(max_size - 1, -1, -1))
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        slot = entry["slot"]
+        if slot is not None:
+            self._slot_keys[slot] = None
+            self._free_slots.append(slot)
+
+    def _expired(self, entry: Dict[str, Any]) -> bool:
+        return entry["expires_at"] <= time.monotonic()
+
+    def get_exact(self, query: str) -> Optional[Dict[str, Any]]:
+        key = normalize_query(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry):
+                self._remove(key)
+                entry = None
+            if entry is None:
+                metrics.inc("chat_cache_exact_misses")
+                return None
+            self._entries.move_to_end(key)
+        metrics.inc("chat_cache_exact_hits")
+        return entry["response"]
+
+    def get_semantic(self, embedding: List[float]) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if self._vectors is None or not self._entries:
+                metrics.inc("chat_cache_semantic_misses")
+                return None
+            query = np.asarray(embedding, dtype=np.float32)
+            query /= np.linalg.norm(query) or 1.0
+            scores = self._vectors @ query
+            occupied = np.array([k is not None for k in self._slot_keys])
+            scores[~occupied] = -np.inf
+
+            slot = int(np.argmax(scores))
+            if 1.0 - scores[slot] > self.semantic_distance:
+                metrics.inc("chat_cache_semantic_misses")
+                return None
+            key = self._slot_keys[slot]
+            entry = self._entries[key]
+            if self._expired(entry):
+                self._remove(key)
+                metrics.inc("chat_cache_semantic_misses")
+                return None
+            self._entries.move_to_end(key)
+        metrics.inc("chat_cache_semantic_hits")
+        return entry["response"]
+
+    def put(self, query: str, embedding: Optional[List[float]], response: Dict[str, Any]):
+        key = normalize_query(query)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            while len(self._entries) >= self.max_size:
+                self._remove(next(iter(self._entries)))
+                metrics.inc("chat_cache_evictions")
+
+            slot = None
+            if embedding is not None:
+                vector = np.asarray(embedding, dtype=np.float32)
+                if self._vectors is None:
+                    self._vectors = np.zeros((self.max_size, len(vector)), dtype=np.float32)
+                slot = self._free_slots.pop()
+                self._vectors[slot] = vector / (np.linalg.norm(vector) or 1.0)
+                self._slot_keys[slot] = key
+
+            self._entries[key] = {
+                "response": response,
+                "slot": slot,
+                "expires_at": time.monotonic() + self.ttl_seconds,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._slot_keys = [None] * self.max_size
+            self._free_slots = list(range(self.max_size - 1, -1, -1))
+        metrics.inc("chat_cache_invalidations")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self),
+            "exact_hits": metrics.get("chat_cache_exact_hits"),
+            "exact_misses": metrics.get("chat_cache_exact_misses"),
+            "semantic_hits": metrics.get("chat_cache_semantic_hits"),
+            "semantic_misses": metrics.get("chat_cache_semantic_misses"),
+            "misses": metrics.get("chat_cache_misses"),
+            "evictions": metrics.get("chat_cache_evictions"),
+        }
+
+
+cache: Optional[ResponseCache] = ResponseCache() if CHAT_CACHE_ENABLED else None
@@ -1,24 +1,51 @@
-import requests
-from bs4 import BeautifulSoup
+import argparse
+import asyncio
+import importlib.util
 import json
-import time
+import os
+import random
 import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlparse
+
+import httpx
+from bs4 import BeautifulSoup, SoupStrainer
+
+# Add the backend directory to sys.path to allow imports from app
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from app.services.crawl_state import CrawlState, DEFAULT_STATE_PATH, content_hash
+from app.services.product_stream import DEFAULT_PRODUCTS_PATH, JsonlWriter, seen_urls
 
 BASE_URL = "https://hunnit.com"
 COLLECTION_URL = "https://hunnit.com/collections/all"
 
-def get_soup(url):
-    """Fetches the URL and returns a BeautifulSoup object."""
-    try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        }
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        return BeautifulSoup(response.content, "html.parser")
-    except Exception as e:
-        print(f"Error fetching {url}: {e}")
-        return None
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+
+# Crawl defaults, overridable from the command line
+CONCURRENCY = 8             # Max requests in flight
+REQUESTS_PER_SECOND = 4.0   # Per-host rate limit
+MAX_RETRIES = 3
+MAX_COLLECTION_PAGES = 200
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+PARSE_WORKERS = None        # Parser processes (default: one per CPU)
+
+# Catalog delta of the last incremental run (new, changed and removed products)
+DEFAULT_DELTA_PATH = os.path.join(os.path.dirname(__file__), 'products_delta.json')
+
+# BeautifulSoup tree builder: lxml (C, several times faster) when installed
+PARSER = os.getenv("SCRAPER_PARSER") or ("lxml" if importlib.util.find_spec("lxml") else "html.parser")
+
+# Markup that never holds product fields; removed before building the tree.
+# Shopify pages are mostly inline scripts, styles and SVG icons.
+NON_CONTENT_RE = re.compile(r"<(script|style|svg|noscript|template)\b.*?</\1\s*>|<!--.*?-->", re.IGNORECASE | re.DOTALL)
+JSON_LD_RE = re.compile(r"<script[^>]*type=[\"']application/ld\+json[\"'][^>]*>(.*?)</script>", re.IGNORECASE | re.DOTALL)
+PRODUCT_JSON_RE = re.compile(r"<script[^>]*(?:id=[\"']ProductJson[^\"']*[\"']|data-product-json)[^>]*>(.*?)</script>", re.IGNORECASE | re.DOTALL)
+SECTION_HEADERS_RE = re.compile(r"Why you’ll love this\?|Product Features", re.IGNORECASE)
 
 def clean_text(text):
     """Cleans whitespace from text."""
@@ -27,14 +54,12 @@ def clean_text(text):
     return re.sub(r'\s+', ' ', text).strip()
 
 def parse_price(text):
-    """Extracts the first integer price from a string."""
+    """Extracts the first price from a string ("Rs. 1,499.00" -> 1499) as an integer."""
     if not text:
         return 0
-    # Remove non-numeric characters except for potential delimiters if needed, 
-    # but here we just want the number.
-    # Strategy: Find digits.
-    clean = re.sub(r'[^\d]', '', text)
-    return int(clean) if clean else 0
+    # First number, with thousands separators and optional decimals
+    match = re.search(r'\d[\d,]*(?:\.\d+)?', str(text))
+    return int(float(match.group().replace(',', ''))) if match else 0
 
 def extract_price(soup):
     """Extracts the selling price of the product."""
@@ -63,48 +88,137 @@ def extract_price(soup):
             
     return 0
 
+def _section_text(header, marker, end_marker):
+    """Text of the container holding `header`, between `marker` and `end_marker`."""
+    container = header.find_parent("div") or header.find_parent("section")
+    if not container:
+        return None
+    parts = container.get_text(separator="\n").split(marker)
+    if len(parts) < 2:
+        return None
+    return parts[1].split(end_marker)[0]
+
 def extract_description_and_features(soup):
     """Extracts description and features from the product page."""
     description = "N/A"
     features = []
 
-    # Strategy: Find "Why you’ll love this?" header
-    desc_header = soup.find(string=re.compile(r"Why you’ll love this\?", re.IGNORECASE))
+    # Strategy: find the "Why you’ll love this?" and "Product Features" headers, in one pass
+    desc_header = feat_header = None
+    for header in soup.find_all(string=SECTION_HEADERS_RE):
+        if "love" in header.lower():
+            desc_header = desc_header or header
+        else:
+            feat_header = feat_header or header
+        if desc_header and feat_header:
+            break
+
     if desc_header:
-        container = desc_header.find_parent("div") or desc_header.find_parent("section")
-        if container:
-            full_text = container.get_text(separator="\n")
-            parts = full_text.split("Why you’ll love this?")
-            if len(parts) > 1:
-                description = clean_text(parts[1].split("Product Features")[0])
+        text = _section_text(desc_header, "Why you’ll love this?", "Product Features")
+        if text is not None:
+            description = clean_text(text)
 
     # Features
-    feat_header = soup.find(string=re.compile(r"Product Features", re.IGNORECASE))
     if feat_header:
-        container = feat_header.find_parent("div") or feat_header.find_parent("section")
-        if container:
-            full_text = container.get_text(separator="\n")
-            parts = full_text.split("Product Features")
-            if len(parts) > 1:
-                feature_text = parts[1].split("Fabric Features")[0]
-                for f in feature_text.split('\n'):
-                    clean_f = clean_text(f)
-                    if clean_f and len(clean_f) > 3:
-                        features.append(clean_f)
+        text = _section_text(feat_header, "Product Features", "Fabric Features")
+        if text is not None:
+            for f in text.split('\n'):
+                clean_f = clean_text(f)
+                if clean_f and len(clean_f) > 3:
+                    features.append(clean_f)
 
     # Fallback for description
     if description == "N/A" or not description:
-        meta_desc = soup.select_one("meta[name='description']")
+        meta_desc = soup.find("meta", attrs={"name": "description"})
         if meta_desc:
             description = meta_desc['content']
 
     return description, features
 
-def scrape_product_details(product_url):
-    """Scrapes details for a single product."""
-    soup = get_soup(product_url)
-    if not soup:
-        return None
+def _json_scripts(pattern, html):
+    for match in pattern.finditer(html):
+        try:
+            yield json.loads(match.group(1))
+        except ValueError:
+            continue
+
+def _find_json_ld_product(data):
+    if isinstance(data, list):
+        for item in data:
+            found = _find_json_ld_product(item)
+            if found:
+                return found
+    elif isinstance(data, dict):
+        types = data.get("@type")
+        if types == "Product" or (isinstance(types, list) and "Product" in types):
+            return data
+        if "@graph" in data:
+            return _find_json_ld_product(data["@graph"])
+    return None
+
+def extract_structured_product(html):
+    """
+    Product fields from the data embedded in the page (schema.org JSON-LD,
+    Shopify product JSON), found with regular expressions without building a
+    tree. Returns only the fields present: title, price, description,
+    description_html (Shopify's, which holds the feature sections),
+    image_url, category.
+    """
+    fields = {}
+    for data in _json_scripts(JSON_LD_RE, html):
+        product = _find_json_ld_product(data)
+        if not product:
+            continue
+        fields["title"] = clean_text(product.get("name"))
+        offers = product.get("offers") or {}
+        offer = offers[0] if isinstance(offers, list) and offers else offers
+        if isinstance(offer, dict):
+            # "1499.00", 1499 or "Rs. 1,499"; unparseable prices fall back to the page
+            price = parse_price(offer.get("price") or offer.get("lowPrice"))
+            if price:
+                fields["price"] = price
+        if product.get("description"):
+            fields["description"] = clean_text(product["description"])
+        image = product.get("image")
+        image = image[0] if isinstance(image, list) and image else image
+        if isinstance(image, dict):
+            image = image.get("url")
+        if image:
+            fields["image_url"] = "https:" + image if image.startswith("//") else image
+        if product.get("category"):
+            fields["category"] = clean_text(product["category"])
+        break
+
+    for data in _json_scripts(PRODUCT_JSON_RE, html):
+        if not isinstance(data, dict) or "title" not in data:
+            continue
+        fields.setdefault("title", clean_text(data["title"]))
+        if "price" not in fields and isinstance(data.get("price"), (int, float)):
+            # Shopify prices are in minor units (paise)
+            fields["price"] = int(data["price"]) // 100
+        if data.get("description"):
+            fields["description_html"] = data["description"]
+        image = data.get("featured_image")
+        if image and "image_url" not in fields:
+            fields["image_url"] = "https:" + image if image.startswith("//") else image
+        if data.get("type"):
+            fields.setdefault("category", clean_text(data["type"]))
+        break
+    return fields
+
+def _is_breadcrumbs(tag):
+    """Matches .breadcrumb, .breadcrumbs and nav[aria-label='breadcrumbs'] (cheaper than a CSS select)."""
+    classes = tag.get("class") or ()
+    return "breadcrumb" in classes or "breadcrumbs" in classes or (tag.name == "nav" and tag.get("aria-label") == "breadcrumbs")
+
+def parse_product_page(html, product_url, parser=None):
+    """
+    Parses a product page into a product dict. Pure CPU work, safe to run in a worker process.
+    Title, price and image come from the page's embedded product data when it has
+    any; the tree, built without scripts, styles and SVGs, supplies the rest.
+    """
+    structured = extract_structured_product(html)
+    soup = BeautifulSoup(NON_CONTENT_RE.sub("", html), parser or PARSER)
 
     product = {
         'url': product_url,
@@ -112,43 +226,65 @@ def scrape_product_details(product_url):
     }
 
     # Title
-    title_tag = soup.select_one("h1.product-title, h1.title, .product_title")
-    product['title'] = clean_text(title_tag.get_text()) if title_tag else "N/A"
+    if structured.get("title"):
+        product['title'] = structured["title"]
+    else:
+        title_tag = soup.select_one("h1.product-title, h1.title, .product_title")
+        product['title'] = clean_text(title_tag.get_text()) if title_tag else "N/A"
 
     # Price
-    product['price'] = extract_price(soup)
+    product['price'] = structured.get("price") or extract_price(soup)
 
     # Description & Features
     desc, feats = extract_description_and_features(soup)
+    if not feats and structured.get("description_html"):
+        # Theme without the sections in the page body: Shopify's description HTML has them
+        fragment_desc, feats = extract_description_and_features(
+            BeautifulSoup(f"<div>{structured['description_html']}</div>", parser or PARSER)
+        )
+        if fragment_desc != "N/A":
+            desc = fragment_desc
+    if desc == "N/A" and structured.get("description"):
+        desc = structured["description"]
     product['description'] = desc
     product['features'] = feats
 
     # Image URL
-    image_tag = soup.select_one("meta[property='og:image']")
+    image_tag = soup.find("meta", attrs={"property": "og:image"})
     if image_tag:
         product['image_url'] = image_tag['content']
+    elif structured.get("image_url"):
+        product['image_url'] = structured["image_url"]
     else:
         img_tag = soup.select_one(".product-gallery img, .product-photo-container img")
         product['image_url'] = "https:" + img_tag['src'] if img_tag else "N/A"
 
     # Category (Breadcrumbs)
-    breadcrumbs = soup.select(".breadcrumb a, .breadcrumbs a, nav[aria-label='breadcrumbs'] a")
+    container = soup.find(_is_breadcrumbs)
+    breadcrumbs = container.find_all("a") if container else []
     if breadcrumbs and len(breadcrumbs) > 1:
         cat_cand = clean_text(breadcrumbs[1].get_text())
         if cat_cand.lower() != "home":
             product['category'] = cat_cand
+    elif structured.get("category"):
+        product['category'] = structured["category"]
 
     return product
 
-def scrape_hunnit_products():
-    """Main function to scrape products."""
-    print(f"Fetching product list from {COLLECTION_URL}...")
-    soup = get_soup(COLLECTION_URL)
-    if not soup:
-        print("Failed to load collection page.")
-        return
+def parse_pages(pages, workers=PARSE_WORKERS, parser=None):
+    """
+    Parses many saved product pages, given as (html, url) pairs, across a
+    process pool (in-process with workers=1). Results are in input order.
+    """
+    if workers == 1:
+        return [parse_product_page(html, url, parser) for html, url in pages]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        htmls, urls = zip(*pages) if pages else ((), ())
+        return list(executor.map(parse_product_page, htmls, urls, [parser] * len(htmls), chunksize=8))
 
-    # Find unique product links
+def extract_product_links(html):
+    """Returns the unique, query-free product URLs linked from a collection page."""
+    soup = BeautifulSoup(html, PARSER, parse_only=SoupStrainer("a", href=re.compile("/products/")))
     product_links = set()
     for a in soup.select("a[href*='/products/']"):
         href = a['href']
@@ -156,28 +292,321 @@ def scrape_hunnit_products():
             full_url = BASE_URL + href if href.startswith("/") else href
             full_url = full_url.split('?')[0]
             product_links.add(full_url)
+    return product_links
 
-    print(f"Found {len(product_links)} unique product links.")
+def scrape_product_details(product_url):
+    """Scrapes details for a single product (blocking, for one-off use)."""
+    try:
+        response = httpx.get(product_url, headers=HEADERS, follow_redirects=True)
+        response.raise_for_status()
+    except Exception as e:
+        print(f"Error fetching {product_url}: {e}")
+        return None
+    return parse_product_page(response.text, product_url)
 
-    products = []
-    target_count = 25
+class TokenBucket:
+    """Allows `rate` requests per second on average, with bursts up to `capacity`."""
 
-    for i, link in enumerate(product_links):
-        if i >= target_count:
-            break
-        
-        print(f"Scraping ({i + 1}/{target_count}): {link}")
-        product_data = scrape_product_details(link)
-        if product_data:
-            products.append(product_data)
-            time.sleep(1) 
-
-    # Save to JSON
-    output_file = "products.json"
-    with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(products, f, indent=4, ensure_ascii=False)
-    
-    print(f"Scraping complete. Saved {len(products)} products to {output_file}.")
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class Crawler:
+    """
+    Async crawler sharing one connection pool across all requests.
+
+    Concurrency is capped by a semaphore, each host is rate limited by its own
+    token bucket, and HTML parsing is handed to a process pool so BeautifulSoup
+    never blocks the fetches.
+    """
+
+    def __init__(self, concurrency=CONCURRENCY, rate=REQUESTS_PER_SECOND, max_retries=MAX_RETRIES, parse_workers=PARSE_WORKERS, parser=None):
+        self.concurrency = concurrency
+        self.rate = rate
+        self.max_retries = max_retries
+        self.parse_workers = parse_workers
+        self.parser = parser or PARSER
+        self.buckets = {}
+        self.semaphore = None
+        self.client = None
+        self.executor = None
+
+    async def __aenter__(self):
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        self.client = httpx.AsyncClient(
+            headers=HEADERS,
+            follow_redirects=True,
+            timeout=30.0,
+            limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
+        )
+        self.executor = ProcessPoolExecutor(max_workers=self.parse_workers)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.client.aclose()
+        self.executor.shutdown()
+
+    def _bucket(self, url):
+        host = urlparse(url).netloc
+        if host not in self.buckets:
+            self.buckets[host] = TokenBucket(self.rate)
+        return self.buckets[host]
+
+    async def fetch(self, url, headers=None):
+        """
+        Fetches a URL, retrying transient failures with exponential backoff.
+        Returns the response (2xx or 304 Not Modified), or None on failure.
+        """
+        for attempt in range(self.max_retries + 1):
+            await self._bucket(url).acquire()
+            try:
+                async with self.semaphore:
+                    response = await self.client.get(url, headers=headers)
+                if response.status_code == 304:
+                    return response
+                if response.status_code not in RETRYABLE_STATUS:
+                    response.raise_for_status()
+                    return response
+                error = f"HTTP {response.status_code}"
+                retry_after = response.headers.get("Retry-After")
+            except httpx.HTTPStatusError as e:
+                print(f"Error fetching {url}: {e}")
+                return None
+            except httpx.HTTPError as e:
+                error = str(e) or type(e).__name__
+                retry_after = None
+
+            if attempt == self.max_retries:
+                print(f"Error fetching {url}: {error} (giving up after {attempt + 1} attempts)")
+                return None
+            delay = float(retry_after) if retry_after and retry_after.isdigit() else 2 ** attempt + random.random()
+            await asyncio.sleep(delay)
+
+    async def parse(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    async def collect_product_links(self, max_pages=MAX_COLLECTION_PAGES):
+        """
+        Walks the paginated collection until a page adds no new product links.
+        Returns (links, complete): `complete` is False when a collection page
+        failed or `max_pages` ran out, i.e. some products may be missing.
+        """
+        product_links = set()
+        for page in range(1, max_pages + 1):
+            response = await self.fetch(f"{COLLECTION_URL}?page={page}")
+            if response is None:
+                print(f"Collection page {page} failed, the product list is incomplete")
+                return product_links, False
+            links = await self.parse(extract_product_links, response.text)
+            new_links = links - product_links
+            if not new_links:
+                return product_links, True
+            product_links |= new_links
+            print(f"Collection page {page}: {len(new_links)} new product links")
+        print(f"Stopped after {max_pages} collection pages, the product list may be incomplete")
+        return product_links, False
+
+    async def parse_product(self, html, url):
+        """Parses a product page, or returns None if parsing fails."""
+        try:
+            return await self.parse(parse_product_page, html, url, self.parser)
+        except Exception as e:
+            print(f"Error parsing {url}: {e}")
+            return None
+
+    async def scrape_product(self, url):
+        response = await self.fetch(url)
+        if response is None:
+            return None
+        return await self.parse_product(response.text, url)
+
+    async def scrape_product_incremental(self, url, state):
+        """
+        Conditionally re-scrapes a product page against the stored crawl state.
+        Returns (status, product) where status is "new", "changed", "unchanged" or "failed".
+        """
+        previous = state.get(url)
+        response = await self.fetch(url, headers=state.conditional_headers(url))
+        if response is None:
+            return self._failed(url, previous, state)
+
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if response.status_code == 304:
+            state.touch(url, etag, last_modified)
+            return "unchanged", state.product(url)
+
+        page_hash = content_hash(response.content)
+        if previous is not None and previous["content_hash"] == page_hash:
+            state.touch(url, etag, last_modified)
+            return "unchanged", state.product(url)
+
+        product = await self.parse_product(response.text, url)
+        if product is None:
+            return self._failed(url, previous, state)
+        state.record(url, etag, last_modified, page_hash, product)
+        return ("new" if previous is None else "changed"), product
+
+    @staticmethod
+    def _failed(url, previous, state):
+        # Keep the previous version rather than reporting the product as removed
+        if previous is not None:
+            state.touch(url)
+        return "failed", None
+
+async def _deliver(sink, product):
+    """
+    Passes a product to `sink` on a worker thread. A sink that blocks (a full
+    ProductQueue while ingestion catches up) then only holds back the loop
+    handing out products; fetches in flight and rate limiting carry on.
+    """
+    await asyncio.get_running_loop().run_in_executor(None, sink, product)
+
+async def crawl(sink, limit=None, concurrency=CONCURRENCY, rate=REQUESTS_PER_SECOND, max_pages=MAX_COLLECTION_PAGES, parse_workers=PARSE_WORKERS, parser=None, skip=()):
+    """
+    Crawls the collection, passing each scraped product to `sink` as soon as
+    it is parsed. Product URLs in `skip` are not fetched.
+    Returns the number of products scraped.
+    """
+    async with Crawler(concurrency=concurrency, rate=rate, parse_workers=parse_workers, parser=parser) as crawler:
+        print(f"Fetching product list from {COLLECTION_URL}...")
+        product_links, _ = await crawler.collect_product_links(max_pages)
+        product_links = sorted(product_links)
+        print(f"Found {len(product_links)} unique product links.")
+        if limit:
+            product_links = product_links[:limit]
+        if skip:
+            product_links = [link for link in product_links if link not in skip]
+            print(f"Skipping pages already scraped, {len(product_links)} left.")
+
+        scraped = 0
+        done = 0
+        tasks = [asyncio.create_task(crawler.scrape_product(link)) for link in product_links]
+        for task in asyncio.as_completed(tasks):
+            product_data = await task
+            done += 1
+            if product_data:
+                await _deliver(sink, product_data)
+                scraped += 1
+            if done % 50 == 0 or done == len(tasks):
+                print(f"Scraped {done}/{len(tasks)} product pages ({done - scraped} failed)")
+        return scraped
+
+async def crawl_incremental(state, limit=None, concurrency=CONCURRENCY, rate=REQUESTS_PER_SECOND, max_pages=MAX_COLLECTION_PAGES, parse_workers=PARSE_WORKERS, parser=None, sink=None):
+    """
+    Re-crawls the collection using conditional requests against `state`.
+    New and changed products are also passed to `sink` as they are parsed.
+    Returns the delta {"new": [...], "changed": [...], "removed": [...]}.
+    """
+    delta = {"new": [], "changed": [], "removed": []}
+    async with Crawler(concurrency=concurrency, rate=rate, parse_workers=parse_workers, parser=parser) as crawler:
+        print(f"Fetching product list from {COLLECTION_URL}...")
+        product_links, complete = await crawler.collect_product_links(max_pages)
+        product_links = sorted(product_links)
+        print(f"Found {len(product_links)} unique product links.")
+        if not product_links:
+            # Never treat a failed listing as "every product was removed"
+            return delta
+        if limit:
+            product_links = product_links[:limit]
+
+        unchanged = failed = 0
+        tasks = [asyncio.create_task(crawler.scrape_product_incremental(link, state)) for link in product_links]
+        for task in asyncio.as_completed(tasks):
+            status, product = await task
+            if status in delta:
+                delta[status].append(product)
+                if sink is not None:
+                    await _deliver(sink, product)
+            elif status == "unchanged":
+                unchanged += 1
+            else:
+                failed += 1
+
+    # Products only count as removed when the whole catalog was walked
+    if complete and not limit:
+        delta["removed"] = state.pop_unseen()
+    elif not complete:
+        print("Product list incomplete: not checking for removed products")
+    print(
+        f"Delta: {len(delta['new'])} new, {len(delta['changed'])} changed, "
+        f"{len(delta['removed'])} removed, {unchanged} unchanged, {failed} failed"
+    )
+    return delta
+
+def scrape_hunnit_products(limit=None, concurrency=CONCURRENCY, rate=REQUESTS_PER_SECOND, max_pages=MAX_COLLECTION_PAGES, state_path=None, parse_workers=PARSE_WORKERS, parser=None, output_path=DEFAULT_PRODUCTS_PATH, resume=False, sink=None, delta_path=DEFAULT_DELTA_PATH):
+    """
+    Main function to scrape products.
+    Every product is appended to the JSONL file at `output_path` as soon as it
+    is parsed, and also passed to `sink` when given (e.g. a ProductQueue
+    feeding ingestion). With `resume`, the products already in the file are
+    kept and their pages are not fetched again.
+    With `state_path`, only changed pages are re-parsed: the new and changed
+    products go to `sink`, the delta is written to `delta_path` and
+    the full catalog file is rewritten from the crawl state.
+    """
+    started = time.perf_counter()
+
+    if state_path:
+        state = CrawlState(state_path)
+        try:
+            delta = asyncio.run(crawl_incremental(state, limit, concurrency, rate, max_pages, parse_workers, parser, sink))
+            with JsonlWriter(output_path) as writer:
+                for product in state.products():
+                    writer.write(product)
+            count = writer.count
+        finally:
+            state.close()
+
+        with open(delta_path, "w", encoding="utf-8") as f:
+            json.dump(delta, f, indent=4, ensure_ascii=False)
+        print(f"Saved catalog delta to {delta_path}.")
+    else:
+        skip = seen_urls(output_path) if resume else set()
+        with JsonlWriter(output_path, append=resume) as writer:
+            def emit(product):
+                writer.write(product)
+                if sink is not None:
+                    sink(product)
+
+            count = asyncio.run(crawl(emit, limit, concurrency, rate, max_pages, parse_workers, parser, skip))
+        count += len(skip)
+
+    elapsed = time.perf_counter() - started
+    print(f"Scraping complete. Saved {count} products to {output_path} in {elapsed:.1f}s.")
 
 if __name__ == "__main__":
-    scrape_hunnit_products()
+    parser = argparse.ArgumentParser(description="Scrape the Hunnit product catalog.")
+    parser.add_argument("--limit", type=int, default=None, help="Max number of products to scrape (default: all)")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY, help="Max requests in flight")
+    parser.add_argument("--rate", type=float, default=REQUESTS_PER_SECOND, help="Requests per second per host")
+    parser.add_argument("--max-pages", type=int, default=MAX_COLLECTION_PAGES, help="Max collection pages to walk")
+    parser.add_argument("--incremental", action="store_true", help="Only re-parse pages that changed since the last incremental run")
+    parser.add_argument("--state", default=DEFAULT_STATE_PATH, help="Crawl state database used by --incremental")
+    parser.add_argument("--delta", default=DEFAULT_DELTA_PATH, help="Where --incremental writes the catalog delta")
+    parser.add_argument("--parse-workers", type=int, default=PARSE_WORKERS, help="Parser processes (default: one per CPU)")
+    parser.add_argument("--parser", choices=["lxml", "html.parser"], default=PARSER, help=f"HTML parser backend (default: {PARSER})")
+    parser.add_argument("--output", default=DEFAULT_PRODUCTS_PATH, help="JSONL file the products are appended to")
+    parser.add_argument("--resume", action="store_true", help="Keep the products already in --output and skip their pages")
+    args = parser.parse_args()
+    scrape_hunnit_products(
+        args.limit, args.concurrency, args.rate, args.max_pages,
+        state_path=args.state if args.incremental else None,
+        parse_workers=args.parse_workers, parser=args.parser,
+        output_path=args.output, resume=args.resume, delta_path=args.delta,
+    )
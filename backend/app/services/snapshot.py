@@ -0,0 +1,337 @@
+import argparse
+import bisect
+import json
+import logging
+import os
+import re
+import shutil
+import sys
+import threading
+import time
+from collections.abc import Sequence
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+# Add the backend directory to sys.path to allow imports from app
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from app.core.config import CATALOG_SNAPSHOT_DIR
+from app.services import catalog
+from app.services.vector_index import VectorIndex
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SNAPSHOT_DIR = os.path.join(os.path.dirname(__file__), 'catalog_snapshot')
+
+# Names the published version; replaced atomically by each export
+CURRENT_FILE = 'CURRENT'
+
+# Versions kept after an export. Workers still mapping an older one keep
+# reading it until they switch: unlinked files stay mapped.
+KEEP_VERSIONS = 2
+
+# Stored in int columns for missing values
+INT_NULL = np.iinfo(np.int64).min
+
+EMBEDDING_COLUMNS = "id, product_id, chunk_index, chunk_content, embedding"
+# Stored alongside the embedding matrix
+EMBEDDING_COLUMN_KINDS = {"id": "text", "product_id": "text", "chunk_index": "int", "chunk_content": "text"}
+
+VERSION_RE = re.compile(r"^v(\d+)$")
+
+
+def snapshot_dir(directory: Optional[str] = None) -> str:
+    return directory or CATALOG_SNAPSHOT_DIR or DEFAULT_SNAPSHOT_DIR
+
+
+def _load(path: str) -> np.ndarray:
+    return np.load(path, mmap_mode='r')
+
+
+def _column_kind(values: List[Any]) -> str:
+    present = [value for value in values if value is not None]
+    if present and all(isinstance(value, int) and not isinstance(value, bool) for value in present):
+        return "int"
+    if all(isinstance(value, str) for value in present):
+        return "text"
+    return "json"
+
+
+def _write_column(path: str, values: List[Any], kind: str):
+    """
+    Writes one column: an int64 array for "int" columns; for "text" and
+    "json" (JSON-encoded values) the UTF-8 bytes of all values in one array,
+    with offsets and a null mask.
+    """
+    if kind == "int":
+        np.save(f"{path}.npy", np.asarray([INT_NULL if v is None else v for v in values], dtype=np.int64))
+        return
+    encoded = [b"" if v is None else (v if kind == "text" else json.dumps(v, ensure_ascii=False)).encode('utf-8') for v in values]
+    offsets = np.zeros(len(values) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    np.save(f"{path}.offsets.npy", offsets)
+    np.save(f"{path}.data.npy", np.frombuffer(b"".join(encoded), dtype=np.uint8))
+    if any(v is None for v in values):
+        np.save(f"{path}.nulls.npy", np.asarray([v is None for v in values]))
+
+
+class Column(Sequence):
+    """
+    A memory-mapped snapshot column. Values are decoded on access, so
+    reading a few rows never touches the rest of the file.
+    """
+
+    def __init__(self, path: str, kind: str):
+        self.kind = kind
+        if kind == "int":
+            self._values = _load(f"{path}.npy")
+            self._length = len(self._values)
+            return
+        self._offsets = _load(f"{path}.offsets.npy")
+        self._data = _load(f"{path}.data.npy")
+        self._nulls = _load(f"{path}.nulls.npy") if os.path.exists(f"{path}.nulls.npy") else None
+        self._length = len(self._offsets) - 1
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        i = int(i)
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        if self.kind == "int":
+            value = int(self._values[i])
+            return None if value == INT_NULL else value
+        if self._nulls is not None and self._nulls[i]:
+            return None
+        text = self._data[self._offsets[i]:self._offsets[i + 1]].tobytes().decode('utf-8')
+        return json.loads(text) if self.kind == "json" else text
+
+    def position(self, value) -> Optional[int]:
+        """
+        Position of `value` in a column sorted ascending (product IDs), by
+        binary search.
+        """
+        i = bisect.bisect_left(self, value)
+        return i if i < len(self) and self[i] == value else None
+
+
+class CatalogSnapshot:
+    """
+    One published catalog version, memory-mapped read-only.
+
+    Products are stored column by column, sorted by ID. Embeddings are one
+    L2-normalized float32 matrix (`embeddings.npy`), grouped by product, with
+    the product position of each row and one averaged vector per product.
+    Every worker mapping the same version shares one page-cache copy, and
+    opening it reads only the manifest.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, 'manifest.json'), 'r', encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        self.version = self.manifest["version"]
+        self.columns = {
+            name: Column(os.path.join(path, f"products.{name}"), kind)
+            for name, kind in self.manifest["product_columns"].items()
+        }
+        self.ids = self.columns["id"]
+        self.embeddings = _load(os.path.join(path, 'embeddings.npy'))
+        self.embedding_products = _load(os.path.join(path, 'embeddings.product.npy'))
+        self.embedding_columns = {
+            name: Column(os.path.join(path, f"embeddings.{name}"), kind)
+            for name, kind in EMBEDDING_COLUMN_KINDS.items()
+        }
+        self.product_vectors = _load(os.path.join(path, 'product_vectors.npy'))
+        self._index: Optional[VectorIndex] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def row(self, position: int, columns: Optional[List[str]] = None) -> Dict[str, Any]:
+        names = columns or list(self.columns)
+        return {name: self.columns[name][position] if name in self.columns else None for name in names}
+
+    def rows(self, start: int = 0, stop: Optional[int] = None, columns: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        stop = len(self) if stop is None else min(stop, len(self))
+        return [self.row(position, columns) for position in range(start, stop)]
+
+    def get(self, product_id: str, columns: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        position = self.ids.position(product_id)
+        return self.row(position, columns) if position is not None else None
+
+    def embedding_rows(self, columns: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        names = columns or EMBEDDING_COLUMNS.split(", ")
+        rows = []
+        for i in range(len(self.embeddings)):
+            row = {}
+            for name in names:
+                if name == "embedding":
+                    row[name] = self.embeddings[i].tolist()
+                else:
+                    row[name] = self.embedding_columns[name][i] if name in self.embedding_columns else None
+            rows.append(row)
+        return rows
+
+    def index(self, mode: str = "exact") -> VectorIndex:
+        """
+        A vector index searching the mapped embeddings in place. The exact
+        index is built once and shared.
+        """
+        if mode != "exact":
+            return self._build_index(mode)
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    self._index = self._build_index(mode)
+        return self._index
+
+    def _build_index(self, mode: str) -> VectorIndex:
+        return VectorIndex.from_arrays(
+            self.embedding_columns["id"], self.embedding_columns["product_id"], self.embedding_columns["chunk_content"],
+            self.embedding_products, self.embeddings, self.ids.position, self.product_vectors, mode=mode,
+        )
+
+
+def list_versions(directory: Optional[str] = None) -> List[int]:
+    directory = snapshot_dir(directory)
+    if not os.path.isdir(directory):
+        return []
+    return sorted(int(m.group(1)) for m in (VERSION_RE.match(name) for name in os.listdir(directory)) if m)
+
+
+def current_version(directory: Optional[str] = None) -> Optional[int]:
+    """
+    The published version, or None when nothing was exported yet.
+    """
+    try:
+        with open(os.path.join(snapshot_dir(directory), CURRENT_FILE), 'r', encoding='utf-8') as f:
+            return int(f.read().strip())
+    except FileNotFoundError:
+        return None
+
+
+def open_snapshot(version: int, directory: Optional[str] = None) -> CatalogSnapshot:
+    return CatalogSnapshot(os.path.join(snapshot_dir(directory), f"v{version}"))
+
+
+def _publish(directory: str, version: int):
+    # Write-then-rename: readers see the old or the new version, never a partial file
+    tmp_path = os.path.join(directory, CURRENT_FILE + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(str(version))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, os.path.join(directory, CURRENT_FILE))
+
+
+def _prune(directory: str, keep: int):
+    for version in list_versions(directory)[:-max(1, keep)]:
+        shutil.rmtree(os.path.join(directory, f"v{version}"), ignore_errors=True)
+
+
+def _write_version(staging: str, version: int, products: List[Dict[str, Any]], embeddings: List[Dict[str, Any]]):
+    products = sorted(products, key=lambda p: p["id"])
+    product_columns = {}
+    for name in dict.fromkeys(key for product in products for key in product):
+        values = [product.get(name) for product in products]
+        product_columns[name] = _column_kind(values)
+        _write_column(os.path.join(staging, f"products.{name}"), values, product_columns[name])
+    if "id" not in product_columns:
+        product_columns["id"] = "text"
+        _write_column(os.path.join(staging, "products.id"), [], "text")
+
+    # Embedding rows grouped by product, in chunk order
+    positions = {product["id"]: i for i, product in enumerate(products)}
+    embeddings = sorted(
+        (e for e in embeddings if e["product_id"] in positions),
+        key=lambda e: (positions[e["product_id"]], e.get("chunk_index") or 0),
+    )
+    if embeddings:
+        vectors = np.asarray([
+            json.loads(e["embedding"]) if isinstance(e["embedding"], str) else e["embedding"] for e in embeddings
+        ], dtype=np.float32)
+    else:
+        # Nothing embedded yet: the dimensions are unknown
+        vectors = np.zeros((0, 0), dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    vectors /= norms
+    codes = np.asarray([positions[e["product_id"]] for e in embeddings], dtype=np.int64)
+    sums = np.zeros((len(products), vectors.shape[1]), dtype=np.float32)
+    np.add.at(sums, codes, vectors)
+    norms = np.linalg.norm(sums, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+
+    np.save(os.path.join(staging, 'embeddings.npy'), vectors)
+    np.save(os.path.join(staging, 'embeddings.product.npy'), codes)
+    np.save(os.path.join(staging, 'product_vectors.npy'), sums / norms)
+    for name, kind in EMBEDDING_COLUMN_KINDS.items():
+        _write_column(os.path.join(staging, f"embeddings.{name}"), [e.get(name) for e in embeddings], kind)
+
+    manifest = {
+        "version": version,
+        "created_at": time.time(),
+        "products": len(products),
+        "embeddings": len(embeddings),
+        "dimensions": int(vectors.shape[1]),
+        "product_columns": product_columns,
+    }
+    with open(os.path.join(staging, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def write_snapshot(products: List[Dict[str, Any]], embeddings: List[Dict[str, Any]],
+                   directory: Optional[str] = None, keep: int = KEEP_VERSIONS) -> str:
+    """
+    Writes products and product_embeddings rows as the next snapshot version
+    and publishes it. Returns the version directory. A failed export leaves
+    no staging directory behind.
+    """
+    directory = snapshot_dir(directory)
+    os.makedirs(directory, exist_ok=True)
+    version = max(list_versions(directory), default=0) + 1
+    final_path = os.path.join(directory, f"v{version}")
+    staging = final_path + '.tmp'
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    try:
+        manifest = _write_version(staging, version, products, embeddings)
+        os.rename(staging, final_path)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    _publish(directory, version)
+    _prune(directory, keep)
+    logger.info(f"Published catalog snapshot v{version}: {manifest['products']} products, {manifest['embeddings']} embeddings")
+    return final_path
+
+
+def export_snapshot(directory: Optional[str] = None, keep: int = KEEP_VERSIONS) -> str:
+    """
+    Exports the catalog in the configured store, i.e. what ingest_data wrote,
+    as a new snapshot version.
+    """
+    products = catalog.fetch_all_rows("products")
+    embeddings = catalog.fetch_all_rows("product_embeddings", EMBEDDING_COLUMNS)
+    return write_snapshot(products, embeddings, directory, keep)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Export the catalog as a memory-mappable snapshot for STORE_BACKEND=snapshot.")
+    parser.add_argument("--dir", default=None, help=f"Snapshot directory (default: CATALOG_SNAPSHOT_DIR or {DEFAULT_SNAPSHOT_DIR})")
+    parser.add_argument("--keep", type=int, default=KEEP_VERSIONS, help="Versions to keep on disk")
+    args = parser.parse_args()
+    started = time.perf_counter()
+    path = export_snapshot(args.dir, args.keep)
+    print(f"Exported catalog snapshot to {path} in {time.perf_counter() - started:.1f}s.")
@@ -0,0 +1,417 @@
+import asyncio
+import bisect
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.core.config import STORE_BACKEND, MEMORY_STORE_PATH, LOCAL_STORE_LATENCY_MS
+from fastapi.concurrency import run_in_threadpool
+
+from app.core import db
+from app.core.db import get_client, get_async_client, execute
+from app.services.embedders import get_embedder
+from app.services.product_stream import read_products
+from app.services.snapshot import CatalogSnapshot, current_version, open_snapshot, snapshot_dir
+from app.services.vector_index import VectorIndex
+
+logger = logging.getLogger(__name__)
+
+# PostgREST caps how many rows a single request returns
+PAGE_SIZE = 1000
+
+DEFAULT_PRODUCTS_PATH = os.path.join(os.path.dirname(__file__), 'hunnit_products.json')
+
+
+class CatalogStore:
+    """
+    Storage for products and their embeddings.
+
+    The sync methods are used by background index loading, the catalog
+    watcher and scripts; the async ones by request handlers.
+    """
+
+    async def warm_up(self):
+        """
+        Prepares connections or data ahead of the first request.
+        """
+
+    def fetch_all_rows(self, table: str, columns: str = "*") -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def snapshot(self) -> Optional[CatalogSnapshot]:
+        """
+        The memory-mapped catalog snapshot the store serves, if any; the
+        in-process indexes are then built on it instead of fetched rows.
+        """
+        return None
+
+    def fetch_version(self) -> int:
+        raise NotImplementedError
+
+    def bump_version(self):
+        raise NotImplementedError
+
+    async def list_products(self, limit: int, offset: int = 0, cursor: Optional[str] = None, columns: str = "*") -> List[Dict[str, Any]]:
+        """
+        Products ordered by ID. With `cursor` (the last ID of the previous
+        page, or "" for the first page) uses keyset pagination, otherwise offset.
+        """
+        raise NotImplementedError
+
+    async def get_product(self, product_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    async def get_products(self, product_ids: List[str]) -> List[Dict[str, Any]]:
+        """
+        Products with the given IDs, in no particular order.
+        """
+        raise NotImplementedError
+
+    async def match_embeddings(self, query_embedding: List[float], match_threshold: float, match_count: int) -> List[Dict[str, Any]]:
+        """
+        Same contract as the match_products RPC.
+        """
+        raise NotImplementedError
+
+    async def match_products_full(self, query_embedding: List[float], match_threshold: float, match_count: int) -> List[Dict[str, Any]]:
+        """
+        Same contract as the match_products_full RPC: product rows with a
+        `similarity` field, best first.
+        """
+        raise NotImplementedError
+
+    async def product_vectors(self, product_ids: List[str]) -> Optional[np.ndarray]:
+        """
+        One normalized vector per product (its chunk embeddings averaged), in
+        the given order, or None when any of them has no embeddings.
+        """
+        raise NotImplementedError
+
+
+class SupabaseStore(CatalogStore):
+    async def warm_up(self):
+        await db.warm_up()
+
+    def fetch_all_rows(self, table: str, columns: str = "*") -> List[Dict[str, Any]]:
+        # Page past the PostgREST row cap
+        rows = []
+        offset = 0
+        while True:
+            response = get_client().table(table).select(columns) \
+                .order("id").range(offset, offset + PAGE_SIZE - 1).execute()
+            rows.extend(response.data)
+            if len(response.data) < PAGE_SIZE:
+                return rows
+            offset += PAGE_SIZE
+
+    def fetch_version(self) -> int:
+        response = get_client().table("catalog_version").select("version").eq("id", 1).execute()
+        return response.data[0]["version"] if response.data else 0
+
+    def bump_version(self):
+        get_client().rpc("bump_catalog_version", {}).execute()
+
+    async def list_products(self, limit: int, offset: int = 0, cursor: Optional[str] = None, columns: str = "*") -> List[Dict[str, Any]]:
+        client = await get_async_client()
+        query = client.table("products").select(columns).order("id")
+        if cursor is not None:
+            if cursor:
+                query = query.gt("id", cursor)
+            query = query.limit(limit)
+        else:
+            query = query.range(offset, offset + limit - 1)
+        response = await execute(query)
+        return response.data
+
+    async def get_product(self, product_id: str) -> Optional[Dict[str, Any]]:
+        client = await get_async_client()
+        response = await execute(client.table("products").select("*").eq("id", product_id))
+        if response.data:
+            return response.data[0]
+        return None
+
+    async def get_products(self, product_ids: List[str]) -> List[Dict[str, Any]]:
+        client = await get_async_client()
+        response = await execute(client.table("products").select("*").in_("id", product_ids))
+        return response.data
+
+    async def match_embeddings(self, query_embedding: List[float], match_threshold: float, match_count: int) -> List[Dict[str, Any]]:
+        client = await get_async_client()
+        response = await execute(
+            client.rpc(
+                'match_products',
+                {
+                    'query_embedding': query_embedding,
+                    'match_threshold': match_threshold,
+                    'match_count': match_count
+                }
+            )
+        )
+        return response.data
+
+    async def match_products_full(self, query_embedding: List[float], match_threshold: float, match_count: int) -> List[Dict[str, Any]]:
+        client = await get_async_client()
+        response = await execute(
+            client.rpc(
+                'match_products_full',
+                {
+                    'query_embedding': query_embedding,
+                    'match_threshold': match_threshold,
+                    'match_count': match_count
+                }
+            )
+        )
+        return response.data
+
+    async def product_vectors(self, product_ids: List[str]) -> Optional[np.ndarray]:
+        client = await get_async_client()
+        response = await execute(
+            client.table('product_embeddings').select('id, product_id, embedding').in_('product_id', product_ids)
+        )
+        return VectorIndex(response.data).product_vectors(product_ids)
+
+
+class MemoryStore(CatalogStore):
+    """
+    In-process store built from a scraped products file, for running the API,
+    tests and benchmarks without Supabase.
+
+    Rows are mapped exactly as ingestion maps them, with IDs derived from the
+    SKU so they are stable across restarts. Embeddings are computed with the
+    configured embedder on first use. Every call waits `latency_ms`, like one
+    database round trip.
+    """
+
+    def __init__(self, path: Optional[str] = None, products: Optional[List[Dict[str, Any]]] = None, latency_ms: float = LOCAL_STORE_LATENCY_MS):
+        self.path = path or DEFAULT_PRODUCTS_PATH
+        self.latency = latency_ms / 1000
+        self._source = products
+        self._tables: Optional[Dict[str, List[Dict[str, Any]]]] = None
+        self._products_by_id: Dict[str, Dict[str, Any]] = {}
+        self._index: Optional[VectorIndex] = None
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._tables is not None:
+            return
+        with self._lock:
+            if self._tables is not None:
+                return
+            # Imported here: the ingestion script pulls in the embedding pipeline
+            from app.services.ingest_data import build_product_row, build_embedding_chunks
+
+            source = self._source if self._source is not None else read_products(self.path)
+
+            products, chunks = [], []
+            for item in source:
+                row = build_product_row(item)
+                row["id"] = str(uuid.uuid5(uuid.NAMESPACE_URL, row["sku_id"]))
+                products.append(row)
+                chunks.extend((row["id"], index, text) for index, text in enumerate(build_embedding_chunks(item)))
+
+            vectors = get_embedder().embed([text for _, _, text in chunks]) if chunks else []
+            embeddings = [
+                {
+                    "id": str(uuid.uuid5(uuid.NAMESPACE_URL, f"{product_id}:{index}")),
+                    "product_id": product_id,
+                    "chunk_index": index,
+                    "chunk_content": text,
+                    "embedding": vector,
+                }
+                for (product_id, index, text), vector in zip(chunks, vectors) if vector
+            ]
+            products.sort(key=lambda p: p["id"])
+            embeddings.sort(key=lambda e: e["id"])
+
+            self._products_by_id = {p["id"]: p for p in products}
+            self._index = VectorIndex(embeddings, mode="exact")
+            self._tables = {"products": products, "product_embeddings": embeddings}
+            logger.info(f"Memory store loaded {len(products)} products from {self.path if self._source is None else 'memory'}")
+
+    async def warm_up(self):
+        await run_in_threadpool(self._load)
+
+    @staticmethod
+    def _project(row: Dict[str, Any], columns: str) -> Dict[str, Any]:
+        if columns.strip() == "*":
+            return dict(row)
+        return {name: row.get(name) for name in (c.strip() for c in columns.split(","))}
+
+    def _wait(self):
+        self._load()
+        if self.latency:
+            time.sleep(self.latency)
+
+    async def _await(self):
+        self._load()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    def fetch_all_rows(self, table: str, columns: str = "*") -> List[Dict[str, Any]]:
+        self._wait()
+        return [self._project(row, columns) for row in self._tables.get(table, [])]
+
+    def fetch_version(self) -> int:
+        return self._version
+
+    def bump_version(self):
+        self._version += 1
+
+    async def list_products(self, limit: int, offset: int = 0, cursor: Optional[str] = None, columns: str = "*") -> List[Dict[str, Any]]:
+        await self._await()
+        products = self._tables["products"]
+        if cursor is not None:
+            page = [p for p in products if p["id"] > cursor][:limit]
+        else:
+            page = products[offset:offset + limit]
+        return [self._project(p, columns) for p in page]
+
+    async def get_product(self, product_id: str) -> Optional[Dict[str, Any]]:
+        await self._await()
+        product = self._products_by_id.get(product_id)
+        return dict(product) if product else None
+
+    async def get_products(self, product_ids: List[str]) -> List[Dict[str, Any]]:
+        await self._await()
+        return [dict(self._products_by_id[i]) for i in product_ids if i in self._products_by_id]
+
+    async def match_embeddings(self, query_embedding: List[float], match_threshold: float, match_count: int) -> List[Dict[str, Any]]:
+        await self._await()
+        return self._index.search(query_embedding, match_threshold, match_count)
+
+    async def match_products_full(self, query_embedding: List[float], match_threshold: float, match_count: int) -> List[Dict[str, Any]]:
+        await self._await()
+        return [
+            {**self._products_by_id[match["product_id"]], "similarity": match["similarity"]}
+            for match in self._index.search(query_embedding, match_threshold, match_count)
+        ]
+
+    async def product_vectors(self, product_ids: List[str]) -> Optional[np.ndarray]:
+        await self._await()
+        return self._index.product_vectors(product_ids)
+
+
+class SnapshotStore(CatalogStore):
+    """
+    Read-only store over the published catalog snapshot (see snapshot.py).
+    The snapshot is memory-mapped, so every worker on the host shares one
+    page-cache copy of the products and embeddings, and startup only reads
+    its manifest. Vector search runs on the mapped embeddings in place.
+
+    fetch_version re-reads the CURRENT pointer; when an export published a
+    new version the store switches to it, and the catalog watcher reloads
+    the indexes and clears the caches. Requests already holding the previous
+    snapshot finish on it.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = snapshot_dir(directory)
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """
+        Switches to the published version if it is not the one mapped.
+        """
+        version = current_version(self.directory)
+        if version is None or (self._snapshot is not None and self._snapshot.version == version):
+            return
+        with self._lock:
+            if self._snapshot is None or self._snapshot.version != version:
+                started = time.perf_counter()
+                self._snapshot = open_snapshot(version, self.directory)
+                logger.info(
+                    f"Mapped catalog snapshot v{version}: {len(self._snapshot)} products, "
+                    f"{len(self._snapshot.embeddings)} embeddings, {(time.perf_counter() - started) * 1000:.1f} ms"
+                )
+
+    def snapshot(self) -> CatalogSnapshot:
+        if self._snapshot is None:
+            self.refresh()
+            if self._snapshot is None:
+                raise RuntimeError(f"No catalog snapshot published in {self.directory}, run app/services/snapshot.py")
+        return self._snapshot
+
+    @staticmethod
+    def _columns(columns: str) -> Optional[List[str]]:
+        if columns.strip() == "*":
+            return None
+        return [c.strip() for c in columns.split(",")]
+
+    async def warm_up(self):
+        self.snapshot()
+
+    def fetch_all_rows(self, table: str, columns: str = "*") -> List[Dict[str, Any]]:
+        snapshot = self.snapshot()
+        if table == "products":
+            return snapshot.rows(columns=self._columns(columns))
+        if table == "product_embeddings":
+            return snapshot.embedding_rows(self._columns(columns))
+        return []
+
+    def fetch_version(self) -> int:
+        self.refresh()
+        return self._snapshot.version if self._snapshot is not None else 0
+
+    def bump_version(self):
+        """
+        Versions are published by exporting a snapshot.
+        """
+
+    async def list_products(self, limit: int, offset: int = 0, cursor: Optional[str] = None, columns: str = "*") -> List[Dict[str, Any]]:
+        snapshot = self.snapshot()
+        if cursor is not None:
+            start = bisect.bisect_right(snapshot.ids, cursor) if cursor else 0
+        else:
+            start = offset
+        return snapshot.rows(start, start + limit, self._columns(columns))
+
+    async def get_product(self, product_id: str) -> Optional[Dict[str, Any]]:
+        return self.snapshot().get(product_id)
+
+    async def get_products(self, product_ids: List[str]) -> List[Dict[str, Any]]:
+        snapshot = self.snapshot()
+        return [product for product in map(snapshot.get, product_ids) if product is not None]
+
+    async def match_embeddings(self, query_embedding: List[float], match_threshold: float, match_count: int) -> List[Dict[str, Any]]:
+        return self.snapshot().index().search(query_embedding, match_threshold, match_count)
+
+    async def match_products_full(self, query_embedding: List[float], match_threshold: float, match_count: int) -> List[Dict[str, Any]]:
+        snapshot = self.snapshot()
+        return [
+            {**snapshot.get(match["product_id"]), "similarity": match["similarity"]}
+            for match in snapshot.index().search(query_embedding, match_threshold, match_count)
+        ]
+
+    async def product_vectors(self, product_ids: List[str]) -> Optional[np.ndarray]:
+        return self.snapshot().index().product_vectors(product_ids)
+
+
+BACKENDS = {
+    "supabase": SupabaseStore,
+    "memory": lambda: MemoryStore(MEMORY_STORE_PATH),
+    "snapshot": SnapshotStore,
+}
+
+_store: Optional[CatalogStore] = None
+_lock = threading.Lock()
+
+
+def get_store() -> CatalogStore:
+    """
+    Returns the store selected by STORE_BACKEND, creating it on first use.
+    """
+    global _store
+    if _store is None:
+        with _lock:
+            if _store is None:
+                if STORE_BACKEND not in BACKENDS:
+                    raise ValueError(f"Unknown STORE_BACKEND '{STORE_BACKEND}', expected one of {sorted(BACKENDS)}")
+                _store = BACKENDS[STORE_BACKEND]()
+    return _store
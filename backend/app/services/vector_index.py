@@ -0,0 +1,238 @@
+import json
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.services import catalog
+from app.core.config import (
+    VECTOR_INDEX_MODE,
+    VECTOR_INDEX_IVF_MIN_ROWS,
+    VECTOR_INDEX_IVF_NPROBE,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _to_vector(value) -> List[float]:
+    """
+    pgvector columns come back from PostgREST as a "[0.1,0.2,...]" string.
+    """
+    if isinstance(value, str):
+        return json.loads(value)
+    return value
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class VectorIndex:
+    """
+    In-process cosine-similarity index over the product_embeddings table.
+    A product can have several rows (chunks); it is ranked by its best one.
+
+    Vectors are L2-normalized and stored in one contiguous float32 matrix so a
+    query is a single matrix-vector product. In "ivf" mode rows are clustered
+    with spherical k-means and stored grouped by cluster; a query only scores
+    the rows of the `nprobe` closest clusters.
+    """
+
+    def __init__(self, rows: List[Dict[str, Any]], mode: str = "exact", nprobe: int = VECTOR_INDEX_IVF_NPROBE):
+        ids = [row["id"] for row in rows]
+        product_ids = [row["product_id"] for row in rows]
+        chunks = [row.get("chunk_content") for row in rows]
+        # Dense product number per row, for deduplicating matches with NumPy
+        codes: Dict[Any, int] = {}
+        product_codes = np.asarray([codes.setdefault(pid, len(codes)) for pid in product_ids], dtype=np.int64)
+
+        if rows:
+            vectors = np.asarray([_to_vector(row["embedding"]) for row in rows], dtype=np.float32)
+            matrix = np.ascontiguousarray(_normalize(vectors))
+            # One vector per product (its chunks averaged), for re-ranking
+            sums = np.zeros((len(codes), matrix.shape[1]), dtype=np.float32)
+            np.add.at(sums, product_codes, matrix)
+            product_matrix = np.ascontiguousarray(_normalize(sums))
+        else:
+            matrix = np.zeros((0, 0), dtype=np.float32)
+            product_matrix = np.zeros((0, 0), dtype=np.float32)
+
+        self._setup(ids, product_ids, chunks, product_codes, matrix, codes.get, product_matrix, mode, nprobe)
+
+    @classmethod
+    def from_arrays(cls, ids: Sequence, product_ids: Sequence, chunks: Sequence, product_codes: np.ndarray,
+                    matrix: np.ndarray, product_position: Callable[[Any], Optional[int]], product_matrix: np.ndarray,
+                    mode: str = "exact", nprobe: int = VECTOR_INDEX_IVF_NPROBE) -> "VectorIndex":
+        """
+        An index over vectors that are already L2-normalized, used as given
+        (e.g. memory-mapped from a catalog snapshot) rather than copied.
+        `product_codes` numbers each row's product, `product_matrix` holds
+        the product vectors by that number and `product_position` maps a
+        product ID to it. "ivf" mode reorders, and so copies, the matrix.
+        """
+        index = cls.__new__(cls)
+        index._setup(ids, product_ids, chunks, product_codes, matrix, product_position, product_matrix, mode, nprobe)
+        return index
+
+    def _setup(self, ids, product_ids, chunks, product_codes, matrix, product_position, product_matrix, mode, nprobe):
+        self.mode = mode
+        self.nprobe = nprobe
+        self.loaded_at = time.time()
+
+        self.ids = ids
+        self.product_ids = product_ids
+        self.chunks = chunks
+        self.product_codes = product_codes
+        self.max_chunks = int(np.bincount(product_codes).max()) if len(product_codes) else 1
+        self.matrix = matrix
+        self.product_position = product_position
+        self.product_matrix = product_matrix
+
+        self.centroids = None
+        self.list_offsets = None
+        if mode == "ivf" and len(self) > 0:
+            self._build_ivf()
+
+    def __len__(self) -> int:
+        return self.matrix.shape[0]
+
+    def _build_ivf(self, iterations: int = 10):
+        """
+        Clusters the rows and reorders the matrix so each inverted list is a
+        contiguous slice.
+        """
+        n = len(self)
+        nlist = max(1, int(np.sqrt(n)))
+        rng = np.random.default_rng(0)
+        centroids = self.matrix[rng.choice(n, size=nlist, replace=False)].copy()
+
+        for _ in range(iterations):
+            assignment = np.argmax(self.matrix @ centroids.T, axis=1)
+            for c in range(nlist):
+                members = self.matrix[assignment == c]
+                if len(members):
+                    centroids[c] = members.mean(axis=0)
+            centroids = _normalize(centroids)
+
+        assignment = np.argmax(self.matrix @ centroids.T, axis=1)
+        order = np.argsort(assignment, kind="stable")
+        self.matrix = np.ascontiguousarray(self.matrix[order])
+        self.ids = [self.ids[i] for i in order]
+        self.product_ids = [self.product_ids[i] for i in order]
+        self.chunks = [self.chunks[i] for i in order]
+        self.product_codes = self.product_codes[order]
+
+        counts = np.bincount(assignment, minlength=nlist)
+        self.list_offsets = np.concatenate(([0], np.cumsum(counts)))
+        self.centroids = centroids.astype(np.float32)
+
+    def _candidates(self, query: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Returns the row positions to score, or None to score every row.
+        """
+        if self.centroids is None:
+            return None
+        nprobe = min(self.nprobe, len(self.centroids))
+        closest = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        return np.concatenate([
+            np.arange(self.list_offsets[c], self.list_offsets[c + 1]) for c in closest
+        ])
+
+    def product_vectors(self, product_ids: List[Any]) -> Optional[np.ndarray]:
+        """
+        Normalized vectors of these products, one row each, or None when any
+        of them is not in the index.
+        """
+        positions = [self.product_position(product_id) for product_id in product_ids]
+        if None in positions:
+            return None
+        return self.product_matrix[positions]
+
+    def search(self, query_embedding: List[float], match_threshold: float, match_count: int) -> List[Dict[str, Any]]:
+        """
+        Same contract as the match_products RPC: the best row of each product
+        with similarity above match_threshold, best first, at most match_count
+        of them.
+        """
+        if len(self) == 0 or match_count <= 0:
+            return []
+
+        query = _normalize(np.asarray(query_embedding, dtype=np.float32))
+        positions = self._candidates(query)
+        if positions is None:
+            scores = self.matrix @ query
+            positions = np.arange(len(scores))
+        else:
+            scores = self.matrix[positions] @ query
+
+        keep = scores > match_threshold
+        scores, positions = scores[keep], positions[keep]
+        # The top match_count products are among the top match_count * max_chunks rows
+        candidates = match_count * self.max_chunks
+        if len(scores) > candidates:
+            top = np.argpartition(-scores, candidates - 1)[:candidates]
+            scores, positions = scores[top], positions[top]
+        ranked = np.argsort(-scores, kind="stable")
+        # First (best) row of each product, still in rank order
+        _, first = np.unique(self.product_codes[positions[ranked]], return_index=True)
+        order = ranked[np.sort(first)[:match_count]]
+
+        return [
+            {
+                "id": self.ids[positions[i]],
+                "product_id": self.product_ids[positions[i]],
+                "chunk_content": self.chunks[positions[i]],
+                "similarity": float(scores[i]),
+            }
+            for i in order
+        ]
+
+
+_index: Optional[VectorIndex] = None
+_lock = threading.Lock()
+
+# Accepted VECTOR_INDEX_MODE values
+MODES = ("off", "exact", "ivf", "auto")
+
+
+def resolve_mode(row_count: int) -> str:
+    if VECTOR_INDEX_MODE not in MODES:
+        raise ValueError(f"Unknown VECTOR_INDEX_MODE '{VECTOR_INDEX_MODE}', expected one of {sorted(MODES)}")
+    if VECTOR_INDEX_MODE == "auto":
+        return "ivf" if row_count >= VECTOR_INDEX_IVF_MIN_ROWS else "exact"
+    return VECTOR_INDEX_MODE
+
+
+def load() -> Optional[VectorIndex]:
+    """
+    (Re)builds the index from the database, or over the catalog snapshot
+    when the store serves one, and swaps it in. Searches keep using the
+    previous index until the new one is ready.
+    """
+    global _index
+    if VECTOR_INDEX_MODE == "off":
+        return None
+
+    with _lock:
+        started = time.perf_counter()
+        snapshot = catalog.current_snapshot()
+        if snapshot is not None:
+            # Searches the snapshot's memory-mapped embeddings in place
+            index = snapshot.index(resolve_mode(len(snapshot.embeddings)))
+        else:
+            rows = catalog.fetch_all_rows("product_embeddings", "id, product_id, chunk_content, embedding")
+            index = VectorIndex(rows, mode=resolve_mode(len(rows)))
+        _index = index
+        logger.info(
+            f"Vector index loaded: {len(index)} rows, mode={index.mode}, "
+            f"{(time.perf_counter() - started) * 1000:.0f} ms"
+        )
+        return index
+
+
+def get_index() -> Optional[VectorIndex]:
+    return _index
@@ -0,0 +1,151 @@
+"""
+Shared helpers for the benchmark scripts: offline backend setup, stage
+timing, latency summaries and JSON result files.
+"""
+import functools
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import numpy as np
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+
+# Add the backend directory to sys.path to allow imports from app
+sys.path.append(BACKEND_DIR)
+
+# Config read by the app that is worth recording next to the numbers
+RECORDED_ENV_PREFIXES = (
+    "EMBEDDING_", "LLM_", "STORE_", "LOCAL_", "MEMORY_", "VECTOR_INDEX_", "RETRIEVAL_",
+    "CHAT_CACHE_", "PRODUCT_CACHE_", "QUERY_ROUTER_", "SINGLE_FLIGHT_", "EMBED_BATCH",
+)
+
+
+def add_backend_arguments(parser):
+    parser.add_argument("--embedding-latency-ms", type=float, default=0, help="Simulated latency per embedding request")
+    parser.add_argument("--llm-latency-ms", type=float, default=0, help="Simulated latency per LLM call")
+    parser.add_argument("--store-latency-ms", type=float, default=0, help="Simulated latency per database call")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="Extra app config, e.g. --env RETRIEVAL_MODE=hybrid (repeatable)")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/<name>-<timestamp>.json)")
+
+
+def configure_backends(args):
+    """
+    Selects the offline backends with the requested latencies. Must run
+    before any app module is imported, since config is read at import time.
+    """
+    os.environ.update({
+        "EMBEDDING_BACKEND": "local",
+        "LLM_BACKEND": "local",
+        "STORE_BACKEND": "memory",
+        "LOCAL_EMBEDDING_LATENCY_MS": str(args.embedding_latency_ms),
+        "LOCAL_LLM_LATENCY_MS": str(args.llm_latency_ms),
+        "LOCAL_STORE_LATENCY_MS": str(args.store_latency_ms),
+    })
+    for item in args.env:
+        key, _, value = item.partition("=")
+        os.environ[key] = value
+
+
+def summarize(samples):
+    """
+    Latency summary in milliseconds of a list of durations in seconds.
+    """
+    if not samples:
+        return {"count": 0}
+    ms = np.asarray(samples) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "count": len(ms),
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "max_ms": round(float(ms.max()), 3),
+    }
+
+
+class StageTimer:
+    """
+    Records how long each pipeline stage takes by wrapping the stage
+    functions in place. Stages can overlap (e.g. expansion runs alongside
+    the raw-query search), so their times do not add up to the request time.
+    """
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    def _wrap(self, name, fn):
+        @functools.wraps(fn)
+        async def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                self.samples[name].append(time.perf_counter() - started)
+        return timed
+
+    def _wrap_sync(self, name, fn):
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.samples[name].append(time.perf_counter() - started)
+        return timed
+
+    def instrument(self):
+        from app.services import llm, rag, query_router
+        from app.services.product_service import ProductService
+
+        query_router.route = self._wrap_sync("route", query_router.route)
+        llm.expand_query = self._wrap("expand", llm.expand_query)
+        rag.search_products = self._wrap("search", rag.search_products)
+        rag.embed_query = self._wrap("embed", rag.embed_query)
+        rag.match_products = self._wrap("vector_search", rag.match_products)
+        llm.generate_response = self._wrap("generate", llm.generate_response)
+        for method, name in [("get_products", "list_products"), ("get_product_by_id", "get_product"), ("get_products_by_ids", "fetch_products")]:
+            setattr(ProductService, method, staticmethod(self._wrap(name, getattr(ProductService, method))))
+
+    def reset(self):
+        self.samples.clear()
+
+    def report(self):
+        return {name: summarize(samples) for name, samples in sorted(self.samples.items())}
+
+
+def run_metadata(args):
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except Exception:
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "args": vars(args),
+        "env": {k: v for k, v in sorted(os.environ.items()) if k.startswith(RECORDED_ENV_PREFIXES)},
+    }
+
+
+def write_results(name, payload, output=None):
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"{name}-{stamp}.json")
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, indent=2)
+    print(f"Results written to {output}")
+    return output
@@ -0,0 +1,82 @@
+"""
+Compares two benchmark result files and flags regressions.
+
+    python benchmarks/compare.py results/load-baseline.json results/load-20250101-120000.json
+
+Exits with status 1 if any p95 latency grew, or any throughput dropped, by
+more than --threshold percent.
+"""
+import argparse
+import json
+import sys
+
+
+def result_key(result):
+    if "endpoint" in result:
+        return f"{result['endpoint']} c={result['concurrency']}"
+    return result["name"]
+
+
+def metrics_of(result):
+    """
+    The numbers compared for a result, as {name: (value, higher_is_better)}.
+    """
+    metrics = {}
+    latency = result.get("latency") or {}
+    for name in ("p50_ms", "p95_ms", "p99_ms"):
+        if name in latency:
+            metrics[name] = (latency[name], False)
+    for name in ("throughput_rps", "throughput_per_s"):
+        if result.get(name) is not None:
+            metrics[name] = (result[name], True)
+    return metrics
+
+
+def compare(baseline, current, threshold):
+    """
+    Returns (rows, regressions), where each row is
+    (key, metric, baseline, current, change_percent, regressed).
+    """
+    baseline_results = {result_key(r): r for r in baseline["results"]}
+    rows = []
+    for result in current["results"]:
+        key = result_key(result)
+        if key not in baseline_results:
+            continue
+        before = metrics_of(baseline_results[key])
+        for metric, (value, higher_is_better) in metrics_of(result).items():
+            if metric not in before or not before[metric][0]:
+                continue
+            old = before[metric][0]
+            change = (value - old) / old * 100
+            worse = -change if higher_is_better else change
+            # Only p95 and throughput gate; p50/p99 are informational
+            gated = metric in ("p95_ms", "throughput_rps", "throughput_per_s")
+            rows.append((key, metric, old, value, change, gated and worse > threshold))
+    return rows, [row for row in rows if row[-1]]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files.")
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Allowed regression in percent")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(args.current, 'r', encoding='utf-8') as f:
+        current = json.load(f)
+
+    rows, regressions = compare(baseline, current, args.threshold)
+    for key, metric, old, new, change, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{key:<40} {metric:<16} {old:>10.2f} -> {new:>10.2f} ({change:+.1f}%){flag}")
+    if regressions:
+        print(f"{len(regressions)} regression(s) above {args.threshold}%")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+"""
+Load test for the API: drives /products, /products/{id} and /chat at one or
+more concurrency levels and reports throughput, latency percentiles and a
+per-stage breakdown.
+
+By default the app runs in-process on the offline backends (hashing
+embedder, templated generator, in-memory catalog) with the simulated
+latencies given on the command line, and rate limiting is disabled. With
+--url an already running server is load-tested instead; stage timings are
+then not available and its rate limits apply.
+
+    python benchmarks/load.py --concurrency 1 8 32 --requests 200 \\
+        --embedding-latency-ms 80 --llm-latency-ms 900 --store-latency-ms 25
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from collections import Counter
+
+import httpx
+
+sys.path.append(os.path.dirname(__file__))
+
+from common import StageTimer, add_backend_arguments, configure_backends, run_metadata, summarize, write_results
+
+ENDPOINTS = ["products", "product", "chat"]
+
+# A mix of specific queries (searched directly) and abstract ones (expanded first)
+QUERIES = [
+    "black leggings with pockets",
+    "high waist leggings under 2000",
+    "zen skort",
+    "sports bra with removable cups",
+    "co-ord set for brunch",
+    "something comfy for yoga",
+    "what should I wear to the gym",
+    "breathable shorts for running",
+    "cute outfit for a morning walk",
+    "buttery soft flare pants",
+    "moisture wicking crop top",
+    "gift for my sister who loves pilates",
+    "cosmic waves tank top",
+    "jacket for an evening jog",
+    "something bold and vibrant",
+    "leggings that are not see through",
+]
+
+
+class Target:
+    """
+    Where requests go: the in-process app, or a server given by --url.
+    """
+
+    def __init__(self, url=None):
+        self.url = url
+        self.stages = None
+        self._lifespan = None
+
+    async def __aenter__(self):
+        if self.url:
+            self.client = httpx.AsyncClient(base_url=self.url, timeout=60)
+            return self
+
+        from app import main
+
+        main.limiter.enabled = False
+        self.stages = StageTimer()
+        self.stages.instrument()
+        self._lifespan = main.lifespan(main.app)
+        await self._lifespan.__aenter__()
+        self.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://bench", timeout=60)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.client.aclose()
+        if self._lifespan is not None:
+            await self._lifespan.__aexit__(*exc)
+
+
+def make_request(endpoint, i, product_ids, queries):
+    """
+    The i-th request for an endpoint, as (method, path, json).
+    """
+    if endpoint == "products":
+        pages = max(1, len(product_ids) // 20)
+        return "GET", f"/products?limit=20&offset={(i % pages) * 20}", None
+    if endpoint == "product":
+        return "GET", f"/products/{product_ids[i % len(product_ids)]}", None
+    return "POST", "/chat", {"query": queries[i % len(queries)]}
+
+
+async def run_level(target, endpoint, concurrency, total, product_ids, queries):
+    """
+    Sends `total` requests to one endpoint from `concurrency` workers.
+    """
+    latencies = []
+    statuses = Counter()
+    next_index = iter(range(total))
+
+    async def worker():
+        for i in next_index:
+            method, path, body = make_request(endpoint, i, product_ids, queries)
+            started = time.perf_counter()
+            try:
+                response = await target.client.request(method, path, json=body)
+                statuses[str(response.status_code)] += 1
+            except Exception as e:
+                statuses[type(e).__name__] += 1
+            latencies.append(time.perf_counter() - started)
+
+    if target.stages is not None:
+        target.stages.reset()
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+
+    errors = sum(count for status, count in statuses.items() if not status.startswith("2"))
+    return {
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": errors,
+        "status_counts": dict(statuses),
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 2) if elapsed > 0 else None,
+        "latency": summarize(latencies),
+        "stages": target.stages.report() if target.stages is not None else None,
+    }
+
+
+async def run(args):
+    results = []
+    async with Target(args.url) as target:
+        products = (await target.client.get("/products", params={"limit": 100})).json()
+        product_ids = [p["id"] for p in products]
+        if "product" in args.endpoints and not product_ids:
+            raise SystemExit("No products to request from /products/{id}")
+
+        for endpoint in args.endpoints:
+            if args.warmup:
+                await run_level(target, endpoint, 1, args.warmup, product_ids, QUERIES)
+            for concurrency in args.concurrency:
+                result = await run_level(target, endpoint, concurrency, args.requests, product_ids, QUERIES)
+                results.append(result)
+                latency = result["latency"]
+                print(
+                    f"{endpoint:<9} c={concurrency:<4} {result['throughput_rps']:>9.1f} req/s  "
+                    f"p50 {latency['p50_ms']:>8.1f} ms  p95 {latency['p95_ms']:>8.1f} ms  "
+                    f"p99 {latency['p99_ms']:>8.1f} ms  errors {result['errors']}"
+                )
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the API endpoints.")
+    parser.add_argument("--endpoints", nargs="+", choices=ENDPOINTS, default=ENDPOINTS)
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 8, 32], help="Concurrency levels to run")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint and concurrency level")
+    parser.add_argument("--warmup", type=int, default=20, help="Sequential requests per endpoint before measuring")
+    parser.add_argument("--url", help="Load-test a running server instead of the in-process app")
+    add_backend_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if not args.url:
+        configure_backends(args)
+    results = asyncio.run(run(args))
+    return write_results("load", {"benchmark": "load", "metadata": run_metadata(args), "results": results}, args.output)
+
+
+if __name__ == "__main__":
+    main()
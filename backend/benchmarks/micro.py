@@ -0,0 +1,215 @@
+"""
+Micro-benchmarks for the hot paths outside the HTTP layer:
+
+- search:  rag.search_products over a set of queries, and the re-ranking
+           stage alone
+- ingest:  product row mapping and batched embedding at several batch sizes
+- parse:   the scraper's product and collection page parsers, per parser
+           backend, on the saved pages in tests/fixtures/pages and on
+           synthetic pages, and the parse throughput of a process pool
+
+Runs on the offline backends; pass latencies to model the hosted services,
+e.g. --embedding-latency-ms 80 to see what batching saves on ingestion.
+
+    python benchmarks/micro.py search ingest --embedding-latency-ms 80
+    python benchmarks/micro.py parse --parsers html.parser lxml --parse-workers 1 4
+"""
+import argparse
+import asyncio
+import glob
+import importlib.util
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(__file__))
+
+from common import BACKEND_DIR, add_backend_arguments, configure_backends, run_metadata, summarize, write_results
+from load import QUERIES
+
+BENCHMARKS = ["search", "ingest", "parse"]
+
+FIXTURE_PAGES_DIR = os.path.join(BACKEND_DIR, "tests", "fixtures", "pages")
+PARSERS = ["html.parser"] + (["lxml"] if importlib.util.find_spec("lxml") else [])
+
+
+def load_catalog():
+    from app.services.stores import DEFAULT_PRODUCTS_PATH
+
+    with open(DEFAULT_PRODUCTS_PATH, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def timed_calls(fn, inputs):
+    samples = []
+    for item in inputs:
+        started = time.perf_counter()
+        fn(item)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def bench_search(args):
+    from app.core.config import RERANK_CANDIDATE_MULTIPLIER
+    from app.services import rag, reranker
+
+    async def run():
+        await rag.search_products(QUERIES[0])  # Loads the catalog
+        samples = []
+        for i in range(args.iterations):
+            started = time.perf_counter()
+            await rag.search_products(QUERIES[i % len(QUERIES)])
+            samples.append(time.perf_counter() - started)
+        # The re-ranking stage alone, over the over-fetched candidates
+        candidates = [
+            (query, await rag.match_product_rows(await rag.embed_query(query), 0.0, 5 * RERANK_CANDIDATE_MULTIPLIER))
+            for query in QUERIES
+        ]
+        rerank_samples = timed_calls(
+            lambda item: reranker.rerank(item[1], item[0], 5),
+            [candidates[i % len(candidates)] for i in range(args.iterations)],
+        )
+        return samples, rerank_samples
+
+    samples, rerank_samples = asyncio.run(run())
+    return [
+        {"name": "search_products", "latency": summarize(samples)},
+        {"name": "rerank", "latency": summarize(rerank_samples)},
+    ]
+
+
+def bench_ingest(args):
+    from app.services.ingest_data import build_product_row, build_embedding_text
+    from app.services.rag import generate_embeddings
+
+    catalog = load_catalog()
+    products = [catalog[i % len(catalog)] for i in range(args.products)]
+    results = [{"name": "build_product_row", "latency": summarize(timed_calls(build_product_row, products))}]
+
+    texts = [build_embedding_text(p) for p in products]
+    for batch_size in args.batch_sizes:
+        started = time.perf_counter()
+        generate_embeddings(texts, batch_size=batch_size)
+        elapsed = time.perf_counter() - started
+        results.append({
+            "name": f"generate_embeddings[batch_size={batch_size}]",
+            "products": len(texts),
+            "duration_s": round(elapsed, 3),
+            "throughput_per_s": round(len(texts) / elapsed, 1) if elapsed > 0 else None,
+        })
+    return results
+
+
+def product_page_html(product):
+    """
+    A product page with the markup the scraper's parser looks for.
+    """
+    features = "".join(f"<li>{feature}</li>" for feature in product.get("features", []))
+    return f"""<!DOCTYPE html>
+<html><head>
+<title>{product['title']}</title>
+<meta name="description" content="{product.get('description', '')}">
+<meta property="og:image" content="{product.get('image_url', '')}">
+</head><body>
+<nav class="breadcrumbs"><a href="/">Home</a><a href="/collections/{product.get('category', '').lower()}">{product.get('category', '')}</a></nav>
+<div class="product">
+  <h1 class="product-title">{product['title']}</h1>
+  <div class="price"><span class="was-price">Rs. {product['price'] + 500}</span><span class="current-price">Rs. {product['price']:,}</span></div>
+  <div class="description"><h3>Why you’ll love this?</h3><p>{product.get('description', '')}</p></div>
+  <div class="features"><h3>Product Features</h3><ul>{features}</ul><h3>Fabric Features</h3><p>Nylon Spandex</p></div>
+</div>
+{"<div class='footer'>" + "<p>Free shipping on prepaid orders.</p>" * 50 + "</div>"}
+</body></html>"""
+
+
+def collection_page_html(products):
+    cards = "".join(
+        f'<div class="card"><a href="/products/{p["title"].lower().replace(" ", "-")}?variant={i}">'
+        f'<img src="{p.get("image_url", "")}"><span>{p["title"]}</span></a></div>'
+        for i, p in enumerate(products)
+    )
+    return f"<html><body><div class='grid'>{cards}</div></body></html>"
+
+
+def load_fixture_pages():
+    """
+    The saved product pages, as {name: html}.
+    """
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURE_PAGES_DIR, "*product*.html"))):
+        with open(path, 'r', encoding='utf-8') as f:
+            pages[os.path.splitext(os.path.basename(path))[0]] = f.read()
+    return pages
+
+
+def bench_parse(args):
+    from app.services.scraper import parse_product_page, parse_pages, extract_product_links
+
+    url = "https://hunnit.com/products/bench"
+    catalog = load_catalog()
+    pages = [product_page_html(catalog[i % len(catalog)]) for i in range(args.pages)]
+    collection = collection_page_html(catalog)
+    fixtures = load_fixture_pages()
+
+    results = []
+    for parser in args.parsers:
+        for name, html in fixtures.items():
+            samples = timed_calls(lambda page: parse_product_page(page, url, parser), [html] * args.pages)
+            results.append({"name": f"parse_product_page[{name},{parser}]", "page_bytes": len(html), "latency": summarize(samples)})
+
+    # Synthetic pages on the default parser, comparable with earlier runs
+    product_samples = timed_calls(lambda html: parse_product_page(html, url), pages)
+    link_samples = timed_calls(extract_product_links, [collection] * args.pages)
+    results += [
+        {"name": "parse_product_page", "page_bytes": len(pages[0]), "latency": summarize(product_samples)},
+        {"name": "extract_product_links", "page_bytes": len(collection), "latency": summarize(link_samples)},
+    ]
+
+    # Process pool fan-out over the saved pages
+    batch = [(html, url) for html in fixtures.values()] * max(1, args.pages)
+    for workers in args.parse_workers:
+        started = time.perf_counter()
+        parse_pages(batch, workers=workers)
+        elapsed = time.perf_counter() - started
+        results.append({
+            "name": f"parse_pages[workers={workers}]",
+            "products": len(batch),
+            "duration_s": round(elapsed, 3),
+            "throughput_per_s": round(len(batch) / elapsed, 1) if elapsed > 0 else None,
+        })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for search, ingestion and scraping.")
+    parser.add_argument("benchmarks", nargs="*", metavar="BENCHMARK", help=f"Benchmarks to run: {', '.join(BENCHMARKS)} (default: all)")
+    parser.add_argument("--iterations", type=int, default=200, help="search: queries to run")
+    parser.add_argument("--products", type=int, default=500, help="ingest: products to map and embed")
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 10, 50, 100], help="ingest: embedding batch sizes")
+    parser.add_argument("--pages", type=int, default=100, help="parse: pages to parse")
+    parser.add_argument("--parsers", nargs="+", default=PARSERS, help=f"parse: HTML parser backends to compare (default: {' '.join(PARSERS)})")
+    parser.add_argument("--parse-workers", nargs="+", type=int, default=[1, 4], help="parse: process pool sizes")
+    add_backend_arguments(parser)
+    args = parser.parse_args(argv)
+    args.benchmarks = args.benchmarks or BENCHMARKS
+    unknown = sorted(set(args.benchmarks) - set(BENCHMARKS))
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+
+    configure_backends(args)
+    runners = {"search": bench_search, "ingest": bench_ingest, "parse": bench_parse}
+    results = []
+    for name in args.benchmarks:
+        for result in runners[name](args):
+            results.append(result)
+            latency = result.get("latency")
+            if latency:
+                print(f"{result['name']:<40} p50 {latency['p50_ms']:>8.3f} ms  p95 {latency['p95_ms']:>8.3f} ms  p99 {latency['p99_ms']:>8.3f} ms")
+            else:
+                print(f"{result['name']:<40} {result['throughput_per_s']:>8.1f} /s  ({result['duration_s']} s)")
+    return write_results("micro", {"benchmark": "micro", "metadata": run_metadata(args), "results": results}, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,3 +3,9 @@ import os
 
 # Add the project root directory to sys.path
 sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+# Run the test suite offline: local embedder and generator, in-memory catalog.
+# Export these variables to run against the hosted services instead.
+os.environ.setdefault("EMBEDDING_BACKEND", "local")
+os.environ.setdefault("LLM_BACKEND", "local")
+os.environ.setdefault("STORE_BACKEND", "memory")
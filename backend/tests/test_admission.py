@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from app.core import admission
+from app.core.admission import ConcurrencyLimiter, Overloaded, TokenBudget
+
+
+def test_slots_are_capped_and_handed_over_in_order():
+    limiter = ConcurrencyLimiter(max_concurrency=2, max_queue=10, queue_timeout=5)
+    running, peak, order = 0, 0, []
+
+    async def call(i):
+        nonlocal running, peak
+        async with limiter.slot():
+            running += 1
+            peak = max(peak, running)
+            order.append(i)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+    async def run():
+        await asyncio.gather(*[call(i) for i in range(6)])
+
+    asyncio.run(run())
+    assert peak == 2
+    assert order == list(range(6))
+    assert limiter.active == 0 and limiter.waiting == 0
+
+
+def test_full_queue_and_queue_timeout_shed():
+    limiter = ConcurrencyLimiter(max_concurrency=1, max_queue=1, queue_timeout=0.05)
+
+    async def run():
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        assert limiter.saturated()
+        with pytest.raises(Overloaded) as shed:
+            await limiter.acquire()
+        assert shed.value.retry_after >= 1
+        with pytest.raises(Overloaded):
+            await waiter
+        assert limiter.waiting == 0
+        limiter.release()
+        assert limiter.active == 0
+
+    asyncio.run(run())
+
+
+def test_token_budget_blocks_after_spending():
+    budget = TokenBudget("100/minute", "memory://")
+    assert budget.allowed("client")
+    budget.charge("client", 60)
+    assert budget.allowed("client")
+    budget.charge("client", 60)
+    assert not budget.allowed("client")
+    assert budget.allowed("other")
+    assert 1 <= budget.retry_after("client") <= 60
+
+
+def test_token_budget_storage_errors_never_fail_the_request(monkeypatch):
+    budget = TokenBudget("100/minute", "memory://")
+
+    def unavailable(*args, **kwargs):
+        raise ConnectionError("storage down")
+
+    for method in ("test", "hit", "get_window_stats"):
+        monkeypatch.setattr(budget.strategy, method, unavailable)
+    assert budget.allowed("client")
+    budget.charge("client", 60)
+    assert budget.retry_after("client") == 60
+
+
+@pytest.fixture
+def saturated(monkeypatch):
+    limiter = ConcurrencyLimiter(max_concurrency=1, max_queue=0, queue_timeout=1)
+    limiter.active = 1
+    monkeypatch.setattr(admission, "llm_slots", limiter)
+    monkeypatch.setattr(main.limiter, "enabled", False)
+    monkeypatch.setattr(main, "response_cache", None)
+
+
+def test_chat_degrades_to_retrieval_only(saturated):
+    response = TestClient(main.app).post("/chat", json={"query": "something comfy for yoga"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["metadata"]["degraded"] == ["skip_expand", "retrieval_only"]
+    assert data["products"]
+    assert data["response"] == main.llm.RETRIEVAL_ONLY_MESSAGE
+
+
+def test_chat_is_shed_with_retry_after(saturated, monkeypatch):
+    monkeypatch.setattr(main, "DEGRADE_RETRIEVAL_ONLY", False)
+    client = TestClient(main.app)
+    for path in ("/chat", "/chat/stream"):
+        response = client.post(path, json={"query": "zen skort"})
+        assert response.status_code == 503
+        assert int(response.headers["Retry-After"]) >= 1
@@ -0,0 +1,24 @@
+from benchmarks.common import summarize
+from benchmarks.compare import compare
+
+
+def _load_result(p95_ms, throughput):
+    return {"results": [{"endpoint": "chat", "concurrency": 8, "throughput_rps": throughput,
+                         "latency": {"p50_ms": 10.0, "p95_ms": p95_ms, "p99_ms": 50.0}}]}
+
+
+def test_summarize_percentiles_in_ms():
+    summary = summarize([i / 1000 for i in range(1, 101)])
+    assert summary["count"] == 100
+    assert summary["p50_ms"] == 50.5
+    assert 95 <= summary["p95_ms"] <= 96
+    assert summary["max_ms"] == 100.0
+    assert summarize([]) == {"count": 0}
+
+
+def test_compare_flags_p95_and_throughput_regressions():
+    _, regressions = compare(_load_result(20.0, 100.0), _load_result(21.0, 95.0), threshold=10)
+    assert regressions == []
+
+    _, regressions = compare(_load_result(20.0, 100.0), _load_result(30.0, 80.0), threshold=10)
+    assert {row[1] for row in regressions} == {"p95_ms", "throughput_rps"}
@@ -0,0 +1,45 @@
+from app.services import context_builder
+from app.services.context_builder import build_context, estimate_tokens, product_summary, summarize_product
+
+PRODUCT = {
+    "id": "p1",
+    "title": "Zen Flare Leggings",
+    "price": 1999,
+    "category": "BOTTOMWEAR",
+    "features": {"attributes": ["Buttery Soft", "High Waist", "Pockets", "4 Way Stretch", "Squat Proof"], "colors": ["Black"]},
+    "description": "Flared leggings made for slow flows and long days. " * 10,
+}
+
+
+def test_summary_is_compact():
+    summary = summarize_product(PRODUCT)
+    assert summary.startswith("Zen Flare Leggings (Price: 1999) | Bottomwear | Buttery Soft, High Waist, Pockets, 4 Way Stretch")
+    assert "Squat Proof" not in summary
+    assert summary.endswith("...")
+    assert len(summary) < len(PRODUCT["description"])
+
+
+def test_precomputed_summary_is_used():
+    assert product_summary({**PRODUCT, "id": "p2", "summary": "Stored summary"}) == "Stored summary"
+
+
+def test_summaries_are_memoized_until_cleared():
+    context_builder.clear()
+    first = product_summary(PRODUCT)
+    assert product_summary({**PRODUCT, "title": "Renamed"}) == first
+    context_builder.clear()
+    assert product_summary({**PRODUCT, "title": "Renamed"}).startswith("Renamed")
+    context_builder.clear()
+
+
+def test_context_respects_budget_but_keeps_best_product():
+    products = [{**PRODUCT, "id": f"p{i}", "title": f"Product {i}"} for i in range(10)]
+    line_tokens = estimate_tokens(f"- {summarize_product(products[0])}")
+
+    context, tokens = build_context(products, budget_tokens=line_tokens * 3)
+    assert context.count("\n- ") + 1 == 3 and tokens <= line_tokens * 3
+    assert context.startswith("- Product 0")
+
+    context, _ = build_context(products, budget_tokens=1)
+    assert context.count("- Product") == 1
+    context_builder.clear()
@@ -0,0 +1,37 @@
+from app.services.crawl_state import CrawlState, content_hash
+
+
+def test_records_and_replays_validators(tmp_path):
+    state = CrawlState(str(tmp_path / "state.sqlite"))
+    assert state.conditional_headers("a") == {}
+    state.record("a", '"v1"', "Mon, 01 Jan 2024 00:00:00 GMT", content_hash("body"), {"url": "a", "title": "A"})
+    state.close()
+
+    state = CrawlState(str(tmp_path / "state.sqlite"))
+    assert state.conditional_headers("a") == {"If-None-Match": '"v1"', "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT"}
+    assert state.get("a")["content_hash"] == content_hash(b"body")
+    assert state.product("a") == {"url": "a", "title": "A"}
+    assert state.product("missing") is None
+
+    # A 304 without validators keeps the stored ones
+    state.touch("a")
+    assert state.conditional_headers("a")["If-None-Match"] == '"v1"'
+    state.touch("a", etag='"v2"')
+    assert state.conditional_headers("a")["If-None-Match"] == '"v2"'
+    state.close()
+
+
+def test_pop_unseen_only_returns_pages_missed_this_run(tmp_path):
+    path = str(tmp_path / "state.sqlite")
+    state = CrawlState(path)
+    for url in ("a", "b", "c"):
+        state.record(url, None, None, content_hash(url), {"url": url})
+    state.close()
+
+    state = CrawlState(path)
+    state.touch("a")
+    state.record("b", None, None, content_hash("b2"), {"url": "b", "title": "B"})
+    assert state.pop_unseen() == [{"url": "c"}]
+    assert [p["url"] for p in state.products()] == ["a", "b"]
+    assert state.pop_unseen() == []
+    state.close()
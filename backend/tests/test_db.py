@@ -0,0 +1,23 @@
+import asyncio
+
+from app.core import db
+
+
+def test_async_client_is_closed_and_recreated_per_loop(monkeypatch):
+    monkeypatch.setattr(db, "SUPABASE_URL", "https://example.supabase.co")
+    monkeypatch.setattr(db, "SUPABASE_KEY", "key")
+
+    async def serve():
+        client = await db.get_async_client()
+        pool = db._http_client
+        # Every sub-client sends through the one pool
+        assert client.postgrest.session is pool
+        assert client.storage._client is pool
+        await db.close_async_client()
+        return client, pool
+
+    # Two loops in turn, as with an app restarted in one process
+    first, first_pool = asyncio.run(serve())
+    second, second_pool = asyncio.run(serve())
+    assert first_pool.is_closed and second_pool.is_closed
+    assert first is not second
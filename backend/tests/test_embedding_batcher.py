@@ -0,0 +1,79 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.services.embedding_batcher import EmbeddingBatcher
+
+
+class StubEmbedder:
+    """
+    Local stand-in for the embedding API: records each batch it receives.
+    """
+
+    def __init__(self):
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def __call__(self, texts):
+        with self.lock:
+            self.batches.append(list(texts))
+        return [[float(len(text)), 1.0] for text in texts]
+
+
+def test_concurrent_queries_share_one_batch():
+    stub = StubEmbedder()
+    batcher = EmbeddingBatcher(stub, max_batch_size=32, max_wait_ms=20)
+
+    async def main():
+        return await asyncio.gather(*[batcher.embed("x" * n) for n in range(1, 6)])
+
+    vectors = asyncio.run(main())
+    assert vectors == [[float(n), 1.0] for n in range(1, 6)]
+    assert len(stub.batches) == 1
+    assert sorted(stub.batches[0], key=len) == ["x" * n for n in range(1, 6)]
+
+
+def test_full_batch_flushes_without_waiting():
+    stub = StubEmbedder()
+    batcher = EmbeddingBatcher(stub, max_batch_size=2, max_wait_ms=10_000)
+
+    async def main():
+        return await asyncio.wait_for(asyncio.gather(batcher.embed("a"), batcher.embed("bb")), timeout=1)
+
+    assert asyncio.run(main()) == [[1.0, 1.0], [2.0, 1.0]]
+
+
+def test_blocking_callers_from_threads():
+    stub = StubEmbedder()
+    batcher = EmbeddingBatcher(stub, max_batch_size=8, max_wait_ms=20)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        vectors = list(pool.map(batcher.embed_blocking, ["a", "bb", "ccc", "dddd"]))
+    assert vectors == [[1.0, 1.0], [2.0, 1.0], [3.0, 1.0], [4.0, 1.0]]
+    assert sum(len(b) for b in stub.batches) == 4
+
+
+def test_errors_reach_every_caller():
+    def failing(texts):
+        raise RuntimeError("quota exceeded")
+
+    batcher = EmbeddingBatcher(failing, max_batch_size=8, max_wait_ms=5)
+
+    async def main():
+        return await asyncio.gather(batcher.embed("a"), batcher.embed("b"), return_exceptions=True)
+
+    assert all(isinstance(r, RuntimeError) for r in asyncio.run(main()))
+    with pytest.raises(RuntimeError):
+        batcher.embed_blocking("c")
+
+
+def test_cancelled_caller_does_not_block_the_batch():
+    stub = StubEmbedder()
+    batcher = EmbeddingBatcher(stub, max_batch_size=3, max_wait_ms=10_000)
+    cancelled = batcher.submit("a")
+    assert cancelled.cancel()
+    others = [batcher.submit("bb"), batcher.submit("ccc")]
+
+    assert [f.result(timeout=1) for f in others] == [[2.0, 1.0], [3.0, 1.0]]
+    assert stub.batches == [["bb", "ccc"]]
@@ -0,0 +1,48 @@
+from app.services.enrichment import build_chunks, build_search_document, collection_of, enrich, price_bucket
+from app.services.ingest_data import build_embedding_chunks, build_product_row
+
+PRODUCT = {
+    "id": 7,
+    "title": "Safari Chic Co-ord Set",
+    "price": 2999,
+    "description": "Go wild in  prints!",
+    "features": ["4 Way Stretch", "Pockets"],
+    "image_url": None,
+    "category": "CO-ORD SET",
+    "colors": ["Leopard Brown", "Zebra Black"],
+}
+
+
+def test_price_buckets():
+    assert [price_bucket(p) for p in (999, 1000, 1999, 2999, 3000)] == ["under-1000", "1000-1999", "1000-1999", "2000-2999", "3000+"]
+    assert price_bucket(None) is None
+
+
+def test_collection_prefers_longest_match():
+    assert collection_of("Safari Chic Co-ord Set") == "Safari Chic"
+    assert collection_of("Zen Flare Leggings") == "Zen"
+    assert collection_of("Everyday Tee") is None
+
+
+def test_search_document_is_normalized_and_complete():
+    document = build_search_document(PRODUCT)
+    assert document == document.lower()
+    for word in ("safari chic", "co ord set", "pockets", "zebra black", "go wild in prints"):
+        assert word in document
+
+
+def test_product_row_carries_precomputed_fields():
+    row = build_product_row(PRODUCT)
+    assert row["price_bucket"] == "2000-2999"
+    assert row["collection"] == "Safari Chic"
+    assert row["colors"] == PRODUCT["colors"]
+    assert row["summary"].startswith("Safari Chic Co-ord Set (Price: 2999)")
+    assert row == {**row, **enrich(PRODUCT)}
+
+
+def test_chunks_cover_description_and_colors():
+    chunks = build_embedding_chunks(PRODUCT)
+    assert len(chunks) == 3
+    assert chunks[1] == "Safari Chic Co-ord Set: Go wild in prints!"
+    assert "Zebra Black" in chunks[2]
+    assert build_chunks({"title": "Plain Tee"}, "Plain Tee") == ["Plain Tee"]
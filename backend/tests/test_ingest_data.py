@@ -0,0 +1,155 @@
+import json
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import ingest_data
+from app.services.embedding_store import EmbeddingStore, embedding_key
+from app.services.ingest_data import ingest_batch
+
+
+class FakeQuery:
+    """
+    The subset of the Supabase query builder ingestion uses, over in-memory tables.
+    """
+
+    def __init__(self, client, table):
+        self.client, self.table = client, table
+        self.action, self.payload, self.filters = "select", None, []
+
+    def select(self, columns):
+        self.columns = [c.strip() for c in columns.split(",")]
+        return self
+
+    def upsert(self, rows, on_conflict):
+        self.action, self.payload, self.conflict = "upsert", rows, on_conflict.split(",")
+        return self
+
+    def delete(self):
+        self.action = "delete"
+        return self
+
+    def in_(self, column, values):
+        self.filters.append(lambda row: row.get(column) in values)
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def gte(self, column, value):
+        self.filters.append(lambda row: row.get(column) >= value)
+        return self
+
+    def execute(self):
+        rows = self.client.tables.setdefault(self.table, [])
+        matches = [row for row in rows if all(f(row) for f in self.filters)]
+        if self.action == "select":
+            return SimpleNamespace(data=[{c: row.get(c) for c in self.columns} for row in matches])
+        if self.action == "delete":
+            self.client.tables[self.table] = [row for row in rows if row not in matches]
+            return SimpleNamespace(data=matches)
+        self.client.upserts.append((self.table, len(self.payload)))
+        keys = [tuple(new[c] for c in self.conflict) for new in self.payload]
+        if len(set(keys)) < len(keys):
+            raise ValueError("ON CONFLICT DO UPDATE command cannot affect row a second time")
+        written = []
+        for new in self.payload:
+            key = [new[c] for c in self.conflict]
+            existing = next((row for row in rows if [row.get(c) for c in self.conflict] == key), None)
+            if existing is None:
+                existing = {"id": str(uuid.uuid4())}
+                rows.append(existing)
+            existing.update(new)
+            written.append(dict(existing))
+        return SimpleNamespace(data=written)
+
+
+class FakeClient:
+    def __init__(self):
+        self.tables = {}
+        self.upserts = []
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+
+def product(n, **changes):
+    return {"id": n, "title": f"Item {n}", "price": 1000 + n, "image_url": None, "features": ["Soft"],
+            "category": "BOTTOMWEAR", "description": f"Description {n}", **changes}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    client = FakeClient()
+    monkeypatch.setattr(ingest_data, "get_client", lambda: client)
+    monkeypatch.setattr(ingest_data, "generate_embeddings", lambda texts: [[float(len(t)), 1.0] for t in texts])
+    return client
+
+
+def test_embedding_store_round_trip(tmp_path):
+    store = EmbeddingStore(str(tmp_path / "store.sqlite"))
+    keys = [embedding_key(f"text {n}", "model", 2) for n in range(600)]
+    store.put_many({key: [float(n), 0.5] for n, key in enumerate(keys)})
+    found = store.get_many(keys + ["missing"])
+    assert len(found) == 600
+    assert found[keys[599]] == [599.0, 0.5]
+    store.close()
+
+    assert EmbeddingStore(str(tmp_path / "store.sqlite")).get_many([keys[0]]) == {keys[0]: [0.0, 0.5]}
+    assert embedding_key("a", "model", 2) != embedding_key("a", "model", 3)
+
+
+def test_unchanged_products_are_skipped(client, tmp_path):
+    store = EmbeddingStore(str(tmp_path / "store.sqlite"))
+    first = ingest_batch([product(1), product(2)], store)
+    assert first["changed"] == 2 and first["embedded"] > 0
+    assert len(first["ingested"]) == 2
+    writes = list(client.upserts)
+
+    again = ingest_batch([product(1), product(2)], store)
+    assert again["changed"] == 0
+    assert again["embedded"] == again["reused"] == 0
+    assert again["unchanged"] == first["unchanged"] + first["embedded"]
+    assert sorted(again["ingested"]) == sorted(first["ingested"])
+    # Nothing was rewritten
+    assert client.upserts == writes
+
+
+def test_row_only_change_counts_as_changed(client, tmp_path):
+    store = EmbeddingStore(str(tmp_path / "store.sqlite"))
+    ingest_batch([product(1), product(2)], store)
+
+    # The price is not embedded, but the catalog still changed
+    stats = ingest_batch([product(1, price=999), product(2)], store)
+    assert stats["changed"] == 1
+    assert stats["embedded"] == 0
+    assert client.upserts[-1] == ("products", 1)
+    assert [row["price"] for row in client.tables["products"] if row["sku_id"] == "HUNNIT-1"] == [999]
+
+
+def test_ingest_data_reports_failure(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest_data, "EmbeddingStore", lambda: EmbeddingStore(str(tmp_path / "store.sqlite")))
+    monkeypatch.setattr(ingest_data, "CHECKPOINT_PATH", str(tmp_path / "checkpoint.json"))
+    monkeypatch.setattr(ingest_data.catalog, "bump_version", lambda: None)
+    path = tmp_path / "products.json"
+    path.write_text(json.dumps([product(1), product(2)]), encoding="utf-8")
+
+    assert ingest_data.ingest_data(str(path))
+    assert not ingest_data.ingest_data(str(tmp_path / "missing.jsonl"))
+
+    def fail(batch, embedding_store):
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(ingest_data, "ingest_batch", fail)
+    assert not ingest_data.ingest_data(str(path))
+
+
+def test_duplicate_skus_in_a_batch_are_upserted_once(client, tmp_path):
+    store = EmbeddingStore(str(tmp_path / "store.sqlite"))
+    stats = ingest_batch([product(1), product(2), product(1, price=999)], store)
+    assert stats["duplicates"] == 1
+    assert sorted(stats["ingested"]) == ["HUNNIT-1", "HUNNIT-2"]
+    # The last occurrence wins
+    assert [row["price"] for row in client.tables["products"] if row["sku_id"] == "HUNNIT-1"] == [999]
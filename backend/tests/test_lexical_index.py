@@ -0,0 +1,55 @@
+import json
+import os
+
+from app.services.lexical_index import LexicalIndex, parse_filters, reciprocal_rank_fusion
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), "..", "app", "services", "hunnit_products.json")
+
+
+def load_catalog():
+    with open(DATA_PATH, encoding="utf-8") as f:
+        products = json.load(f)
+    return [
+        {
+            "id": str(p["id"]),
+            "title": p["title"],
+            "price": p["price"],
+            "category": p.get("category"),
+            "features": {"attributes": p.get("features", []), "colors": p.get("colors", [])},
+        }
+        for p in products
+    ]
+
+
+def test_parse_filters():
+    assert parse_filters("black leggings under 1,500")[1] == {"max_price": 1500}
+    assert parse_filters("shorts above 1000")[1] == {"min_price": 1000}
+    assert parse_filters("sets between 2000 and 2500")[1] == {"min_price": 2000, "max_price": 2500}
+
+
+def test_attribute_query_is_fully_matched_and_filtered():
+    index = LexicalIndex(load_catalog())
+    hits, fully_matched, filters = index.search("safari chic leggings under 1500", 5)
+    assert fully_matched
+    assert filters == {"max_price": 1500}
+    top = index.products_by_id[hits[0][0]]
+    assert top["title"] == "Safari Chic 7/8 Leggings"
+    assert all(index.products_by_id[pid]["price"] <= 1500 for pid, _ in hits)
+
+
+def test_category_filter():
+    index = LexicalIndex(load_catalog())
+    hits, _, filters = index.search("epic pop sports bras", 10)
+    assert filters["category"] == "sport bra"
+    assert hits and all(index.products_by_id[pid]["category"] == "SPORTS BRAS" for pid, _ in hits)
+
+
+def test_unknown_terms_return_nothing():
+    index = LexicalIndex(load_catalog())
+    assert index.search("xylophone", 5)[0] == []
+
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "a", "d"]])
+    assert fused[:2] == ["a", "c"]
+    assert set(fused) == {"a", "b", "c", "d"}
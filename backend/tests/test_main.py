@@ -1,3 +1,7 @@
+import asyncio
+import json
+
+import pytest
 from fastapi.testclient import TestClient
 from app.main import app
 
@@ -28,3 +32,112 @@ def test_get_product_not_found():
     # Should be 404 or 500 depending on DB response for invalid ID, but 404 is expected for not found
     # Note: Supabase might return empty list which our code converts to 404
     assert response.status_code in [404, 500] 
+
+def test_get_product_by_id():
+    product = client.get("/products?limit=1").json()[0]
+    response = client.get(f"/products/{product['id']}")
+    assert response.status_code == 200
+    assert response.json()["sku_id"] == product["sku_id"]
+
+def test_get_products_keyset_cursor():
+    first = client.get("/products?limit=2&cursor=")
+    assert first.status_code == 200
+    cursor = first.headers["X-Next-Cursor"]
+    assert cursor == first.json()[-1]["id"]
+    second = client.get(f"/products?limit=2&cursor={cursor}")
+    ids = [p["id"] for p in first.json() + second.json()]
+    assert ids == [p["id"] for p in client.get("/products?limit=4&cursor=").json()]
+    assert len(set(ids)) == 4
+
+def test_get_product_not_modified():
+    product = client.get("/products?limit=1").json()[0]
+    url = f"/products/{product['id']}"
+    etag = client.get(url).headers["ETag"]
+    assert client.get(url, headers={"If-None-Match": f'W/"other", {etag}'}).status_code == 304
+    # Weak comparison: the strong form of the same tag matches too
+    assert client.get(url, headers={"If-None-Match": etag.removeprefix("W/")}).status_code == 304
+    assert client.get(url, headers={"If-None-Match": "*"}).status_code == 304
+    # Only whole tags match
+    assert client.get(url, headers={"If-None-Match": etag + "-gzip"}).status_code == 200
+    assert client.get(url, headers={"If-None-Match": etag[:-1] + '0"'}).status_code == 200
+
+def test_chat():
+    response = client.post("/chat", json={"query": "black leggings with pockets"})
+    assert response.status_code == 200
+    data = response.json()
+    assert isinstance(data["response"], str)
+    assert isinstance(data["products"], list)
+    assert data["products"]
+    assert all(p["similarity"] is not None for p in data["products"])
+    assert set(data["metadata"]["tokens"]) == {"prompt", "output", "cached"}
+
+def test_chat_cache_miss_embeds_the_query_once(monkeypatch):
+    from app.services import rag
+
+    embedded = []
+    embed_query = rag.embed_query
+
+    async def counting_embed_query(query):
+        embedded.append(query)
+        return await embed_query(query)
+
+    monkeypatch.setattr(rag, "embed_query", counting_embed_query)
+    query = "navy blue leggings with pockets for running"
+    response = client.post("/chat", json={"query": query})
+    assert response.status_code == 200
+    assert response.json()["metadata"].get("cache") != "exact"
+    assert embedded.count(query) == 1
+
+def test_chat_reranks_on_stored_embeddings(monkeypatch):
+    from app.services import reranker
+
+    def term_vectors(rows):
+        raise AssertionError("re-ranked on term vectors")
+
+    # No in-process vector index: the candidates' embeddings come from the store
+    monkeypatch.setattr(reranker, "_term_vectors", term_vectors)
+    response = client.post("/chat", json={"query": "soft high waist shorts for the gym"})
+    assert response.status_code == 200
+    assert response.json()["products"]
+
+def test_failed_expansion_cancels_the_raw_search(monkeypatch):
+    from app import main
+
+    started, cancelled = asyncio.Event(), []
+
+    async def search_products(query, query_embedding=None):
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(query)
+            raise
+
+    async def expand_query(query):
+        await started.wait()
+        raise RuntimeError("expansion failed")
+
+    monkeypatch.setattr(main.rag, "search_products", search_products)
+    monkeypatch.setattr(main.llm, "expand_query", expand_query)
+    async def search():
+        with pytest.raises(RuntimeError):
+            await main._search_with_expansion("leggings")
+        # Cancelled before the error reached the caller
+        assert cancelled == ["leggings"]
+
+    asyncio.run(search())
+
+def test_chat_stream_reports_tokens():
+    response = client.post("/chat/stream", json={"query": "zen flare leggings for yoga"})
+    assert response.status_code == 200
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert events[-1]["type"] == "done"
+    assert events[-1]["metadata"]["tokens"]["prompt"] > 0
+    products = next(e["products"] for e in events if e["type"] == "products")
+    assert products and all(p["similarity"] is not None for p in products)
+
+def test_metrics():
+    client.get("/")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert "http_request_duration_seconds_bucket" in response.text
@@ -0,0 +1,62 @@
+import asyncio
+
+from app.core import metrics
+
+
+def test_span_records_histogram_and_trace():
+    trace, token = metrics.start_trace()
+    try:
+        with metrics.span("test_stage"):
+            pass
+        with metrics.span("test_stage"):
+            pass
+        metrics.annotate(cache="miss")
+    finally:
+        metrics.end_trace(token)
+
+    assert [name for name, _ in trace.stages] == ["test_stage", "test_stage"]
+    assert list(trace.stage_totals()) == ["test_stage"]
+    assert metrics.histogram(metrics.STAGE_HISTOGRAM, stage="test_stage").count >= 2
+    header = metrics.server_timing(trace)
+    assert header.startswith("test_stage;dur=") and 'cache;desc="miss"' in header
+    assert metrics.current_trace() is None
+
+
+def test_traced_spans_reach_the_trace_from_child_tasks():
+    @metrics.traced("test_child")
+    async def child():
+        await asyncio.sleep(0)
+
+    async def main():
+        trace, token = metrics.start_trace()
+        try:
+            await asyncio.gather(asyncio.create_task(child()), child())
+        finally:
+            metrics.end_trace(token)
+        return trace
+
+    trace = asyncio.run(main())
+    assert [name for name, _ in trace.stages] == ["test_child", "test_child"]
+
+
+def test_record_tokens_counts_and_annotates():
+    before = metrics.get("llm_test_prompt_tokens")
+    trace, token = metrics.start_trace()
+    try:
+        metrics.record_tokens("test", 100, 20)
+        metrics.record_tokens("test", 50, 5)
+    finally:
+        metrics.end_trace(token)
+    assert metrics.get("llm_test_prompt_tokens") == before + 150
+    assert trace.attributes == {"prompt_tokens": 150, "output_tokens": 25}
+
+
+def test_prometheus_histogram_buckets_are_cumulative():
+    metrics.observe("test_render_seconds", 0.003, stage="a")
+    metrics.observe("test_render_seconds", 20.0, stage="a")
+    text = metrics.render_prometheus()
+    assert "# TYPE test_render_seconds histogram" in text
+    assert 'test_render_seconds_bucket{stage="a",le="0.001"} 0' in text
+    assert 'test_render_seconds_bucket{stage="a",le="0.005"} 1' in text
+    assert 'test_render_seconds_bucket{stage="a",le="+Inf"} 2' in text
+    assert 'test_render_seconds_count{stage="a"} 2' in text
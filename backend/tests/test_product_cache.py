@@ -0,0 +1,48 @@
+import asyncio
+
+from app.services import catalog
+from app.services.product_cache import ProductCache
+
+
+def test_lru_evicts_least_recently_used():
+    cache = ProductCache(max_size=2, ttl_seconds=60, redis_url=None)
+    asyncio.run(cache.set("a", 1))
+    asyncio.run(cache.set("b", 2))
+    assert asyncio.run(cache.get("a")) == 1
+    asyncio.run(cache.set("c", 3))
+    assert asyncio.run(cache.get("b")) is None
+    assert asyncio.run(cache.get("a")) == 1 and asyncio.run(cache.get("c")) == 3
+
+
+def test_entries_expire():
+    cache = ProductCache(max_size=10, ttl_seconds=0, redis_url=None)
+    asyncio.run(cache.set("a", 1))
+    assert asyncio.run(cache.get("a")) is None
+
+
+def test_read_through_loads_once_and_skips_empty_results():
+    cache = ProductCache(max_size=10, ttl_seconds=60, redis_url=None)
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        return [{"id": "p1"}]
+
+    async def empty():
+        calls.append(0)
+        return []
+
+    assert asyncio.run(cache.read_through("k", loader)) == [{"id": "p1"}]
+    assert asyncio.run(cache.read_through("k", loader)) == [{"id": "p1"}]
+    assert asyncio.run(cache.read_through("e", empty)) == []
+    assert asyncio.run(cache.read_through("e", empty)) == []
+    assert calls == [1, 0, 0]
+
+
+def test_keys_change_with_the_catalog_version(monkeypatch):
+    cache = ProductCache(max_size=10, ttl_seconds=60, redis_url=None)
+    monkeypatch.setattr(catalog, "_version", 3)
+    key = cache.key("list", 20, 0)
+    assert key == "products:3:list:20:0"
+    monkeypatch.setattr(catalog, "_version", 4)
+    assert cache.key("list", 20, 0) != key
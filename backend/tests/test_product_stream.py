@@ -0,0 +1,114 @@
+import threading
+
+import pytest
+
+from app.services import ingest_data
+from app.services.ingest_data import ingest_products, sku_id
+from app.services.product_stream import JsonlWriter, ProductQueue, batched, read_products, seen_urls
+
+
+def product(n):
+    return {"url": f"https://hunnit.com/products/item-{n}", "title": f"Item {n}", "price": 1000 + n, "features": []}
+
+
+def test_jsonl_round_trip_skips_truncated_line(tmp_path):
+    path = str(tmp_path / "products.jsonl")
+    with JsonlWriter(path) as writer:
+        writer.write(product(1))
+        writer.write(product(2))
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"url": "https://hunnit.com/products/item-3", "tit')
+
+    assert [p["title"] for p in read_products(path)] == ["Item 1", "Item 2"]
+    assert seen_urls(path) == {product(1)["url"], product(2)["url"]}
+
+    with JsonlWriter(path, append=True) as writer:
+        writer.write(product(4))
+    assert [p["title"] for p in read_products(path)][-1] == "Item 4"
+
+
+def test_batched():
+    assert [len(batch) for batch in batched((product(n) for n in range(7)), 3)] == [3, 3, 1]
+
+
+def test_product_queue_hands_off_between_threads():
+    products = ProductQueue(maxsize=2)
+
+    def produce():
+        for n in range(5):
+            products.put(product(n))
+        products.close()
+
+    threading.Thread(target=produce).start()
+    assert [p["title"] for p in products] == [f"Item {n}" for n in range(5)]
+
+
+def test_producer_error_reaches_the_consumer():
+    products = ProductQueue()
+    products.put(product(1))
+    products.close(RuntimeError("crawl failed"))
+    received = []
+    with pytest.raises(RuntimeError):
+        for p in products:
+            received.append(p)
+    assert received == [product(1)]
+
+
+def test_failed_scrape_is_not_published(tmp_path, monkeypatch):
+    from app.services import scraper
+
+    def scrape_hunnit_products(sink, **options):
+        sink(product(1))
+        raise RuntimeError("collection page failed")
+
+    bumped = []
+    monkeypatch.setattr(scraper, "scrape_hunnit_products", scrape_hunnit_products)
+    monkeypatch.setattr(ingest_data, "ingest_batch", lambda batch, store: {
+        "ingested": [sku_id(p) for p in batch], "duplicates": 0, "changed": len(batch), "unchanged": 0, "reused": 0, "embedded": 0})
+    monkeypatch.setattr(ingest_data, "EmbeddingStore", lambda: type("Store", (), {"close": lambda self: None})())
+    monkeypatch.setattr(ingest_data, "CHECKPOINT_PATH", str(tmp_path / "checkpoint.json"))
+    monkeypatch.setattr(ingest_data.catalog, "bump_version", lambda: bumped.append(1))
+
+    assert not ingest_data.scrape_and_ingest(batch_size=10)
+    assert bumped == []
+
+
+def test_sku_from_id_or_url_handle():
+    assert sku_id({"id": 7}) == "HUNNIT-7"
+    assert sku_id(product(3)) == "HUNNIT-item-3"
+
+
+def test_ingest_products_keeps_batches_in_flight_bounded(tmp_path, monkeypatch):
+    in_flight, peak = [0], [0]
+    lock = threading.Lock()
+    release = threading.Event()
+
+    def ingest_batch(batch, embedding_store):
+        with lock:
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+        release.wait(0.01)
+        with lock:
+            in_flight[0] -= 1
+        return {"ingested": [sku_id(p) for p in batch], "duplicates": 0, "changed": len(batch), "unchanged": 0, "reused": 0, "embedded": len(batch)}
+
+    pulled = []
+
+    def stream():
+        for n in range(25):
+            pulled.append(n)
+            yield product(n)
+
+    class Store:
+        def close(self):
+            pass
+
+    monkeypatch.setattr(ingest_data, "ingest_batch", ingest_batch)
+    monkeypatch.setattr(ingest_data, "EmbeddingStore", Store)
+    monkeypatch.setattr(ingest_data, "CHECKPOINT_PATH", str(tmp_path / "checkpoint.json"))
+    monkeypatch.setattr(ingest_data.catalog, "bump_version", lambda: None)
+
+    totals = ingest_products(stream(), batch_size=4, concurrency=2)
+    assert totals["ingested"] == totals["products"] == 25
+    assert totals["batches"] == 7
+    assert peak[0] <= 2
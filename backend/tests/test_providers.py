@@ -0,0 +1,96 @@
+import asyncio
+
+import numpy as np
+
+from app.services.embedders import HashingEmbedder
+from app.services.generators import TemplateGenerator
+from app.services.stores import MemoryStore
+
+PRODUCTS = [
+    {"id": i, "title": title, "price": price, "image_url": None, "category": category, "features": features}
+    for i, (title, price, category, features) in enumerate([
+        ("Zen Flare Leggings", 1999, "BOTTOMWEAR", ["Buttery Soft", "High Waist"]),
+        ("Cosmic Waves Sports Bra", 1299, "TOPWEAR", ["Moisture Wicking"]),
+        ("Safari Chic Co-ord Set", 2999, "CO-ORD SET", ["4 Way Stretch"]),
+    ], start=1)
+]
+
+
+def test_hashing_embedder_is_deterministic_and_normalized():
+    embedder = HashingEmbedder(dimensions=64)
+    first, second = embedder.embed(["zen leggings", "zen leggings"])
+    assert first == second
+    assert len(first) == 64
+    assert np.isclose(np.linalg.norm(first), 1.0)
+
+
+def test_hashing_embedder_ranks_shared_words_higher():
+    embedder = HashingEmbedder()
+    query, related, unrelated = (np.array(v) for v in embedder.embed(["flare leggings", "zen flare leggings", "sports bra"]))
+    assert query @ related > query @ unrelated
+
+
+def test_memory_store_pagination_and_lookup():
+    store = MemoryStore(products=PRODUCTS)
+
+    async def main():
+        first = await store.list_products(2, cursor="")
+        rest = await store.list_products(2, cursor=first[-1]["id"])
+        by_offset = await store.list_products(2, offset=2, columns="id, title")
+        found = await store.get_products([first[0]["id"], "missing"])
+        return first, rest, by_offset, found
+
+    first, rest, by_offset, found = asyncio.run(main())
+    ids = [p["id"] for p in first + rest]
+    assert ids == sorted(ids) and len(ids) == 3
+    assert by_offset == [{"id": rest[0]["id"], "title": rest[0]["title"]}]
+    assert [p["id"] for p in found] == [first[0]["id"]]
+    assert first[0]["sku_id"].startswith("HUNNIT-")
+
+
+def test_memory_store_vector_match():
+    store = MemoryStore(products=PRODUCTS)
+    query = HashingEmbedder().embed_one("Zen Flare Leggings")
+    matches = asyncio.run(store.match_embeddings(query, 0.1, 2))
+    best = asyncio.run(store.get_product(matches[0]["product_id"]))
+    assert best["title"] == "Zen Flare Leggings"
+    assert len(store.fetch_all_rows("product_embeddings")) == 3
+
+
+def test_memory_store_match_products_full_returns_ranked_rows():
+    store = MemoryStore(products=PRODUCTS)
+    query = HashingEmbedder().embed_one("Zen Flare Leggings")
+    rows = asyncio.run(store.match_products_full(query, 0.1, 3))
+    assert rows[0]["title"] == "Zen Flare Leggings"
+    similarities = [row["similarity"] for row in rows]
+    assert similarities == sorted(similarities, reverse=True)
+    assert "similarity" not in asyncio.run(store.get_product(rows[0]["id"]))
+
+
+def test_template_generator_mentions_every_product():
+    context = [{"title": "Zen Flare Leggings", "price": 1999, "features": {"attributes": ["Pockets"]}}]
+    text = asyncio.run(TemplateGenerator().generate_response("leggings", context))
+    assert "Zen Flare Leggings" in text and "1999" in text
+
+
+def test_gemini_generator_sends_instructions_as_system_instruction(monkeypatch):
+    from types import SimpleNamespace
+    from app.services import generators
+
+    built, sent = [], []
+
+    class FakeModel:
+        def __init__(self, name, system_instruction):
+            built.append((name, system_instruction))
+
+        async def generate_content_async(self, prompt):
+            sent.append(prompt)
+            return SimpleNamespace(text=" terms ", usage_metadata=None)
+
+    monkeypatch.setattr(generators, "get_genai", lambda: SimpleNamespace(GenerativeModel=FakeModel))
+    generator = generators.GeminiGenerator("gemini-test")
+    assert asyncio.run(generator.expand_query("comfy")) == "terms"
+    assert asyncio.run(generator.expand_query("comfy")) == "terms"
+    # Built once, and the static instructions never travel with the prompt
+    assert built == [("gemini-test", generators.EXPANSION_INSTRUCTIONS), ("gemini-test", generators.RESPONSE_INSTRUCTIONS)]
+    assert sent == ['User Query: "comfy"'] * 2
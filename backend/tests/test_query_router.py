@@ -0,0 +1,17 @@
+from app.services import query_router
+
+
+def test_product_type_queries_skip_expansion():
+    assert query_router.route("Sports bras for running")["route"] == query_router.ROUTE_DIRECT
+    assert query_router.route("zen co-ord set")["route"] == query_router.ROUTE_DIRECT
+
+
+def test_collection_plus_feature_is_specific():
+    decision = query_router.route("cosmic waves with pockets")
+    assert decision["route"] == query_router.ROUTE_DIRECT
+    assert decision["matched"] == ["cosmic wave", "pocket"]
+
+
+def test_abstract_queries_are_expanded():
+    assert query_router.route("something comfy for a long flight")["route"] == query_router.ROUTE_EXPAND
+    assert query_router.route("zen")["route"] == query_router.ROUTE_EXPAND
@@ -0,0 +1,56 @@
+import numpy as np
+
+from app.services.reranker import mmr, rerank
+
+
+def row(product_id, title, price, category, similarity):
+    return {"id": product_id, "title": title, "price": price, "category": category, "similarity": similarity, "features": {}}
+
+
+CANDIDATES = [
+    row("1", "Epic Pop 7/8 Leggings", 1449, "BOTTOMWEAR", 0.90),
+    row("2", "Epic Pop 7/8 Leggings", 1449, "BOTTOMWEAR", 0.89),
+    row("3", "Epic Pop 7/8 Leggings", 1449, "BOTTOMWEAR", 0.88),
+    row("4", "Cosmic Waves Sports Bra", 1249, "SPORTS BRAS", 0.80),
+    row("5", "Zen Flare Pants", 1399, "BOTTOMWEAR", 0.85),
+    row("6", "Epic Pop 7/8 Leggings And Sports Bra Co-Ord Set", 2698, "CO-ORD SETS", 0.75),
+]
+
+
+def test_mmr_skips_near_duplicates():
+    relevance = np.array([1.0, 0.99, 0.5])
+    similarity = np.array([[1.0, 1.0, 0.0], [1.0, 1.0, 0.0], [0.0, 0.0, 1.0]])
+    assert mmr(relevance, similarity, 2, lambda_=0.5) == [0, 2]
+    assert mmr(relevance, similarity, 2, lambda_=1.0) == [0, 1]
+
+
+def test_mmr_caps_products_per_group():
+    relevance = np.array([1.0, 0.9, 0.8, 0.1])
+    similarity = np.eye(4)
+    assert mmr(relevance, similarity, 3, lambda_=1.0, groups=np.array([0, 0, 0, 1]), max_per_group=2) == [0, 1, 3]
+
+
+def test_rerank_diversifies_colorways():
+    ranked = rerank(CANDIDATES, "leggings", 3)
+    assert [r["id"] for r in ranked][0] == "1"
+    assert [r["title"] for r in ranked].count("Epic Pop 7/8 Leggings") == 1
+
+
+def test_rerank_applies_price_constraint():
+    ranked = rerank(CANDIDATES, "something under 1400", 5)
+    assert {r["id"] for r in ranked} == {"4", "5"}
+
+
+def test_rerank_puts_named_category_first():
+    ranked = rerank(CANDIDATES, "sports bra", 3)
+    assert ranked[0]["id"] == "4"
+    assert len(ranked) == 3
+
+
+def test_rerank_uses_given_vectors():
+    # The colorways have distinct embeddings, the sports bra and pants identical ones
+    vectors = np.eye(6)[[0, 1, 2, 3, 3, 5]]
+    ranked = rerank(CANDIDATES, "leggings", 4, lambda_=0.5, max_per_category=0, vectors=vectors)
+    assert [r["id"] for r in ranked] == ["1", "2", "3", "5"]
+    # Candidates dropped by the price constraint take their vectors with them
+    assert {r["id"] for r in rerank(CANDIDATES, "something under 1400", 5, vectors=vectors)} == {"4", "5"}
@@ -0,0 +1,69 @@
+import time
+
+from app.core import metrics
+from app.services.response_cache import ResponseCache, normalize_query
+
+
+def test_normalize_query():
+    assert normalize_query("  Comfy Leggings, with POCKETS! ") == "comfy leggings with pockets"
+
+
+def test_exact_hit_on_normalized_text():
+    cache = ResponseCache(max_size=10, ttl_seconds=60, semantic_distance=0.05)
+    cache.put("comfy leggings with pockets", None, {"response": "a", "products": []})
+    assert cache.get_exact("Comfy leggings with pockets?") == {"response": "a", "products": []}
+    assert cache.get_exact("yoga mat") is None
+
+
+def test_semantic_hit_within_distance():
+    cache = ResponseCache(max_size=10, ttl_seconds=60, semantic_distance=0.05)
+    cache.put("comfy leggings", [1.0, 0.0, 0.0], {"response": "a"})
+    assert cache.get_semantic([0.99, 0.05, 0.0]) == {"response": "a"}
+    assert cache.get_semantic([0.0, 1.0, 0.0]) is None
+
+
+def test_lru_eviction():
+    cache = ResponseCache(max_size=2, ttl_seconds=60, semantic_distance=0.05)
+    cache.put("a", [1.0, 0.0], {"response": "a"})
+    cache.put("b", [0.0, 1.0], {"response": "b"})
+    cache.get_exact("a")
+    cache.put("c", [-1.0, 0.0], {"response": "c"})
+    assert len(cache) == 2
+    assert cache.get_exact("b") is None
+    assert cache.get_semantic([0.0, 1.0]) is None
+    assert cache.get_exact("a") is not None
+
+
+def test_ttl_expiry():
+    cache = ResponseCache(max_size=10, ttl_seconds=0, semantic_distance=0.05)
+    cache.put("a", [1.0, 0.0], {"response": "a"})
+    time.sleep(0.01)
+    assert cache.get_exact("a") is None
+    assert cache.get_semantic([1.0, 0.0]) is None
+
+
+def test_clear():
+    cache = ResponseCache(max_size=10, ttl_seconds=60, semantic_distance=0.05)
+    cache.put("a", [1.0, 0.0], {"response": "a"})
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.get_semantic([1.0, 0.0]) is None
+
+
+def test_tiers_count_their_misses_separately():
+    cache = ResponseCache(max_size=10, ttl_seconds=60, semantic_distance=0.05)
+    cache.put("comfy leggings", [1.0, 0.0, 0.0], {"response": "a"})
+    before = cache.stats()
+
+    # Exact miss, then a semantic hit
+    assert cache.get_exact("comfortable leggings") is None
+    assert cache.get_semantic([0.99, 0.05, 0.0]) is not None
+    # Exact miss, then a semantic miss
+    assert cache.get_exact("yoga mat") is None
+    assert cache.get_semantic([0.0, 1.0, 0.0]) is None
+
+    after = cache.stats()
+    assert after["exact_misses"] - before["exact_misses"] == 2
+    assert after["semantic_hits"] - before["semantic_hits"] == 1
+    assert after["semantic_misses"] - before["semantic_misses"] == 1
+    assert metrics.get("chat_cache_exact_misses") == after["exact_misses"]
@@ -0,0 +1,205 @@
+import asyncio
+import json
+import os
+
+import httpx
+import pytest
+
+from app.services import scraper
+from app.services.crawl_state import CrawlState
+from app.services.scraper import (
+    PARSER, extract_product_links, extract_structured_product, parse_pages, parse_price, parse_product_page,
+)
+
+PAGES_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "pages")
+URL = "https://hunnit.com/products/zen-cheerful-skort"
+
+PARSERS = ["html.parser"] + (["lxml"] if PARSER == "lxml" else [])
+
+
+def load(name):
+    with open(os.path.join(PAGES_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("parser", PARSERS)
+def test_shopify_page_uses_embedded_product_data(parser):
+    product = parse_product_page(load("shopify_product.html"), URL, parser)
+    assert product["title"] == "Zen Cheerful Skort"
+    assert product["price"] == 1499
+    assert product["category"] == "BOTTOMWEAR"
+    assert product["features"] == ["Zero Transparency", "Buttery Soft", "Moisture Wicking", "4 Way Stretch", "NEW IN"]
+    assert product["description"].startswith("Elevate Your Mood")
+    assert product["image_url"].startswith("https://hunnit.com/cdn/shop/products/")
+
+
+@pytest.mark.parametrize("parser", PARSERS)
+def test_features_fall_back_to_product_json_description(parser):
+    product = parse_product_page(load("shopify_product_js_description.html"), URL, parser)
+    assert product["price"] == 2698
+    assert product["category"] == "CO-ORD SETS"
+    assert product["features"] == ["Set includes skort + crop top"]
+
+
+@pytest.mark.parametrize("parser", PARSERS)
+def test_legacy_page_without_structured_data(parser):
+    html = load("legacy_product.html")
+    assert extract_structured_product(html) == {}
+    product = parse_product_page(html, URL, parser)
+    assert (product["title"], product["price"], product["category"]) == ("Zen Ankle Length Leggings", 1399, "BOTTOMWEAR")
+    assert product["features"] == ["Moisture Wicking", "High Waist", "Pockets"]
+
+
+def test_structured_product_price_is_in_rupees():
+    structured = extract_structured_product(load("shopify_product.html"))
+    assert structured["price"] == 1499
+    assert structured["title"] == "Zen Cheerful Skort"
+
+
+def test_parse_price():
+    assert parse_price("Rs. 1,499") == 1499
+    assert parse_price("1499.00") == 1499
+    assert parse_price(1249) == 1249
+    assert parse_price("Rs. 1,299.50 Rs. 1,999") == 1299
+    assert parse_price("Sold out") == 0
+
+
+def test_formatted_json_ld_price():
+    html = load("shopify_product.html").replace('"price": "1499.00"', '"price": "Rs. 1,499"')
+    assert html != load("shopify_product.html")
+    assert extract_structured_product(html)["price"] == 1499
+    # Unparseable: the price comes from the Shopify product JSON instead
+    html = html.replace('"price": "Rs. 1,499"', '"price": "TBD"')
+    assert extract_structured_product(html)["price"] == 1499
+
+
+def test_collection_links():
+    links = extract_product_links(load("collection.html"))
+    assert len(links) == 29
+    assert all("/products/" in link for link in links)
+
+
+def test_parse_pages_keeps_order():
+    pages = [(load(name), URL) for name in ("legacy_product.html", "shopify_product.html")]
+    titles = [product["title"] for product in parse_pages(pages, workers=1)]
+    assert titles == ["Zen Ankle Length Leggings", "Zen Cheerful Skort"]
+
+
+class FakeCrawler(scraper.Crawler):
+    """
+    Serves `pages` ({url: (etag, html)}) from memory and parses in-process.
+    URLs mapped to None fail to fetch.
+    """
+
+    def __init__(self, pages, listing_complete=True):
+        super().__init__()
+        self.pages = pages
+        self.listing_complete = listing_complete
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+    async def collect_product_links(self, max_pages=scraper.MAX_COLLECTION_PAGES):
+        return set(self.pages), self.listing_complete
+
+    async def fetch(self, url, headers=None):
+        if self.pages[url] is None:
+            return None
+        etag, html = self.pages[url]
+        if headers and headers.get("If-None-Match") == etag:
+            return httpx.Response(304)
+        return httpx.Response(200, text=html, headers={"ETag": etag})
+
+    async def parse(self, func, *args):
+        return func(*args)
+
+
+def run_incremental(monkeypatch, path, pages, listing_complete=True):
+    monkeypatch.setattr(scraper, "Crawler", lambda **kwargs: FakeCrawler(pages, listing_complete))
+    state = CrawlState(path)
+    try:
+        delta = asyncio.run(scraper.crawl_incremental(state))
+        return {status: sorted(p["url"] for p in products) for status, products in delta.items()}
+    finally:
+        state.close()
+
+
+def test_incremental_delta(monkeypatch, tmp_path):
+    path = str(tmp_path / "state.sqlite")
+    html = load("shopify_product.html")
+    a, b, c = (f"https://hunnit.com/products/{name}" for name in "abc")
+
+    delta = run_incremental(monkeypatch, path, {a: ('"a1"', html), b: ('"b1"', html)})
+    assert delta == {"new": [a, b], "changed": [], "removed": []}
+
+    delta = run_incremental(monkeypatch, path, {a: ('"a1"', html), b: ('"b2"', html + "<!-- edited -->"), c: ('"c1"', html)})
+    assert delta == {"new": [c], "changed": [b], "removed": []}
+
+    # A page that fails to fetch is kept, not reported as removed
+    delta = run_incremental(monkeypatch, path, {a: None, c: ('"c1"', html)})
+    assert delta == {"new": [], "changed": [], "removed": [b]}
+
+
+def test_incomplete_listing_removes_nothing(monkeypatch, tmp_path):
+    path = str(tmp_path / "state.sqlite")
+    html = load("shopify_product.html")
+    a, b = "https://hunnit.com/products/a", "https://hunnit.com/products/b"
+    run_incremental(monkeypatch, path, {a: ('"a1"', html), b: ('"b1"', html)})
+
+    # The collection page listing `b` failed
+    delta = run_incremental(monkeypatch, path, {a: ('"a1"', html)}, listing_complete=False)
+    assert delta["removed"] == []
+    state = CrawlState(path)
+    assert state.product(b) is not None
+    state.close()
+
+
+def test_unparseable_page_counts_as_failed(monkeypatch, tmp_path):
+    path = str(tmp_path / "state.sqlite")
+    html = load("shopify_product.html")
+    a, b = "https://hunnit.com/products/a", "https://hunnit.com/products/b"
+    run_incremental(monkeypatch, path, {a: ('"a1"', html), b: ('"b1"', html)})
+
+    async def parse(self, func, html, url, parser):
+        if url == b:
+            raise ValueError("broken page")
+        return func(html, url, parser)
+
+    monkeypatch.setattr(FakeCrawler, "parse", parse)
+    delta = run_incremental(monkeypatch, path, {a: ('"a2"', html + " "), b: ('"b2"', html + " ")})
+    assert delta == {"new": [], "changed": [a], "removed": []}
+
+
+def test_incremental_run_writes_delta_to_its_path(monkeypatch, tmp_path):
+    html = load("shopify_product.html")
+    a = "https://hunnit.com/products/a"
+    monkeypatch.setattr(scraper, "Crawler", lambda **kwargs: FakeCrawler({a: ('"a1"', html)}))
+    # Nothing lands in the working directory
+    monkeypatch.chdir(tmp_path)
+    delta_path = tmp_path / "out" / "delta.json"
+    delta_path.parent.mkdir()
+    scraper.scrape_hunnit_products(
+        state_path=str(tmp_path / "out" / "state.sqlite"), output_path=str(tmp_path / "out" / "products.jsonl"),
+        delta_path=str(delta_path),
+    )
+    assert [p["url"] for p in json.loads(delta_path.read_text(encoding="utf-8"))["new"]] == [a]
+    assert [p.name for p in tmp_path.iterdir()] == ["out"]
+
+
+def test_sink_runs_off_the_event_loop(monkeypatch):
+    html = load("shopify_product.html")
+    pages = {f"https://hunnit.com/products/{name}": (f'"{name}"', html) for name in "abc"}
+    monkeypatch.setattr(scraper, "Crawler", lambda **kwargs: FakeCrawler(pages))
+    delivered = []
+
+    def sink(product):
+        # A blocking sink (e.g. a full ProductQueue) must not stall the loop
+        with pytest.raises(RuntimeError):
+            asyncio.get_running_loop()
+        delivered.append(product["url"])
+
+    assert asyncio.run(scraper.crawl(sink)) == 3
+    assert sorted(delivered) == sorted(pages)
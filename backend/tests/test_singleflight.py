@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from app.core import metrics
+from app.core.singleflight import SingleFlight
+
+
+def test_concurrent_identical_calls_share_one_computation():
+    flight = SingleFlight("test_share")
+    calls = []
+
+    async def compute(x):
+        calls.append(x)
+        await asyncio.sleep(0.01)
+        return x * 2
+
+    async def main():
+        return await asyncio.gather(*[flight.do("k", compute, 21) for _ in range(5)])
+
+    assert asyncio.run(main()) == [42] * 5
+    assert calls == [21]
+    assert metrics.get("singleflight_test_share_coalesced") == 4
+
+
+def test_sequential_calls_are_not_cached():
+    flight = SingleFlight("test_sequential")
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return len(calls)
+
+    async def main():
+        return [await flight.do("k", compute), await flight.do("k", compute)]
+
+    assert asyncio.run(main()) == [1, 2]
+
+
+def test_exceptions_reach_every_caller():
+    flight = SingleFlight("test_errors")
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    async def main():
+        return await asyncio.gather(*[flight.do("k", fail) for _ in range(3)], return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    with pytest.raises(RuntimeError):
+        asyncio.run(flight.do("k", fail))
+
+
+def test_coalesced_callers_are_charged_the_shared_tokens():
+    flight = SingleFlight("test_tokens")
+
+    async def generate():
+        await asyncio.sleep(0.01)
+        metrics.record_tokens("test_coalesced", 100, 20)
+        return "answer"
+
+    async def request():
+        trace, token = metrics.start_trace()
+        try:
+            await flight.do("k", generate)
+            return metrics.token_usage()
+        finally:
+            metrics.end_trace(token)
+
+    async def main():
+        return await asyncio.gather(*[request() for _ in range(3)])
+
+    assert asyncio.run(main()) == [{"prompt": 100, "output": 20, "cached": 0}] * 3
+    assert metrics.get("llm_test_coalesced_prompt_tokens") == 100
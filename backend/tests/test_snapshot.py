@@ -0,0 +1,106 @@
+import asyncio
+import os
+
+import numpy as np
+import pytest
+
+from app.services import snapshot
+from app.services.embedders import get_embedder
+from app.services.stores import MemoryStore, SnapshotStore
+
+PRODUCTS = [
+    {"id": 1, "title": "Zen Flare Pants", "price": 1399, "description": "Flared yoga pants", "features": ["High Waist"],
+     "image_url": None, "category": "BOTTOMWEAR", "colors": ["Black"]},
+    {"id": 2, "title": "Cosmic Waves Sports Bra", "price": 1249, "description": "", "features": ["Padded"],
+     "image_url": "https://hunnit.com/b.jpg", "category": "SPORTS BRAS", "colors": []},
+    {"id": 3, "title": "Epic Pop Shorts", "price": 1249, "description": None, "features": [],
+     "image_url": None, "category": "BOTTOMWEAR", "colors": ["Pink", "Blue"]},
+]
+
+
+def export(memory, directory):
+    return snapshot.write_snapshot(
+        memory.fetch_all_rows("products"),
+        memory.fetch_all_rows("product_embeddings", snapshot.EMBEDDING_COLUMNS),
+        str(directory),
+    )
+
+
+def test_snapshot_serves_the_same_catalog(tmp_path):
+    memory = MemoryStore(products=PRODUCTS, latency_ms=0)
+    export(memory, tmp_path)
+    store = SnapshotStore(str(tmp_path))
+
+    expected = memory.fetch_all_rows("products")
+    assert store.fetch_all_rows("products") == expected
+    assert store.fetch_version() == 1
+
+    mapped = store.snapshot()
+    assert isinstance(mapped.embeddings, np.memmap)
+    assert mapped.embeddings.dtype == np.float32
+
+    product = expected[1]
+    assert asyncio.run(store.get_product(product["id"])) == product
+    assert asyncio.run(store.get_product("missing")) is None
+    assert asyncio.run(store.list_products(2, columns="id, title")) == [
+        {"id": p["id"], "title": p["title"]} for p in expected[:2]
+    ]
+    assert [p["id"] for p in asyncio.run(store.list_products(5, cursor=expected[0]["id"]))] == [p["id"] for p in expected[1:]]
+
+    query = get_embedder().embed(["flared yoga pants"])[0]
+    want = asyncio.run(memory.match_products_full(query, 0.0, 3))
+    got = asyncio.run(store.match_products_full(query, 0.0, 3))
+    assert [p["id"] for p in got] == [p["id"] for p in want]
+    assert np.allclose([p["similarity"] for p in got], [p["similarity"] for p in want], atol=1e-5)
+
+
+def test_new_version_is_swapped_in(tmp_path):
+    export(MemoryStore(products=PRODUCTS, latency_ms=0), tmp_path)
+    store = SnapshotStore(str(tmp_path))
+    assert len(store.snapshot()) == 3
+    previous = store.snapshot()
+
+    export(MemoryStore(products=PRODUCTS[:2], latency_ms=0), tmp_path)
+    export(MemoryStore(products=PRODUCTS[:1], latency_ms=0), tmp_path)
+    assert store.fetch_version() == 3
+    assert len(store.snapshot()) == 1
+    # A request still holding the old version keeps reading it
+    assert len(previous.rows()) == 3
+    assert snapshot.list_versions(str(tmp_path)) == [2, 3]
+    assert not os.path.exists(tmp_path / "CURRENT.tmp")
+
+
+def test_column_round_trip(tmp_path):
+    path = str(tmp_path / "col")
+    values = ["b", None, "aé"]
+    snapshot._write_column(path, values, "text")
+    column = snapshot.Column(path, "text")
+    assert list(column) == values
+
+    snapshot._write_column(path, [3, None], "int")
+    assert list(snapshot.Column(path, "int")) == [3, None]
+
+    snapshot._write_column(path, [{"a": [1]}, None], "json")
+    assert list(snapshot.Column(path, "json")) == [{"a": [1]}, None]
+
+
+def test_catalog_without_embeddings(tmp_path):
+    snapshot.write_snapshot(PRODUCTS, [], str(tmp_path))
+    store = SnapshotStore(str(tmp_path))
+    assert store.snapshot().embeddings.shape == (0, 0)
+    assert len(store.fetch_all_rows("products")) == 3
+    query = get_embedder().embed(["flared yoga pants"])[0]
+    assert asyncio.run(store.match_products_full(query, 0.0, 3)) == []
+
+
+def test_failed_export_leaves_no_staging_directory(tmp_path, monkeypatch):
+    export(MemoryStore(products=PRODUCTS, latency_ms=0), tmp_path)
+
+    def fail(*args):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(snapshot, "_write_column", fail)
+    with pytest.raises(OSError):
+        export(MemoryStore(products=PRODUCTS, latency_ms=0), tmp_path)
+    assert sorted(os.listdir(tmp_path)) == ["CURRENT", "v1"]
+    assert snapshot.current_version(str(tmp_path)) == 1
@@ -0,0 +1,95 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+
+from app.core import lifecycle
+from app.services import catalog
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Modules that are slow to import and must only load when first used
+LAZY_MODULES = ["supabase", "google.generativeai"]
+
+
+def test_import_is_lazy_and_within_budget():
+    code = (
+        "import json, sys, app.main; "
+        f"print(json.dumps({{'seconds': app.main.IMPORT_SECONDS, 'loaded': [m for m in {LAZY_MODULES!r} if m in sys.modules]}}))"
+    )
+    env = {k: v for k, v in os.environ.items() if k not in ("SUPABASE_URL", "SUPABASE_KEY", "GOOGLE_API_KEY")}
+    result = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, env=env, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+
+    assert report["loaded"] == []
+    budget = float(os.getenv("IMPORT_BUDGET_SECONDS", "1.5"))
+    assert report["seconds"] < budget
+
+
+def test_run_hooks_runs_in_order_and_survives_failures():
+    calls = []
+
+    async def async_hook():
+        calls.append("async")
+
+    def failing_hook():
+        raise RuntimeError("not configured")
+
+    timings = asyncio.run(lifecycle.run_hooks([
+        ("async", async_hook),
+        ("failing", failing_hook),
+        ("sync", lambda: calls.append("sync")),
+    ]))
+    assert calls == ["async", "sync"]
+    assert timings["failing"] is None
+    assert timings["async"] >= 0 and timings["sync"] >= 0
+
+
+def test_catalog_watcher_backs_off_and_keeps_polling(monkeypatch):
+    results = [RuntimeError("db down")] * 6 + [False]
+    delays = []
+
+    def check_for_updates():
+        result = results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    async def sleep(seconds):
+        delays.append(seconds)
+        if not results:
+            raise asyncio.CancelledError
+
+    monkeypatch.setattr(catalog, "check_for_updates", check_for_updates)
+    monkeypatch.setattr(catalog, "MAX_BACKOFF_SECONDS", 300)
+    monkeypatch.setattr(catalog.asyncio, "sleep", sleep)
+    try:
+        asyncio.run(catalog.watch(interval=10))
+    except asyncio.CancelledError:
+        pass
+    assert delays == [20, 40, 80, 160, 300, 300, 10]
+
+
+def test_lifespan_unregisters_its_catalog_listeners(monkeypatch):
+    from app import main
+
+    async def run_hooks(hooks):
+        pass
+
+    async def close_async_client():
+        pass
+
+    monkeypatch.setattr(main.lifecycle, "run_hooks", run_hooks)
+    monkeypatch.setattr(main.catalog, "watch", asyncio.Event().wait)
+    monkeypatch.setattr(main, "close_async_client", close_async_client)
+    before = list(catalog._listeners)
+
+    async def serve_twice():
+        for _ in range(2):
+            async with main.lifespan(main.app):
+                assert catalog._listeners.count(main.vector_index.load) == 1
+            assert catalog._listeners == before
+
+    asyncio.run(serve_twice())
@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+from app.services import vector_index
+from app.services.vector_index import VectorIndex
+
+
+def make_rows(n, dim=16, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(n, dim))
+    return [
+        {"id": f"e{i}", "product_id": f"p{i}", "chunk_content": f"chunk {i}", "embedding": vectors[i].tolist()}
+        for i in range(n)
+    ]
+
+
+def brute_force(rows, query, match_threshold, match_count):
+    matrix = np.array([r["embedding"] for r in rows])
+    matrix = matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+    scores = matrix @ (np.array(query) / np.linalg.norm(query))
+    ranked = [i for i in np.argsort(-scores) if scores[i] > match_threshold]
+    return [rows[i]["product_id"] for i in ranked[:match_count]]
+
+
+def test_exact_search_matches_brute_force():
+    rows = make_rows(200)
+    index = VectorIndex(rows, mode="exact")
+    query = rows[3]["embedding"]
+    matches = index.search(query, match_threshold=0.0, match_count=5)
+    assert [m["product_id"] for m in matches] == brute_force(rows, query, 0.0, 5)
+    assert matches[0]["product_id"] == "p3"
+    assert abs(matches[0]["similarity"] - 1.0) < 1e-5
+
+
+def test_search_honours_threshold():
+    rows = make_rows(50)
+    index = VectorIndex(rows, mode="exact")
+    matches = index.search(rows[0]["embedding"], match_threshold=0.99, match_count=5)
+    assert [m["product_id"] for m in matches] == ["p0"]
+
+
+def test_pgvector_string_embeddings_are_parsed():
+    rows = make_rows(3)
+    for row in rows:
+        row["embedding"] = "[" + ",".join(str(x) for x in row["embedding"]) + "]"
+    index = VectorIndex(rows, mode="exact")
+    query = make_rows(3)[1]["embedding"]
+    assert index.search(query, 0.5, 1)[0]["product_id"] == "p1"
+
+
+def test_ivf_finds_exact_match():
+    rows = make_rows(500)
+    index = VectorIndex(rows, mode="ivf", nprobe=4)
+    for i in (0, 137, 499):
+        matches = index.search(rows[i]["embedding"], match_threshold=0.5, match_count=3)
+        assert matches[0]["product_id"] == f"p{i}"
+
+
+def test_empty_index():
+    index = VectorIndex([], mode="exact")
+    assert index.search([1.0, 0.0], 0.5, 5) == []
+
+
+def test_products_are_ranked_by_their_best_chunk():
+    rows = make_rows(60)
+    for i, row in enumerate(rows):
+        row["product_id"] = f"p{i // 3}"  # Three chunks per product
+    index = VectorIndex(rows, mode="exact")
+    query = rows[7]["embedding"]
+    matches = index.search(query, match_threshold=-1.0, match_count=5)
+
+    product_ids = [m["product_id"] for m in matches]
+    assert len(product_ids) == len(set(product_ids)) == 5
+    assert matches[0]["id"] == "e7" and product_ids[0] == "p2"
+
+    matrix = np.array([r["embedding"] for r in rows])
+    scores = matrix / np.linalg.norm(matrix, axis=1, keepdims=True) @ (np.array(query) / np.linalg.norm(query))
+    best = {}
+    for row, score in zip(rows, scores):
+        best[row["product_id"]] = max(best.get(row["product_id"], -2), score)
+    assert product_ids == sorted(best, key=best.get, reverse=True)[:5]
+
+
+def test_product_vectors_average_chunks():
+    rows = [
+        {"id": "e0", "product_id": "p0", "embedding": [1.0, 0.0]},
+        {"id": "e1", "product_id": "p0", "embedding": [0.0, 1.0]},
+        {"id": "e2", "product_id": "p1", "embedding": [0.0, 2.0]},
+    ]
+    index = VectorIndex(rows, mode="exact")
+    vectors = index.product_vectors(["p1", "p0"])
+    assert np.allclose(vectors, [[0.0, 1.0], [2 ** -0.5, 2 ** -0.5]])
+    assert index.product_vectors(["p0", "missing"]) is None
+
+
+def test_unknown_mode_is_rejected(monkeypatch):
+    monkeypatch.setattr(vector_index, "VECTOR_INDEX_MODE", "exat")
+    with pytest.raises(ValueError):
+        vector_index.resolve_mode(10)
+    monkeypatch.setattr(vector_index, "VECTOR_INDEX_MODE", "auto")
+    assert vector_index.resolve_mode(0) == "exact"
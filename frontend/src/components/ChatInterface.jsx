@@ -29,7 +29,8 @@ const ChatInterface = () => {
         setLoading(true);
 
         try {
-            const response = await fetch(`${import.meta.env.VITE_API_URL}/chat`, {
+            // Stream the answer: product cards arrive first, then the text token by token
+            const response = await fetch(`${import.meta.env.VITE_API_URL}/chat/stream`, {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
@@ -41,13 +42,45 @@ const ChatInterface = () => {
                 throw new Error('Network response was not ok');
             }
 
-            const data = await response.json();
+            let started = false;
+            const updateBotMessage = (update) => {
+                // The bot bubble replaces the typing indicator on the first event
+                if (!started) {
+                    started = true;
+                    setLoading(false);
+                    setMessages(prev => [...prev, { type: 'bot', text: '', products: [] }]);
+                }
+                setMessages(prev => {
+                    const last = prev[prev.length - 1];
+                    return [...prev.slice(0, -1), { ...last, ...update(last) }];
+                });
+            };
 
-            setMessages(prev => [...prev, {
-                type: 'bot',
-                text: data.response,
-                products: data.products
-            }]);
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+
+            while (true) {
+                const { done, value } = await reader.read();
+                if (done) break;
+
+                buffer += decoder.decode(value, { stream: true });
+                const lines = buffer.split('\n');
+                buffer = lines.pop();
+
+                for (const line of lines) {
+                    if (!line.trim()) continue;
+                    const event = JSON.parse(line);
+
+                    if (event.type === 'products') {
+                        updateBotMessage(() => ({ products: event.products }));
+                    } else if (event.type === 'token') {
+                        updateBotMessage(last => ({ text: last.text + event.text }));
+                    } else if (event.type === 'error') {
+                        throw new Error(event.detail);
+                    }
+                }
+            }
 
         } catch (error) {
             console.error('Error:', error);
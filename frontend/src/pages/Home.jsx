@@ -11,7 +11,7 @@ const Home = () => {
     useEffect(() => {
         const fetchProducts = async () => {
             try {
-                const response = await axios.get(`${import.meta.env.VITE_API_URL}/products`);
+                const response = await axios.get(`${import.meta.env.VITE_API_URL}/products`, { params: { fields: 'summary' } });
                 setProducts(response.data);
                 setLoading(false);
             } catch (err) {